@@ -5,13 +5,31 @@ from __future__ import annotations
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.typing import ConfigType
 
-from .api import SmartfireApiClient
-from .const import CONF_BASE_URL, DOMAIN
+from .api import SmartfireApiClient, SmartfireApiClientCommunicationError
+from .const import CONF_BASE_URL, DEFAULT_FIREPLACE, DOMAIN
 from .coordinator import SmartfireDataUpdateCoordinator
+from .services import async_setup_services
 
-PLATFORMS: list[Platform] = [Platform.SWITCH]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PLATFORMS: list[Platform] = [
+    Platform.CLIMATE,
+    Platform.LIGHT,
+    Platform.NUMBER,
+    Platform.SELECT,
+    Platform.SWITCH,
+]
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the Smartfire services."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -20,17 +38,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     session = async_get_clientsession(hass)
     client = SmartfireApiClient(base_url, session)
 
-    coordinator = SmartfireDataUpdateCoordinator(hass, client, entry)
+    try:
+        names = await client.async_list_fireplaces()
+    except SmartfireApiClientCommunicationError as err:
+        raise ConfigEntryNotReady(str(err)) from err
+    # A single unnamed fireplace keeps the original routes and entity IDs
+    if not names or names == [DEFAULT_FIREPLACE]:
+        names = [None]
 
-    await coordinator.async_config_entry_first_refresh()
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = {}
+    for name in names:
+        coordinator = SmartfireDataUpdateCoordinator(hass, client.for_fireplace(name), entry, name)
+        await coordinator.async_config_entry_first_refresh()
+        coordinators[name] = coordinator
 
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    for coordinator in coordinators.values():
+        coordinator.async_start_stream()
+
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinators
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # Changing a thermostat's temperature sensor reloads the entry
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
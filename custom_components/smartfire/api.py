@@ -2,14 +2,44 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import random
 import socket
-from typing import Any
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+from urllib.parse import quote
 
 import aiohttp
 from aiohttp import ClientTimeout
 
-from .const import LOGGER
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    COMMAND_TIMEOUT,
+    CONNECT_TIMEOUT,
+    LOGGER,
+    READ_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+)
+
+_T = TypeVar("_T")
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+def _is_read_timeout(exc: BaseException) -> bool:
+    """Return True for a timeout after the connection was made.
+
+    aiohttp before 3.10 raises the same ServerTimeoutError for connect
+    timeouts, so there those count as read timeouts too.
+    """
+    connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", ())
+    return isinstance(exc, TimeoutError) and not isinstance(exc, connect_timeout)
 
 
 class SmartfireApiClientError(Exception):
@@ -20,71 +50,414 @@ class SmartfireApiClientCommunicationError(SmartfireApiClientError):
     """Exception to indicate a communication error."""
 
 
+class SmartfireApiClientUnavailableError(SmartfireApiClientCommunicationError):
+    """Exception raised without a request while the server is known to be down."""
+
+
+class SmartfireApiClientSupersededError(SmartfireApiClientCommunicationError):
+    """Exception raised when the server dropped a command for a power or pilot off command."""
+
+
+class CircuitBreaker:
+    """Tracks whether a Smartfire server is reachable, shared by its clients.
+
+    Closed, requests go through. After BREAKER_FAILURE_THRESHOLD consecutive
+    connection errors or timeouts (other than commands left waiting on the
+    radio) it opens, and requests fail straight away.
+    Once BREAKER_RESET_TIMEOUT has passed it is half-open: one trial request
+    goes through, and closes it again on success or reopens it on failure.
+    Any response from the server, even an error status, counts as success.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT.total_seconds(),
+    ) -> None:
+        """Initialize a closed breaker."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._times_opened = 0
+        self._last_error: str | None = None
+
+    @property
+    def state(self) -> str:
+        """BREAKER_CLOSED, BREAKER_OPEN or BREAKER_HALF_OPEN."""
+        if self._opened_at is None:
+            return BREAKER_CLOSED
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return BREAKER_OPEN
+        return BREAKER_HALF_OPEN
+
+    def before_request(self) -> None:
+        """Raise SmartfireApiClientUnavailableError if a request may not be sent now."""
+        state = self.state
+        if state == BREAKER_CLOSED:
+            return
+        if state == BREAKER_HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        retry_in = max(0.0, self._opened_at + self._reset_timeout - time.monotonic())
+        raise SmartfireApiClientUnavailableError(
+            f"Smartfire server unreachable ({self._last_error}); retrying in {retry_in:.0f} s"
+        )
+
+    def record_success(self) -> None:
+        """Note that the server answered."""
+        if self._opened_at is not None:
+            LOGGER.info("Smartfire server reachable again")
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        """Note a connection error or timeout, opening the breaker if there were enough."""
+        self._failures += 1
+        self._last_error = error
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                self._times_opened += 1
+                LOGGER.warning(
+                    "Smartfire server unreachable after %d attempts, failing fast for %.0f s: %s",
+                    self._failures,
+                    self._reset_timeout,
+                    error,
+                )
+            self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Let another trial request through if the last one ended without a result."""
+        self._trial_in_flight = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """The breaker's state for diagnostics."""
+        retry_in = None
+        if self._opened_at is not None:
+            retry_in = round(max(0.0, self._opened_at + self._reset_timeout - time.monotonic()), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self._times_opened,
+            "retry_in": retry_in,
+            "last_error": self._last_error,
+        }
+
+
 class SmartfireApiClient:
-    """Client for the Smartfire REST API."""
+    """Client for the Smartfire REST API.
 
-    def __init__(self, base_url: str, session: aiohttp.ClientSession) -> None:
-        """Initialize the API client."""
+    Every request goes through _request, which applies the connect and read
+    timeouts, retries GETs, and consults the server's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session: aiohttp.ClientSession,
+        fireplace: str | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """Initialize the API client.
+
+        With a fireplace name, requests go to that fireplace's
+        /fireplaces/<name>/... routes; otherwise to the server's default one.
+        Clients for the same server should share one breaker.
+        """
         self._base_url = base_url.rstrip("/")
         self._session = session
-        self._timeout = ClientTimeout(total=10)
+        self.fireplace = fireplace
+        self._prefix = f"/fireplaces/{quote(fireplace, safe='')}" if fireplace else ""
+        self.breaker = breaker or CircuitBreaker()
+        # No overall limit, only a limit on silence from the server
+        self._timeout = ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        # Commands are only answered once sent, which can take the server's
+        # whole COMMAND_TIMEOUT behind a busy radio
+        self._command_timeout = ClientTimeout(
+            total=None, connect=CONNECT_TIMEOUT, sock_read=COMMAND_TIMEOUT + READ_TIMEOUT
+        )
+        # The event stream stays open indefinitely; the server sends a
+        # keep-alive every 15 s, so only a silent socket counts as a failure
+        self._stream_timeout = ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=45)
+        # Last GET /state result, revalidated with its ETag
+        self._state: dict[str, Any] | None = None
+        self._state_etag: str | None = None
+        self.state_version: int | None = None
 
     def _url(self, path: str) -> str:
         """Build full URL for a path."""
-        return f"{self._base_url}{path}"
+        return f"{self._base_url}{self._prefix}{path}"
+
+    def for_fireplace(self, fireplace: str | None) -> SmartfireApiClient:
+        """Return a client for one named fireplace on the same server."""
+        return SmartfireApiClient(self._base_url, self._session, fireplace, self.breaker)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """The client's connection state for Home Assistant diagnostics."""
+        return {
+            "fireplace": self.fireplace,
+            "state_version": self.state_version,
+            "state_etag": self._state_etag,
+            "circuit_breaker": self.breaker.as_dict(),
+        }
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        handle: Callable[[aiohttp.ClientResponse], Awaitable[_T]],
+        timeout: ClientTimeout | None = None,
+        **kwargs: Any,
+    ) -> _T:
+        """Send a request and return handle(response).
+
+        GETs are idempotent, so connection errors and timeouts are retried
+        after a jittered backoff; other methods are sent once, and a read
+        timeout on one does not count against the circuit breaker, since the
+        server may still be sending the command. handle may raise
+        SmartfireApiClientCommunicationError for an error response.
+        """
+        idempotent = method == "GET"
+        attempts = RETRY_ATTEMPTS if idempotent else 1
+        if timeout is None:
+            timeout = self._timeout if idempotent else self._command_timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_request()
+            try:
+                async with self._session.request(
+                    method, url, timeout=timeout, **kwargs
+                ) as response:
+                    result = await handle(response)
+            except SmartfireApiClientCommunicationError:
+                self.breaker.record_success()
+                raise
+            except aiohttp.ClientResponseError as exc:
+                self.breaker.record_success()
+                msg = f"Error communicating with Smartfire server: {exc}"
+                LOGGER.error(msg)
+                raise SmartfireApiClientCommunicationError(msg) from exc
+            except (TimeoutError, aiohttp.ClientError, socket.gaierror) as exc:
+                if not idempotent and _is_read_timeout(exc):
+                    msg = f"Timeout waiting for Smartfire server to confirm the command: {exc}"
+                    LOGGER.error(msg)
+                    raise SmartfireApiClientCommunicationError(msg) from exc
+                if isinstance(exc, TimeoutError):
+                    msg = f"Timeout connecting to Smartfire server: {exc}"
+                else:
+                    msg = f"Error communicating with Smartfire server: {exc}"
+                self.breaker.record_failure(msg)
+                if attempt < attempts and self.breaker.state == BREAKER_CLOSED:
+                    LOGGER.debug("%s; retrying", msg)
+                    delay = RETRY_BACKOFF.total_seconds() * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                    continue
+                LOGGER.error(msg)
+                raise SmartfireApiClientCommunicationError(msg) from exc
+            except ValueError as exc:
+                self.breaker.record_success()
+                msg = f"Invalid response from Smartfire server: {exc}"
+                LOGGER.error(msg)
+                raise SmartfireApiClientCommunicationError(msg) from exc
+            finally:
+                # A cancelled trial request must not keep the breaker open
+                self.breaker.release_trial()
+            self.breaker.record_success()
+            return result
+
+    async def async_list_fireplaces(self) -> list[str] | None:
+        """List the fireplace names configured on the server.
+
+        Returns None for servers that predate multi-fireplace support.
+        """
+
+        async def handle(response: aiohttp.ClientResponse) -> list[str] | None:
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            return list(await response.json(content_type=None))
+
+        return await self._request("GET", f"{self._base_url}/fireplaces", handle)
+
+    @staticmethod
+    async def _raise_for_server_error(response: aiohttp.ClientResponse) -> None:
+        """Raise with the server's error message and hint if the request failed."""
+        if response.ok:
+            return
+        body = await response.text()
+        try:
+            err_data = json.loads(body) if body else {}
+            hint = err_data.get("hint", "")
+            err_msg = err_data.get("error", body or str(response.reason))
+            msg = f"Smartfire server error: {err_msg}"
+            if hint:
+                msg += f" — {hint}"
+        except (ValueError, TypeError, AttributeError):
+            msg = f"Smartfire server error: {response.status} {response.reason}"
+        LOGGER.error("Server returned %s: %s", response.status, body or "(no body)")
+        raise SmartfireApiClientCommunicationError(msg)
+
+    @classmethod
+    async def _json(cls, response: aiohttp.ClientResponse) -> Any:
+        """The JSON body of a successful response."""
+        await cls._raise_for_server_error(response)
+        return await response.json(content_type=None)
+
+    @classmethod
+    async def _power(cls, response: aiohttp.ClientResponse) -> bool:
+        """The "True"/"False" body of a /power response."""
+        await cls._raise_for_server_error(response)
+        text = await response.text()
+        return text.strip().lower() == "true"
 
     async def async_get_power(self) -> bool:
         """Get the current power state."""
+        return await self._request("GET", self._url("/power"), self._power)
+
+    async def async_get_state(self, wait: float = 0) -> dict[str, Any]:
+        """Get the full fireplace state.
+
+        Sends the previous response's ETag, so an unchanged state costs a
+        bodyless 304. With wait (seconds), the server holds the request until
+        the state version differs from the last one seen here, or the wait
+        runs out, giving near-instant change detection without the stream.
+        """
+        params = {}
+        headers = {}
+        timeout = self._timeout
+        if wait:
+            params["wait"] = str(wait)
+            if self.state_version is not None:
+                params["since"] = str(self.state_version)
+            timeout = ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=wait + READ_TIMEOUT)
+        if self._state_etag is not None:
+            headers["If-None-Match"] = self._state_etag
+
+        async def handle(response: aiohttp.ClientResponse) -> dict[str, Any]:
+            if response.status == 304 and self._state is not None:
+                return dict(self._state)
+            response.raise_for_status()
+            state = await response.json(content_type=None)
+            self._state = state
+            self._state_etag = response.headers.get("ETag")
+            version = response.headers.get("X-State-Version")
+            self.state_version = int(version) if version is not None else None
+            return dict(state)
+
+        return await self._request(
+            "GET", self._url("/state"), handle, timeout, params=params, headers=headers
+        )
+
+    async def async_stream_state(self) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Subscribe to the server's state event stream.
+
+        Yields (event, payload) pairs: a "snapshot" with the full state first,
+        then a "delta" with the changed fields after every transmission. Ends
+        or raises when the connection drops. Failures to connect count
+        against the circuit breaker; a stream that drops later does not.
+        """
+        self.breaker.before_request()
+        connected = False
         try:
             async with self._session.get(
-                self._url("/power"),
-                timeout=self._timeout,
+                self._url("/events"),
+                headers={"Accept": "text/event-stream"},
+                timeout=self._stream_timeout,
             ) as response:
+                connected = True
+                self.breaker.record_success()
                 response.raise_for_status()
-                text = await response.text()
-                return text.strip().lower() == "true"
+                event = "message"
+                data: list[str] = []
+                async for raw in response.content:
+                    line = raw.decode().rstrip("\r\n")
+                    if not line:
+                        if data:
+                            yield event, json.loads("\n".join(data))
+                        event, data = "message", []
+                    elif line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
         except TimeoutError as exc:
-            msg = f"Timeout connecting to Smartfire server: {exc}"
-            LOGGER.error(msg)
+            msg = f"Timeout on Smartfire event stream: {exc}"
+            if not connected:
+                self.breaker.record_failure(msg)
             raise SmartfireApiClientCommunicationError(msg) from exc
-        except (aiohttp.ClientError, socket.gaierror) as exc:
-            msg = f"Error communicating with Smartfire server: {exc}"
-            LOGGER.error(msg)
+        except (aiohttp.ClientError, socket.gaierror, ValueError) as exc:
+            msg = f"Smartfire event stream error: {exc}"
+            if not connected:
+                self.breaker.record_failure(msg)
             raise SmartfireApiClientCommunicationError(msg) from exc
+        finally:
+            self.breaker.release_trial()
 
     async def async_set_power(self, power: bool) -> bool:
         """Set the power state and return the new state."""
-        try:
-            async with self._session.put(
-                self._url("/power"),
-                data="True" if power else "False",
-                timeout=self._timeout,
-            ) as response:
-                if not response.ok:
-                    body = await response.text()
-                    try:
-                        err_data = json.loads(body) if body else {}
-                        hint = err_data.get("hint", "")
-                        err_msg = err_data.get("error", body or str(response.reason))
-                        msg = f"Smartfire server error: {err_msg}"
-                        if hint:
-                            msg += f" — {hint}"
-                    except (ValueError, TypeError):
-                        msg = f"Smartfire server error: {response.status} {response.reason}"
-                    LOGGER.error("Server returned %s: %s", response.status, body or "(no body)")
-                    raise SmartfireApiClientCommunicationError(msg)
-                text = await response.text()
-                return text.strip().lower() == "true"
-        except SmartfireApiClientCommunicationError:
-            raise
-        except TimeoutError as exc:
-            msg = f"Timeout connecting to Smartfire server: {exc}"
-            LOGGER.error(msg)
-            raise SmartfireApiClientCommunicationError(msg) from exc
-        except (aiohttp.ClientError, socket.gaierror) as exc:
-            msg = f"Error communicating with Smartfire server: {exc}"
-            LOGGER.error(msg)
-            raise SmartfireApiClientCommunicationError(msg) from exc
+        return await self._request(
+            "PUT", self._url("/power"), self._power, data="True" if power else "False"
+        )
+
+    async def async_set_state(self, **changes: Any) -> dict[str, Any]:
+        """Change any subset of state fields in one transmission.
+
+        Returns the server's response: the new state and its version. Raises
+        SmartfireApiClientSupersededError if a command turning the fireplace
+        off arrived before this one was sent and the server dropped it.
+        """
+
+        async def handle(response: aiohttp.ClientResponse) -> dict[str, Any]:
+            if response.status == 409:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                if isinstance(body, dict) and body.get("superseded"):
+                    raise SmartfireApiClientSupersededError(body.get("error", "Command superseded"))
+            return await self._json(response)
+
+        return await self._request("PATCH", self._url("/state"), handle, json=changes)
+
+    async def async_start_sequence(self, steps: list[dict[str, Any]]) -> dict[str, Any]:
+        """Start a timed sequence of steps on the server and return it."""
+        return await self._request("POST", self._url("/sequences"), self._json, json={"steps": steps})
+
+    async def async_list_sequences(self) -> list[dict[str, Any]]:
+        """List the sequences running for this fireplace."""
+        return await self._request("GET", self._url("/sequences"), self._json)
+
+    async def async_cancel_sequence(self, sequence_id: str) -> dict[str, Any]:
+        """Cancel a running sequence and return it as it was."""
+        return await self._request(
+            "DELETE", self._url(f"/sequences/{quote(sequence_id, safe='')}"), self._json
+        )
+
+    async def async_get_climate(self) -> dict[str, Any] | None:
+        """Get the server's thermostat for this fireplace.
+
+        Returns None for servers that predate thermostat support.
+        """
+
+        async def handle(response: aiohttp.ClientResponse) -> dict[str, Any] | None:
+            if response.status == 404:
+                return None
+            return await self._json(response)
+
+        return await self._request("GET", self._url("/climate"), handle)
+
+    async def async_set_climate(self, **settings: Any) -> dict[str, Any]:
+        """Change the thermostat's mode, setpoint or limits and return it."""
+        return await self._request("PATCH", self._url("/climate"), self._json, json=settings)
+
+    async def async_report_temperature(self, temperature: float) -> dict[str, Any]:
+        """Push a room temperature reading to the thermostat and return it."""
+        return await self._request(
+            "POST", self._url("/climate/temperature"), self._json, json={"temperature": temperature}
+        )
 
     async def async_test_connection(self) -> bool:
         """Test the connection to the Smartfire server."""
@@ -0,0 +1,173 @@
+"""Climate platform for Smartfire integration."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.components.climate import (
+    ClimateEntity,
+    ClimateEntityFeature,
+    HVACAction,
+    HVACMode,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    ATTR_TEMPERATURE,
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    UnitOfTemperature,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_interval
+from homeassistant.util.unit_conversion import TemperatureConverter
+
+from .api import SmartfireApiClientCommunicationError
+from .const import (
+    CONF_TEMPERATURE_SENSORS,
+    DEFAULT_FIREPLACE,
+    DOMAIN,
+    LOGGER,
+    TEMPERATURE_PUSH_INTERVAL,
+)
+from .coordinator import SmartfireDataUpdateCoordinator
+from .entity import SmartfireEntity
+
+# Server thermostat modes for each HVAC mode
+SERVER_MODES = {HVACMode.OFF: "off", HVACMode.HEAT: "heat"}
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up a thermostat for each fireplace whose server supports it."""
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    sensors: dict[str, str] = config_entry.options.get(CONF_TEMPERATURE_SENSORS, {})
+    async_add_entities(
+        SmartfireClimate(coordinator, sensors.get(name or DEFAULT_FIREPLACE))
+        for name, coordinator in coordinators.items()
+        if coordinator.climate is not None
+    )
+
+
+class SmartfireClimate(SmartfireEntity, ClimateEntity):
+    """The server's thermostat, fed by a Home Assistant temperature sensor.
+
+    The server switches the fireplace and sets its flame by itself; this
+    entity only pushes readings and changes the mode and setpoint. The
+    server's defaults are in Celsius, so everything sent to it is converted
+    to Celsius and Home Assistant converts for display.
+    """
+
+    _attr_hvac_modes = [HVACMode.OFF, HVACMode.HEAT]
+    _attr_supported_features = (
+        ClimateEntityFeature.TARGET_TEMPERATURE
+        | ClimateEntityFeature.TURN_ON
+        | ClimateEntityFeature.TURN_OFF
+    )
+    _attr_target_temperature_step = 0.5
+    _attr_temperature_unit = UnitOfTemperature.CELSIUS
+
+    def __init__(self, coordinator: SmartfireDataUpdateCoordinator, sensor: str | None) -> None:
+        """Initialize the thermostat, reading the given sensor entity."""
+        super().__init__(coordinator, "power", "Thermostat")
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_climate"
+        self._sensor = sensor
+
+    @property
+    def available(self) -> bool:
+        """Return True while both the fireplace state and thermostat are known."""
+        return super().available and self.coordinator.climate is not None
+
+    @property
+    def hvac_mode(self) -> HVACMode:
+        """Return heat while the server thermostat is on."""
+        return HVACMode.HEAT if self.coordinator.climate["mode"] == "heat" else HVACMode.OFF
+
+    @property
+    def hvac_action(self) -> HVACAction:
+        """Return heating while the thermostat has the fireplace on."""
+        if self.hvac_mode == HVACMode.OFF:
+            return HVACAction.OFF
+        return HVACAction.HEATING if self.field_value else HVACAction.IDLE
+
+    @property
+    def current_temperature(self) -> float | None:
+        """Return the last reading the server has."""
+        return self.coordinator.climate["temperature"]
+
+    @property
+    def target_temperature(self) -> float | None:
+        """Return the setpoint."""
+        return self.coordinator.climate["setpoint"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the server's control limits (in Celsius) and the reading's source."""
+        climate = self.coordinator.climate
+        return {
+            "hysteresis": climate["hysteresis"],
+            "min_on": climate["min_on"],
+            "min_off": climate["min_off"],
+            "temperature_sensor": self._sensor,
+        }
+
+    async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
+        """Turn the server thermostat on or off."""
+        await self.coordinator.async_set_climate(mode=SERVER_MODES[hvac_mode])
+
+    async def async_set_temperature(self, **kwargs: Any) -> None:
+        """Change the setpoint."""
+        if (temperature := kwargs.get(ATTR_TEMPERATURE)) is not None:
+            await self.coordinator.async_set_climate(setpoint=temperature)
+
+    async def async_added_to_hass(self) -> None:
+        """Start pushing the sensor's readings to the server."""
+        await super().async_added_to_hass()
+        if self._sensor is None:
+            return
+        self.async_on_remove(
+            async_track_state_change_event(self.hass, [self._sensor], self._async_sensor_changed)
+        )
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_push_interval, TEMPERATURE_PUSH_INTERVAL)
+        )
+        await self._async_push_reading()
+
+    @callback
+    def _async_sensor_changed(self, event: Event) -> None:
+        """Push a reading as soon as the sensor changes."""
+        self.hass.async_create_task(self._async_push_reading())
+
+    async def _async_push_interval(self, now: datetime) -> None:
+        """Repeat the reading so the server knows the sensor is still there."""
+        await self._async_push_reading()
+
+    async def _async_push_reading(self) -> None:
+        """Send the sensor's current temperature, if it has a usable one."""
+        state = self.hass.states.get(self._sensor)
+        if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return
+        try:
+            temperature = float(state.state)
+        except ValueError:
+            LOGGER.debug("Ignoring non-numeric temperature %r from %s", state.state, self._sensor)
+            return
+        unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT, self.hass.config.units.temperature_unit)
+        if unit != UnitOfTemperature.CELSIUS:
+            try:
+                temperature = TemperatureConverter.convert(temperature, unit, UnitOfTemperature.CELSIUS)
+            except HomeAssistantError:
+                LOGGER.debug("Ignoring temperature in unknown unit %r from %s", unit, self._sensor)
+                return
+        try:
+            await self.coordinator.async_report_temperature(temperature)
+        except SmartfireApiClientCommunicationError as err:
+            LOGGER.debug("Could not push temperature reading: %s", err)
@@ -5,7 +5,7 @@ from __future__ import annotations
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_PORT
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
@@ -14,6 +14,8 @@ from .api import SmartfireApiClient
 from .const import (
     CONF_BASE_URL,
     CONF_INSTALL_TYPE,
+    CONF_TEMPERATURE_SENSORS,
+    DEFAULT_FIREPLACE,
     DEFAULT_LOCAL_URL,
     DEFAULT_PORT,
     DOMAIN,
@@ -40,6 +42,14 @@ class SmartfireConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> SmartfireOptionsFlow:
+        """Return the options flow."""
+        return SmartfireOptionsFlow(config_entry)
+
     async def async_step_user(
         self,
         user_input: dict | None = None,
@@ -155,3 +165,34 @@ class SmartfireConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             ),
             errors=errors,
         )
+
+
+class SmartfireOptionsFlow(config_entries.OptionsFlow):
+    """Choose the temperature sensor that feeds each fireplace's thermostat."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self,
+        user_input: dict | None = None,
+    ) -> FlowResult:
+        """Show one optional sensor picker per fireplace."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title="",
+                data={CONF_TEMPERATURE_SENSORS: {name: sensor for name, sensor in user_input.items() if sensor}},
+            )
+
+        coordinators = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
+        sensors = self._entry.options.get(CONF_TEMPERATURE_SENSORS, {})
+        schema = {}
+        for name in coordinators or [None]:
+            key = name or DEFAULT_FIREPLACE
+            schema[vol.Optional(key, description={"suggested_value": sensors.get(key)})] = (
+                selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+                )
+            )
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
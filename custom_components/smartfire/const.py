@@ -1,5 +1,6 @@
 """Constants for the Smartfire integration."""
 
+from datetime import timedelta
 from logging import Logger, getLogger
 
 LOGGER: Logger = getLogger(__package__)
@@ -11,11 +12,43 @@ CONF_BASE_URL = "base_url"
 CONF_INSTALL_TYPE = "install_type"
 CONF_HOST = "host"
 CONF_PORT = "port"
+# Options: {fireplace name: temperature sensor entity ID} for the thermostat
+CONF_TEMPERATURE_SENSORS = "temperature_sensors"
 
 # Install types
 INSTALL_TYPE_LOCAL = "local"
 INSTALL_TYPE_REMOTE = "remote"
 
+# Server-side name of the fireplace configured by the add-on's single serial option
+DEFAULT_FIREPLACE = "default"
+
 # API defaults
 DEFAULT_PORT = 5000
 DEFAULT_LOCAL_URL = "http://127.0.0.1:5000"
+
+# Requests: seconds to connect, and of silence while waiting for a response
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+# Seconds the server holds a command while it waits for the radio to send it
+COMMAND_TIMEOUT = 30
+# Idempotent GETs are tried this many times, with jittered exponential backoff
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = timedelta(milliseconds=250)
+# After this many consecutive failures to reach the server, requests fail
+# straight away until one trial request is let through after the reset time
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = timedelta(seconds=30)
+
+# Push updates: poll only while the event stream is down
+FALLBACK_POLL_INTERVAL = timedelta(seconds=60)
+STREAM_RECONNECT_MIN = timedelta(seconds=1)
+STREAM_RECONNECT_MAX = timedelta(seconds=60)
+# Refresh requests within this window are coalesced into one GET
+REFRESH_COOLDOWN = timedelta(seconds=1)
+
+# Readings are pushed on every sensor change and at least this often, so
+# the server does not treat a steady temperature as a lost sensor
+TEMPERATURE_PUSH_INTERVAL = timedelta(seconds=60)
+
+# Flame, fan and light levels run from 0 to 6
+MAX_LEVEL = 6
@@ -2,52 +2,230 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
+import time
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .api import SmartfireApiClient, SmartfireApiClientCommunicationError
+from .api import (
+    SmartfireApiClient,
+    SmartfireApiClientCommunicationError,
+    SmartfireApiClientSupersededError,
+)
 
-from .const import DOMAIN, LOGGER
+from .const import (
+    DOMAIN,
+    FALLBACK_POLL_INTERVAL,
+    LOGGER,
+    REFRESH_COOLDOWN,
+    STREAM_RECONNECT_MAX,
+    STREAM_RECONNECT_MIN,
+)
 
 
 class SmartfireDataUpdateCoordinator(DataUpdateCoordinator[dict]):
-    """Class to manage fetching Smartfire data."""
+    """Class to manage fetching Smartfire data.
+
+    State is pushed by the server's event stream. While the stream is
+    disconnected, the waits between reconnect attempts long-poll GET /state,
+    and a slow conditional poll is kept as a fallback.
+
+    Changes are shown optimistically and then replaced by the state in the
+    server's response, so a command costs one request. Refresh requests from
+    every entity of the fireplace share one debouncer and collapse into a
+    single GET.
+    """
 
     def __init__(
         self,
         hass: HomeAssistant,
         client: SmartfireApiClient,
         entry: ConfigEntry,
+        fireplace: str | None = None,
     ) -> None:
-        """Initialize the coordinator."""
+        """Initialize the coordinator for one fireplace (None for the server default)."""
         super().__init__(
             hass,
             LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(seconds=30),
+            name=f"{DOMAIN} {fireplace}" if fireplace else DOMAIN,
+            update_interval=FALLBACK_POLL_INTERVAL,
+            # Unchanged polls (304s) do not rewrite every entity's state
+            always_update=False,
+            request_refresh_debouncer=Debouncer(
+                hass, LOGGER, cooldown=REFRESH_COOLDOWN.total_seconds(), immediate=False
+            ),
         )
         self._client = client
         self.config_entry = entry
+        self.stream_connected = False
+        self.version: int | None = None
+        # The server's thermostat for this fireplace; None if it has none
+        self.climate: dict[str, Any] | None = None
+        # Incremented by every command, so only the latest one's response is applied
+        self._command_seq = 0
+
+        self.fireplace = fireplace
+        # Prefix for device and entity unique IDs; the default fireplace keeps
+        # the IDs used before multi-fireplace support
+        self.unique_id_prefix = f"{entry.entry_id}_{fireplace}" if fireplace else entry.entry_id
 
         self.device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry.entry_id)},
-            name="Smartfire Fireplace",
+            identifiers={(DOMAIN, self.unique_id_prefix)},
+            name=f"Smartfire {fireplace}" if fireplace else "Smartfire Fireplace",
             manufacturer="Sit Group",
             model="Proflame 2",
         )
 
+    def diagnostics(self) -> dict[str, Any]:
+        """The coordinator's and client's state for Home Assistant diagnostics."""
+        return {
+            "stream_connected": self.stream_connected,
+            "version": self.version,
+            "last_update_success": self.last_update_success,
+            "update_interval": str(self.update_interval) if self.update_interval else None,
+            "data": self.data,
+            "climate": self.climate,
+            "client": self._client.diagnostics(),
+        }
+
     async def _async_update_data(self) -> dict:
         """Fetch data from the API."""
         try:
-            power = await self._client.async_get_power()
-            return {"power": power}
+            state = await self._client.async_get_state()
+            self.climate = await self._client.async_get_climate()
         except SmartfireApiClientCommunicationError as err:
             raise UpdateFailed(str(err)) from err
+        self.version = self._client.state_version
+        return state
 
     async def async_set_power(self, power: bool) -> None:
         """Set the power state."""
-        await self._client.async_set_power(power)
+        await self.async_set_state(power=power)
+
+    async def async_set_state(self, **changes: Any) -> None:
+        """Change one or more state fields and apply the server's new state.
+
+        The change is shown straight away. If the command fails, or the
+        server drops it because the fireplace was turned off first, fields
+        still showing it are put back and a (debounced) refresh is requested.
+        """
+        self._command_seq += 1
+        seq = self._command_seq
+        previous = dict(self.data or {})
+        if self.data is not None:
+            self.async_set_updated_data({**self.data, **changes})
+        try:
+            result = await self._client.async_set_state(**changes)
+        except SmartfireApiClientSupersededError as err:
+            LOGGER.info("Change %s not sent: %s", changes, err)
+            await self._async_roll_back(previous, changes)
+            return
+        except SmartfireApiClientCommunicationError:
+            await self._async_roll_back(previous, changes)
+            raise
+        version = result.get("version")
+        if seq != self._command_seq:
+            # A newer command is in flight; its response supersedes this one
+            return
+        if version is not None and self.version is not None and version < self.version:
+            # The event stream has already delivered a newer state
+            return
+        self.version = version if version is not None else self.version
+        self.async_set_updated_data(result["state"])
+
+    async def _async_roll_back(self, previous: dict[str, Any], changes: dict[str, Any]) -> None:
+        """Put back fields still showing an unsent change and request a refresh."""
+        if self.data is not None:
+            self.async_set_updated_data(
+                {
+                    **self.data,
+                    **{
+                        field: previous[field]
+                        for field, value in changes.items()
+                        if field in previous and self.data.get(field) == value
+                    },
+                }
+            )
+        await self.async_request_refresh()
+
+    async def async_set_climate(self, **settings: Any) -> None:
+        """Change the server thermostat's mode or setpoint."""
+        self.climate = await self._client.async_set_climate(**settings)
+        self.async_update_listeners()
+
+    async def async_report_temperature(self, temperature: float) -> None:
+        """Push a room temperature reading to the server thermostat."""
+        self.climate = await self._client.async_report_temperature(temperature)
+        self.async_update_listeners()
+
+    async def async_start_sequence(self, steps: list[dict[str, Any]]) -> dict[str, Any]:
+        """Start a timed sequence on the server for this fireplace."""
+        return await self._client.async_start_sequence(steps)
+
+    async def async_cancel_sequences(self, sequence_id: str | None = None) -> None:
+        """Cancel one sequence, or every sequence running for this fireplace."""
+        if sequence_id is not None:
+            await self._client.async_cancel_sequence(sequence_id)
+            return
+        for sequence in await self._client.async_list_sequences():
+            await self._client.async_cancel_sequence(sequence["id"])
+
+    def async_start_stream(self) -> None:
+        """Start following the server's event stream in the background."""
+        self.config_entry.async_create_background_task(
+            self.hass, self._async_follow_stream(), f"{self.name} event stream"
+        )
+
+    async def _async_follow_stream(self) -> None:
+        """Apply pushed state, reconnecting with backoff whenever the stream drops."""
+        delay = STREAM_RECONNECT_MIN
+        while True:
+            try:
+                async for event, payload in self._client.async_stream_state():
+                    self._handle_event(event, payload)
+                    delay = STREAM_RECONNECT_MIN
+            except SmartfireApiClientCommunicationError as err:
+                LOGGER.debug("Event stream unavailable: %s", err)
+
+            if self.stream_connected:
+                LOGGER.info("Smartfire event stream lost, polling every %s", FALLBACK_POLL_INTERVAL)
+                self.stream_connected = False
+                self.update_interval = FALLBACK_POLL_INTERVAL
+                await self.async_request_refresh()
+
+            await self._async_wait_for_change(delay.total_seconds())
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    async def _async_wait_for_change(self, seconds: float) -> None:
+        """Spend a reconnect delay long-polling, applying any change at once."""
+        start = time.monotonic()
+        try:
+            state = await self._client.async_get_state(wait=seconds)
+        except SmartfireApiClientCommunicationError as err:
+            LOGGER.debug("Long-poll unavailable: %s", err)
+            state = None
+        if state is not None and state != self.data:
+            self.version = self._client.state_version
+            self.async_set_updated_data(state)
+            return
+        # Errors, and servers without long-poll support, answer straight away
+        await asyncio.sleep(max(0.0, seconds - (time.monotonic() - start)))
+
+    def _handle_event(self, event: str, payload: dict) -> None:
+        """Apply one snapshot or delta event to the coordinator data."""
+        if event == "snapshot":
+            if not self.stream_connected:
+                LOGGER.debug("Smartfire event stream connected")
+                self.stream_connected = True
+                # Pushes replace polling while the stream is up
+                self.update_interval = None
+            self.version = payload["version"]
+            self.async_set_updated_data(payload["state"])
+        elif event == "delta" and self.data is not None:
+            self.version = payload["version"]
+            self.async_set_updated_data({**self.data, **payload["changes"]})
@@ -0,0 +1,25 @@
+"""Diagnostics support for Smartfire."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DEFAULT_FIREPLACE, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    Every fireplace's client shares the server's circuit breaker, so its
+    state appears once per fireplace with the same values.
+    """
+    coordinators = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": dict(entry.data),
+        "fireplaces": {
+            name or DEFAULT_FIREPLACE: coordinator.diagnostics() for name, coordinator in coordinators.items()
+        },
+    }
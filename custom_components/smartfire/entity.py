@@ -0,0 +1,46 @@
+"""Base entity for Smartfire integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import SmartfireDataUpdateCoordinator
+
+
+class SmartfireEntity(CoordinatorEntity[SmartfireDataUpdateCoordinator]):
+    """An entity backed by one field of the fireplace state.
+
+    All entities read from the coordinator's single GET /state result, so
+    enabling more of them does not add requests.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: SmartfireDataUpdateCoordinator,
+        field: str,
+        name: str,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._field = field
+        self._attr_name = name
+        self._attr_device_info = coordinator.device_info
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{field}"
+
+    @property
+    def available(self) -> bool:
+        """Return True if the field is present in the latest state."""
+        return super().available and self._field in (self.coordinator.data or {})
+
+    @property
+    def field_value(self) -> Any:
+        """Return the current value of this entity's field."""
+        return self.coordinator.data.get(self._field)
+
+    async def async_set_field(self, value: Any) -> None:
+        """Send a new value for this entity's field."""
+        await self.coordinator.async_set_state(**{self._field: value})
@@ -0,0 +1,74 @@
+"""Light platform for Smartfire integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.light import ATTR_BRIGHTNESS, ColorMode, LightEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, MAX_LEVEL
+from .coordinator import SmartfireDataUpdateCoordinator
+from .entity import SmartfireEntity
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Smartfire light from a config entry."""
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities(SmartfireLight(coordinator) for coordinator in coordinators.values())
+
+
+def _level_to_brightness(level: int) -> int:
+    """Map a 1-6 light level to HA brightness (1-255)."""
+    return round(level * 255 / MAX_LEVEL)
+
+
+def _brightness_to_level(brightness: int) -> int:
+    """Map HA brightness (1-255) to the nearest 1-6 light level."""
+    return max(1, min(MAX_LEVEL, round(brightness * MAX_LEVEL / 255)))
+
+
+class SmartfireLight(SmartfireEntity, LightEntity):
+    """The fireplace accent light, dimmable in 6 steps."""
+
+    _attr_color_mode = ColorMode.BRIGHTNESS
+    _attr_supported_color_modes = {ColorMode.BRIGHTNESS}
+
+    def __init__(self, coordinator: SmartfireDataUpdateCoordinator) -> None:
+        """Initialize the light."""
+        super().__init__(coordinator, "light", "Light")
+        self._last_level = MAX_LEVEL
+
+    @property
+    def is_on(self) -> bool:
+        """Return true if the light is on."""
+        return bool(self.field_value)
+
+    @property
+    def brightness(self) -> int | None:
+        """Return the brightness of the light."""
+        level = self.field_value
+        return _level_to_brightness(level) if level else None
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the light on, at the requested or last used level."""
+        if ATTR_BRIGHTNESS in kwargs:
+            level = _brightness_to_level(kwargs[ATTR_BRIGHTNESS])
+        else:
+            level = self.field_value or self._last_level
+        self._last_level = level
+        await self.async_set_field(level)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn the light off."""
+        if self.field_value:
+            self._last_level = self.field_value
+        await self.async_set_field(0)
@@ -0,0 +1,47 @@
+"""Number platform for Smartfire integration."""
+
+from __future__ import annotations
+
+from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, MAX_LEVEL
+from .coordinator import SmartfireDataUpdateCoordinator
+from .entity import SmartfireEntity
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Smartfire numbers from a config entry."""
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities(SmartfireFlameNumber(coordinator) for coordinator in coordinators.values())
+
+
+class SmartfireFlameNumber(SmartfireEntity, NumberEntity):
+    """Flame height, 0 (lowest) to 6."""
+
+    _attr_icon = "mdi:fire"
+    _attr_native_min_value = 0
+    _attr_native_max_value = MAX_LEVEL
+    _attr_native_step = 1
+    _attr_mode = NumberMode.SLIDER
+
+    def __init__(self, coordinator: SmartfireDataUpdateCoordinator) -> None:
+        """Initialize the number."""
+        super().__init__(coordinator, "flame", "Flame")
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the flame level."""
+        return self.field_value
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Set the flame level."""
+        await self.async_set_field(int(value))
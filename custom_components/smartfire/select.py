@@ -0,0 +1,50 @@
+"""Select platform for Smartfire integration."""
+
+from __future__ import annotations
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, MAX_LEVEL
+from .coordinator import SmartfireDataUpdateCoordinator
+from .entity import SmartfireEntity
+
+FAN_OFF = "off"
+FAN_OPTIONS = [FAN_OFF] + [str(level) for level in range(1, MAX_LEVEL + 1)]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Smartfire selects from a config entry."""
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities(SmartfireFanSelect(coordinator) for coordinator in coordinators.values())
+
+
+class SmartfireFanSelect(SmartfireEntity, SelectEntity):
+    """Blower fan speed: off or 1-6."""
+
+    _attr_icon = "mdi:fan"
+    _attr_options = FAN_OPTIONS
+
+    def __init__(self, coordinator: SmartfireDataUpdateCoordinator) -> None:
+        """Initialize the select."""
+        super().__init__(coordinator, "fan", "Fan")
+
+    @property
+    def current_option(self) -> str | None:
+        """Return the fan speed."""
+        level = self.field_value
+        if level is None:
+            return None
+        return FAN_OPTIONS[level] if 0 <= level < len(FAN_OPTIONS) else None
+
+    async def async_select_option(self, option: str) -> None:
+        """Set the fan speed."""
+        await self.async_set_field(FAN_OPTIONS.index(option))
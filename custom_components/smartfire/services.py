@@ -0,0 +1,134 @@
+"""Services for the Smartfire integration.
+
+Timed changes (flame ramps, turning off after a delay, multi-step scenes) run
+as sequences on the Smartfire server, so they keep going through Home
+Assistant restarts and need a single request each.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+
+from .api import SmartfireApiClientCommunicationError
+from .const import DOMAIN, MAX_LEVEL
+from .coordinator import SmartfireDataUpdateCoordinator
+
+SERVICE_RAMP = "ramp"
+SERVICE_TURN_OFF_AFTER = "turn_off_after"
+SERVICE_RUN_SEQUENCE = "run_sequence"
+SERVICE_CANCEL_SEQUENCES = "cancel_sequences"
+
+ATTR_FIELD = "field"
+ATTR_FROM = "from"
+ATTR_TO = "to"
+ATTR_DURATION = "duration"
+ATTR_STEPS = "steps"
+ATTR_SEQUENCE_ID = "sequence_id"
+
+_LEVEL = vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_LEVEL))
+_DEVICES = {vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+
+RAMP_SCHEMA = vol.Schema(
+    {
+        **_DEVICES,
+        vol.Optional(ATTR_FIELD, default="flame"): vol.In(["flame", "fan", "light"]),
+        vol.Optional(ATTR_FROM): _LEVEL,
+        vol.Required(ATTR_TO): _LEVEL,
+        vol.Required(ATTR_DURATION): cv.positive_time_period,
+    }
+)
+TURN_OFF_AFTER_SCHEMA = vol.Schema(
+    {**_DEVICES, vol.Required(ATTR_DURATION): cv.positive_time_period}
+)
+RUN_SEQUENCE_SCHEMA = vol.Schema(
+    {**_DEVICES, vol.Required(ATTR_STEPS): vol.All(cv.ensure_list, [dict])}
+)
+CANCEL_SEQUENCES_SCHEMA = vol.Schema(
+    {**_DEVICES, vol.Optional(ATTR_SEQUENCE_ID): cv.string}
+)
+
+
+def _coordinators(hass: HomeAssistant, call: ServiceCall) -> list[SmartfireDataUpdateCoordinator]:
+    """Return the coordinators of the fireplace devices a service call targets."""
+    registry = dr.async_get(hass)
+    coordinators: list[SmartfireDataUpdateCoordinator] = []
+    for device_id in call.data[ATTR_DEVICE_ID]:
+        device = registry.async_get(device_id)
+        prefixes = {ident for domain, ident in device.identifiers if domain == DOMAIN} if device else set()
+        matches = [
+            coordinator
+            for entry_coordinators in hass.data.get(DOMAIN, {}).values()
+            for coordinator in entry_coordinators.values()
+            if coordinator.unique_id_prefix in prefixes
+        ]
+        if not matches:
+            raise ServiceValidationError(f"{device_id} is not a Smartfire fireplace")
+        coordinators.extend(matches)
+    return coordinators
+
+
+async def _start(hass: HomeAssistant, call: ServiceCall, steps: list[dict[str, Any]]) -> ServiceResponse:
+    """Start the same sequence on every targeted fireplace."""
+    started = []
+    for coordinator in _coordinators(hass, call):
+        try:
+            started.append(await coordinator.async_start_sequence(steps))
+        except SmartfireApiClientCommunicationError as err:
+            raise HomeAssistantError(str(err)) from err
+    return {"sequences": started}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Smartfire services."""
+
+    async def async_ramp(call: ServiceCall) -> ServiceResponse:
+        ramp = {
+            "field": call.data[ATTR_FIELD],
+            "to": call.data[ATTR_TO],
+            "over": call.data[ATTR_DURATION].total_seconds(),
+        }
+        if ATTR_FROM in call.data:
+            ramp["from"] = call.data[ATTR_FROM]
+        return await _start(hass, call, [{"ramp": ramp}])
+
+    async def async_turn_off_after(call: ServiceCall) -> ServiceResponse:
+        return await _start(hass, call, [{"off_after": call.data[ATTR_DURATION].total_seconds()}])
+
+    async def async_run_sequence(call: ServiceCall) -> ServiceResponse:
+        return await _start(hass, call, call.data[ATTR_STEPS])
+
+    async def async_cancel_sequences(call: ServiceCall) -> None:
+        for coordinator in _coordinators(hass, call):
+            try:
+                await coordinator.async_cancel_sequences(call.data.get(ATTR_SEQUENCE_ID))
+            except SmartfireApiClientCommunicationError as err:
+                raise HomeAssistantError(str(err)) from err
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_RAMP, async_ramp, RAMP_SCHEMA, SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TURN_OFF_AFTER,
+        async_turn_off_after,
+        TURN_OFF_AFTER_SCHEMA,
+        SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RUN_SEQUENCE,
+        async_run_sequence,
+        RUN_SEQUENCE_SCHEMA,
+        SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CANCEL_SEQUENCES, async_cancel_sequences, CANCEL_SEQUENCES_SCHEMA
+    )
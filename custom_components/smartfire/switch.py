@@ -4,12 +4,14 @@ from __future__ import annotations
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import SmartfireDataUpdateCoordinator
+from .entity import SmartfireEntity
 
 
 async def async_setup_entry(
@@ -18,8 +20,26 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the Smartfire switch from a config entry."""
-    coordinator: SmartfireDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
-    async_add_entities([SmartfireSwitch(coordinator)])
+    coordinators: dict[str | None, SmartfireDataUpdateCoordinator] = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    entities: list[SwitchEntity] = []
+    for coordinator in coordinators.values():
+        entities.extend(
+            [
+                SmartfireSwitch(coordinator),
+                SmartfireFieldSwitch(coordinator, "front", "Front burner", "mdi:fireplace"),
+                SmartfireFieldSwitch(coordinator, "aux", "Aux outlet", "mdi:power-socket-us"),
+                SmartfireFieldSwitch(
+                    coordinator,
+                    "pilot",
+                    "Pilot",
+                    "mdi:fire-circle",
+                    EntityCategory.CONFIG,
+                ),
+            ]
+        )
+    async_add_entities(entities)
 
 
 class SmartfireSwitch(CoordinatorEntity[SmartfireDataUpdateCoordinator], SwitchEntity):
@@ -27,13 +47,12 @@ class SmartfireSwitch(CoordinatorEntity[SmartfireDataUpdateCoordinator], SwitchE
 
     _attr_has_entity_name = True
     _attr_name = "Fireplace"
-    _attr_unique_id = "smartfire_power"
 
     def __init__(self, coordinator: SmartfireDataUpdateCoordinator) -> None:
         """Initialize the switch."""
         super().__init__(coordinator)
         self._attr_device_info = coordinator.device_info
-        self._attr_unique_id = f"{coordinator.config_entry.entry_id}_power"
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_power"
 
     @property
     def is_on(self) -> bool:
@@ -43,9 +62,37 @@ class SmartfireSwitch(CoordinatorEntity[SmartfireDataUpdateCoordinator], SwitchE
     async def async_turn_on(self, **kwargs: object) -> None:
         """Turn the fireplace on."""
         await self.coordinator.async_set_power(True)
-        await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self, **kwargs: object) -> None:
         """Turn the fireplace off."""
         await self.coordinator.async_set_power(False)
-        await self.coordinator.async_request_refresh()
+
+
+class SmartfireFieldSwitch(SmartfireEntity, SwitchEntity):
+    """A fireplace on/off feature other than main power."""
+
+    def __init__(
+        self,
+        coordinator: SmartfireDataUpdateCoordinator,
+        field: str,
+        name: str,
+        icon: str,
+        entity_category: EntityCategory | None = None,
+    ) -> None:
+        """Initialize the switch."""
+        super().__init__(coordinator, field, name)
+        self._attr_icon = icon
+        self._attr_entity_category = entity_category
+
+    @property
+    def is_on(self) -> bool:
+        """Return true if the feature is on."""
+        return bool(self.field_value)
+
+    async def async_turn_on(self, **kwargs: object) -> None:
+        """Turn the feature on."""
+        await self.async_set_field(True)
+
+    async def async_turn_off(self, **kwargs: object) -> None:
+        """Turn the feature off."""
+        await self.async_set_field(False)
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+bench_codec.py: Packet build throughput and transmit wall time on a fake radio.
+
+Measures Fireplace.build_packet (cached table lookups), cold PacketCodec
+encoding of every state, and the wall time of send_packet (loop mode) and
+send_burst with a simulated USB latency per RFxmit call.  Prints one JSON
+object per measurement.
+
+    python3 benchmarks/bench_codec.py --latency 0.005 --sends 50
+"""
+
+import argparse
+import json
+import time
+
+import fakeradio
+from bench_http import percentile
+
+
+def bench_build(iterations):
+    from codec import all_keys
+    from fireplace import Fireplace
+
+    fp = Fireplace()
+    # Build each packet once first so this measures the cached steady state
+    for flame in range(7):
+        fp._state = fp._state.replace(flame=flame)  # pylint: disable=protected-access
+        fp.build_packet()
+    keys = list(all_keys())
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        fp._state = fp._state.replace(flame=i % 7)  # pylint: disable=protected-access
+        fp.build_packet()
+    build_elapsed = time.perf_counter() - start
+
+    codec = fp._codec  # pylint: disable=protected-access
+    start = time.perf_counter()
+    for key in keys:
+        codec.encode(key)
+    encode_elapsed = time.perf_counter() - start
+
+    return [
+        {
+            "benchmark": "build_packet",
+            "iterations": iterations,
+            "builds_per_sec": round(iterations / build_elapsed, 1),
+        },
+        {
+            "benchmark": "encode_all_states",
+            "states": len(keys),
+            "states_per_sec": round(len(keys) / encode_elapsed, 1),
+        },
+    ]
+
+
+def bench_send(sends, latency):
+    from fireplace import TX_MODE_BURST, TX_MODE_LOOP, Fireplace
+
+    results = []
+    for mode in (TX_MODE_LOOP, TX_MODE_BURST):
+        fp = Fireplace(tx_mode=mode)
+        fp.transmit()  # open the fake radio outside the timed loop
+        durations = []
+        for i in range(sends):
+            fp._state = fp._state.replace(flame=i % 7)  # pylint: disable=protected-access
+            start = time.perf_counter()
+            fp.transmit()
+            durations.append(time.perf_counter() - start)
+        durations.sort()
+        results.append(
+            {
+                "benchmark": "transmit_wall_time",
+                "mode": mode,
+                "usb_latency": latency,
+                "sends": sends,
+                "p50_ms": round(percentile(durations, 50) * 1000, 3),
+                "p99_ms": round(percentile(durations, 99) * 1000, 3),
+                "nominal_ms": round(fp.last_transmit["nominal_seconds"] * 1000, 3),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--sends", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated USB latency per RFxmit")
+    parser.add_argument("--airtime", action="store_true", help="also simulate time on air")
+    args = parser.parse_args()
+
+    fakeradio.install(tx_latency=args.latency, simulate_airtime=args.airtime)
+    for result in bench_build(args.iterations) + bench_send(args.sends, args.latency):
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""
+bench_decoder.py: Decode speed and accuracy on captures built by the encoder.
+
+Synthesizes receive captures like the YardStick returns them: random noise,
+then a burst for a random serial and state starting at a random bit offset,
+cut to the receive block size.  Checks every capture decodes to the state that
+was encoded and reports captures/sec against the 2400 bit/s air rate.  With
+--capture FILE it decodes a raw recorded capture instead and prints the
+packets found.
+
+    python3 benchmarks/bench_decoder.py --captures 5000
+    python3 benchmarks/bench_decoder.py --capture recording.bin
+"""
+
+import argparse
+import json
+import random
+import time
+
+import fakeradio
+
+
+def synthesize(rng, codecs, keys, size):
+    """Return (capture bytes, serial, key) with one burst at a random bit offset."""
+    codec = rng.choice(codecs)
+    key = rng.choice(keys)
+    burst = codec.burst(key)
+    lead_bits = rng.randrange(8, 96)
+    noise = rng.getrandbits(lead_bits)
+    bits = (noise << len(burst) * 8 | int.from_bytes(burst, "big")) >> lead_bits % 8
+    data = bits.to_bytes((lead_bits // 8) + len(burst), "big")
+    return data[:size], codec.serial, key
+
+
+def bench(captures, seed):
+    from codec import all_keys, decode_capture, get_codec
+    from receiver import RECV_BYTES
+
+    rng = random.Random(seed)
+    codecs = [get_codec([format(rng.getrandbits(9), "09b") for _ in range(3)]) for _ in range(8)]
+    keys = list(all_keys())
+    samples = [synthesize(rng, codecs, keys, RECV_BYTES) for _ in range(captures)]
+
+    correct = 0
+    start = time.perf_counter()
+    for data, serial, key in samples:
+        for _, found_serial, found_key in decode_capture(data):
+            if found_serial == serial and found_key == key:
+                correct += 1
+            break
+    elapsed = time.perf_counter() - start
+
+    bits = captures * RECV_BYTES * 8
+    return {
+        "benchmark": "decode_capture",
+        "captures": captures,
+        "capture_bytes": RECV_BYTES,
+        "decoded": correct,
+        "captures_per_sec": round(captures / elapsed, 1),
+        "realtime_factor": round(bits / elapsed / 2400.0, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--captures", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--capture", help="decode a raw capture file instead")
+    args = parser.parse_args()
+
+    fakeradio.install()
+    if args.capture:
+        from codec import decode_capture, unpack_state
+
+        with open(args.capture, "rb") as f:
+            data = f.read()
+        for offset, serial, key in decode_capture(data):
+            print(json.dumps({"bit": offset, "serial": ",".join(serial), "state": unpack_state(key)}))
+        return
+    print(json.dumps(bench(args.captures, args.seed)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
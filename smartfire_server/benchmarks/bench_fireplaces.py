@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+"""
+bench_fireplaces.py: Transmit scheduler throughput with several fireplaces on one radio.
+
+Registers N fireplaces on one RadioWorker backed by a fake radio, then has
+client threads send random flame changes to random fireplaces for a fixed
+time.  Prints one JSON object per fireplace count with commands/sec,
+transmissions/sec and the spread of transmissions across fireplaces.
+
+    python3 benchmarks/bench_fireplaces.py --units 1,4,16 --latency 0.005
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import fakeradio
+
+
+def bench(units, clients, seconds):
+    from fireplace import Fireplace, Radio
+    from transmitter import RadioWorker, TransmitQueueFull
+
+    radio = Radio()
+    worker = RadioWorker(maxsize=clients * 2)
+    names = ["fp%d" % i for i in range(units)]
+    for i, name in enumerate(names):
+        serial = [format(i, "09b"), "011110100", "000000100"]
+        worker.add_fireplace(name, Fireplace(serial=serial, radio=radio))
+    worker.start()
+
+    completed = [0] * clients
+    rejected = [0] * clients
+    stop_at = time.perf_counter() + seconds
+
+    def client(index):
+        rng = random.Random(index)
+        while time.perf_counter() < stop_at:
+            try:
+                future = worker.submit(rng.choice(names), flame=rng.randint(0, 6))
+            except TransmitQueueFull:
+                rejected[index] += 1
+                time.sleep(0.001)
+                continue
+            future.result()
+            completed[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    worker.stop()
+
+    per_unit = list(worker.stats["per_fireplace"].values())
+    return {
+        "benchmark": "scheduler_throughput",
+        "units": units,
+        "clients": clients,
+        "commands": sum(completed),
+        "commands_per_sec": round(sum(completed) / elapsed, 1),
+        "transmissions_per_sec": round(worker.stats["transmitted"] / elapsed, 1),
+        "rejected": sum(rejected),
+        "min_per_unit": min(per_unit),
+        "max_per_unit": max(per_unit),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--units", default="1,4,16")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated USB latency per RFxmit")
+    parser.add_argument("--airtime", action="store_true", help="also simulate time on air")
+    args = parser.parse_args()
+
+    fakeradio.install(tx_latency=args.latency, simulate_airtime=args.airtime)
+    for units in (int(u) for u in args.units.split(",")):
+        print(json.dumps(bench(units, args.clients, args.seconds)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
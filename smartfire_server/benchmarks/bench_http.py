@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""
+bench_http.py: Compare the Flask and asyncio servers under concurrent pollers.
+
+Starts each server in a subprocess with a fake radio, then runs N client
+threads issuing keep-alive GET requests for a fixed time.  Prints one JSON
+object per server with requests/sec and latency percentiles.
+
+    python3 benchmarks/bench_http.py --pollers 32 --seconds 10
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+
+def _serve(kind, port, latency=0.0, open_latency=0.0, workers=1):
+    """Subprocess entry point: run one server implementation on a port."""
+    import fakeradio
+
+    fakeradio.install(tx_latency=latency, open_latency=open_latency)
+    import server
+
+    server.main(host="127.0.0.1", port=port, http_server=kind, http_workers=workers)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/power")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server on port %d did not start" % port)
+
+
+def _poller(port, path, stop_at, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        if response.getheader("Connection", "").lower() == "close":
+            conn.close()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1)
+    return sorted_values[max(index, 0)]
+
+
+def start_server(kind, latency=0.0, workers=1):
+    """Start a server subprocess on a free port; returns (process, port) once it answers."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--serve",
+            kind,
+            "--port",
+            str(port),
+            "--latency",
+            str(latency),
+            "--workers",
+            str(workers),
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port)
+    except Exception:
+        proc.terminate()
+        raise
+    return proc, port
+
+
+def bench(kind, pollers, seconds, path):
+    proc, port = start_server(kind)
+    try:
+        per_thread = [[] for _ in range(pollers)]
+        stop_at = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=_poller, args=(port, path, stop_at, lat)) for lat in per_thread
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(l for lat in per_thread for l in lat)
+    return {
+        "benchmark": "http_poll",
+        "server": kind,
+        "path": path,
+        "pollers": pollers,
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pollers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--path", default="/power")
+    parser.add_argument("--servers", default="flask,asyncio")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--latency", type=float, default=0.0, help=argparse.SUPPRESS)
+    parser.add_argument("--open-latency", type=float, default=0.0, help=argparse.SUPPRESS)
+    parser.add_argument("--workers", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.port, args.latency, args.open_latency, args.workers)
+        return
+    for kind in args.servers.split(","):
+        print(json.dumps(bench(kind, args.pollers, args.seconds, args.path)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+bench_priority.py: Latency of urgent (power or pilot off) commands under cosmetic load.
+
+Registers N fireplaces on one RadioWorker backed by a fake radio and keeps the
+queue busy with random flame, fan and light changes from client threads,
+while one thread turns a random fireplace off every --interval seconds.
+Prints one JSON object per fireplace count with the p50/p99 time from submit
+to the end of the transmission for each priority.
+
+    python3 benchmarks/bench_priority.py --units 1,4,16 --latency 0.005
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import fakeradio
+from bench_http import percentile
+
+COSMETIC_FIELDS = ("flame", "fan", "light")
+
+
+def bench(units, clients, seconds, interval):
+    from fireplace import Fireplace, Radio
+    from transmitter import RadioWorker, TransmitQueueFull
+
+    radio = Radio()
+    worker = RadioWorker(maxsize=clients * 2)
+    names = ["fp%d" % i for i in range(units)]
+    for i, name in enumerate(names):
+        serial = [format(i, "09b"), "011110100", "000000100"]
+        worker.add_fireplace(name, Fireplace(serial=serial, radio=radio))
+    worker.start()
+
+    normal = [[] for _ in range(clients)]
+    urgent = []
+    stop_at = time.perf_counter() + seconds
+
+    def client(index):
+        rng = random.Random(index)
+        while time.perf_counter() < stop_at:
+            values = {"power": True, rng.choice(COSMETIC_FIELDS): rng.randint(1, 6)}
+            started = time.perf_counter()
+            try:
+                future = worker.submit(rng.choice(names), **values)
+            except TransmitQueueFull:
+                time.sleep(0.001)
+                continue
+            future.result()
+            normal[index].append(time.perf_counter() - started)
+
+    def power_off():
+        rng = random.Random(-1)
+        while time.perf_counter() < stop_at:
+            time.sleep(interval)
+            started = time.perf_counter()
+            worker.submit(rng.choice(names), power=False).result()
+            urgent.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=power_off))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    worker.stop()
+
+    normal = sorted(l for latencies in normal for l in latencies)
+    urgent.sort()
+    return {
+        "benchmark": "priority_latency",
+        "units": units,
+        "clients": clients,
+        "normal_commands": len(normal),
+        "urgent_commands": len(urgent),
+        "normal_p50_ms": round(percentile(normal, 50) * 1000, 3),
+        "normal_p99_ms": round(percentile(normal, 99) * 1000, 3),
+        "urgent_p50_ms": round(percentile(urgent, 50) * 1000, 3),
+        "urgent_p99_ms": round(percentile(urgent, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--units", default="1,4,16")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between power-off commands")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated USB latency per RFxmit")
+    parser.add_argument("--airtime", action="store_true", help="also simulate time on air")
+    args = parser.parse_args()
+
+    fakeradio.install(tx_latency=args.latency, simulate_airtime=args.airtime)
+    for units in (int(u) for u in args.units.split(",")):
+        print(json.dumps(bench(units, args.clients, args.seconds, args.interval)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
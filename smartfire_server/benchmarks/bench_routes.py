@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""
+bench_routes.py: End-to-end latency of every REST route on a fake radio.
+
+Starts each server in a subprocess whose fake YardStick adds a simulated USB
+latency to every RFxmit, then issues sequential keep-alive requests against
+each GET and PUT route (PUTs alternate values so every one is transmitted).
+Prints one JSON object per server, method and route.
+
+    python3 benchmarks/bench_routes.py --requests 200 --latency 0.005
+"""
+
+import argparse
+import http.client
+import json
+import time
+
+from bench_http import percentile, start_server
+
+FLAG_ROUTES = ("/pilot", "/thermostat", "/power", "/front", "/aux")
+LEVEL_ROUTES = ("/light", "/fan", "/flame")
+GET_ROUTES = ("/state", "/serial", "/fireplaces", "/health", "/metrics") + FLAG_ROUTES + LEVEL_ROUTES
+
+
+def _put_bodies(route):
+    """Two alternating request bodies for a PUT route."""
+    if route in FLAG_ROUTES:
+        return [b"True", b"False"]
+    if route in LEVEL_ROUTES:
+        return [b"1", b"2"]
+    return [json.dumps({"flame": 1}).encode(), json.dumps({"flame": 2}).encode()]
+
+
+def _time_route(conn, method, route, requests):
+    bodies = _put_bodies(route) if method != "GET" else [None]
+    latencies = []
+    for i in range(requests):
+        body = bodies[i % len(bodies)]
+        start = time.perf_counter()
+        conn.request(method, route, body=body)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            raise RuntimeError("%s %s returned %d" % (method, route, response.status))
+    return sorted(latencies)
+
+
+def bench(kind, requests, latency):
+    proc, port = start_server(kind, latency)
+    results = []
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        plan = [("GET", route) for route in GET_ROUTES]
+        plan += [("PUT", route) for route in ("/state",) + FLAG_ROUTES + LEVEL_ROUTES]
+        plan.append(("PATCH", "/state"))
+        for method, route in plan:
+            latencies = _time_route(conn, method, route, requests)
+            results.append(
+                {
+                    "benchmark": "http_route",
+                    "server": kind,
+                    "method": method,
+                    "route": route,
+                    "usb_latency": latency,
+                    "requests": requests,
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+                }
+            )
+        conn.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated USB latency per RFxmit")
+    parser.add_argument("--servers", default="flask,asyncio")
+    args = parser.parse_args()
+
+    for kind in args.servers.split(","):
+        for result in bench(kind, args.requests, args.latency):
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
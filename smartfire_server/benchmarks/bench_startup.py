@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""
+bench_startup.py: Time from launch until the server answers and is warmed up.
+
+Measures how long `import server` takes in a fresh interpreter (the routes
+only; the radio, state files and threads are built by main()), then starts
+each HTTP server in a subprocess (with a fake radio that takes --open-latency
+seconds to come up, like USB enumeration) and polls /health, reporting the
+time to the first 200 response and the time until it stops reporting
+"warming".
+
+    python3 benchmarks/bench_startup.py --runs 5 --open-latency 1.5
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_http import _free_port
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SCRIPT = """
+import time
+import fakeradio
+fakeradio.install()
+start = time.perf_counter()
+import server
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds():
+    """Seconds `import server` takes in a new interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=HERE,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ).stdout
+    return float(output.split()[-1])
+
+
+def _health(port):
+    """Return /health's status field, or None if the server does not answer yet."""
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        conn.request("GET", "/health")
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+    except OSError:
+        return None
+    if response.status != 200:
+        return None
+    return json.loads(body)["status"]
+
+
+def launch(kind, open_latency, timeout=30):
+    """Start a server and return (seconds to first 200, seconds until warm)."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(HERE, "bench_http.py"),
+            "--serve",
+            kind,
+            "--port",
+            str(port),
+            "--open-latency",
+            str(open_latency),
+        ],
+        cwd=HERE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    first = None
+    try:
+        while time.perf_counter() - started < timeout:
+            status = _health(port)
+            if status is not None and first is None:
+                first = time.perf_counter() - started
+            if status == "ok":
+                return first, time.perf_counter() - started
+            time.sleep(0.01)
+        raise RuntimeError("%s server did not warm up within %ds" % (kind, timeout))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--open-latency", type=float, default=1.0, help="simulated YardStick open time (s)")
+    parser.add_argument("--servers", default="flask,asyncio")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(
+        json.dumps(
+            {
+                "benchmark": "startup_import",
+                "runs": args.runs,
+                "import_ms": round(statistics.median(imports) * 1000, 1),
+            }
+        ),
+        flush=True,
+    )
+    for kind in args.servers.split(","):
+        runs = [launch(kind, args.open_latency) for _ in range(args.runs)]
+        print(
+            json.dumps(
+                {
+                    "benchmark": "startup",
+                    "server": kind,
+                    "runs": args.runs,
+                    "open_latency_s": args.open_latency,
+                    "first_200_ms": round(statistics.median(r[0] for r in runs) * 1000, 1),
+                    "warm_ms": round(statistics.median(r[1] for r in runs) * 1000, 1),
+                }
+            ),
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+bench_workers.py: Read throughput of the multi-process front end by worker count.
+
+Starts the server with http_workers set to each count (1 means the plain
+asyncio server, without front ends) and polls GET /state from several client
+processes, so the load generator is not limited by one interpreter either.
+Prints one JSON object per worker count.  Scaling needs as many free CPU
+cores as front ends plus client processes.
+
+    python3 benchmarks/bench_workers.py --workers 1,2,4 --clients 4 --seconds 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from bench_http import _poller, percentile, start_server
+
+# Seconds for every front end to connect to the owner and bind the port
+SETTLE_SECONDS = 2
+
+
+def _client(args):
+    """One client process: run pollers on threads and return their latencies."""
+    port, path, seconds, threads = args
+    per_thread = [[] for _ in range(threads)]
+    stop_at = time.perf_counter() + seconds
+    pollers = [threading.Thread(target=_poller, args=(port, path, stop_at, lat)) for lat in per_thread]
+    for t in pollers:
+        t.start()
+    for t in pollers:
+        t.join()
+    return [l for lat in per_thread for l in lat]
+
+
+def bench(workers, clients, threads, seconds, path):
+    proc, port = start_server("asyncio", workers=workers)
+    try:
+        if workers > 1:
+            time.sleep(SETTLE_SECONDS)
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            results = pool.map(_client, [(port, path, seconds, threads)] * clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(l for result in results for l in result)
+    return {
+        "benchmark": "http_workers",
+        "workers": workers,
+        "path": path,
+        "clients": clients * threads,
+        "cpus": os.cpu_count(),
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--threads", type=int, default=8, help="polling threads per client process")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--path", default="/state")
+    args = parser.parse_args()
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        print(json.dumps(bench(workers, args.clients, args.threads, args.seconds, args.path)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
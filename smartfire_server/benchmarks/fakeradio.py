@@ -0,0 +1,103 @@
+"""
+fakeradio.py: Stand-in for rflib so the controller runs without a YardStick.
+
+install() registers a fake ``rflib`` module and puts smartfire_controller on
+sys.path, so benchmarks can import the controller modules the same way the
+add-on does (``from fireplace import Fireplace``).  Captures queued with
+FakeRfCat.captures.append() are returned by RFrecv, as if heard on air.
+"""
+
+import collections
+import os
+import sys
+import time
+import types
+
+CONTROLLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "smartfire_controller")
+
+
+BAUD_RATE = 2400
+SYNCM_CARRIER = 4
+
+
+class ChipconUsbTimeoutException(Exception):
+    """Raised by RFrecv when nothing was received before the timeout."""
+
+
+class FakeRfCat:
+    """Records transmissions instead of sending them.
+
+    tx_latency simulates the USB round-trip of each RFxmit call; with
+    simulate_airtime each call also blocks for the data's time on air.
+    open_latency simulates finding and configuring the dongle.
+    """
+
+    tx_latency = 0.0
+    open_latency = 0.0
+    simulate_airtime = False
+    captures = collections.deque()
+
+    def __init__(self, *args, **kwargs):
+        if self.open_latency:
+            time.sleep(self.open_latency)
+        self.transmissions = 0
+        self.bytes_sent = 0
+        self.sync_mode = 2
+
+    def setFreq(self, freq):
+        pass
+
+    def setMdmModulation(self, mod):
+        pass
+
+    def setMdmDRate(self, rate):
+        pass
+
+    def setModeIDLE(self):
+        pass
+
+    def getMdmSyncMode(self):
+        return self.sync_mode
+
+    def setMdmSyncMode(self, mode):
+        self.sync_mode = mode
+
+    def makePktFLEN(self, length):
+        pass
+
+    def RFrecv(self, timeout=1000, blocksize=None):
+        try:
+            return self.captures.popleft(), time.time()
+        except IndexError:
+            time.sleep(timeout / 1000.0)
+            raise ChipconUsbTimeoutException("timeout")
+
+    def ping(self, count=10, buf=b"", wait=1000, silent=False):
+        return count, 0, 0.0
+
+    def cleanup(self):
+        pass
+
+    def RFxmit(self, data, repeat=0, offset=0):
+        delay = self.tx_latency
+        if self.simulate_airtime:
+            delay += len(data) * 8 / float(BAUD_RATE)
+        if delay:
+            time.sleep(delay)
+        self.transmissions += 1
+        self.bytes_sent += len(data)
+
+
+def install(tx_latency=0.0, simulate_airtime=False, open_latency=0.0):
+    """Register the fake rflib module and make the controller importable."""
+    FakeRfCat.tx_latency = tx_latency
+    FakeRfCat.open_latency = open_latency
+    FakeRfCat.simulate_airtime = simulate_airtime
+    module = types.ModuleType("rflib")
+    module.RfCat = FakeRfCat
+    module.MOD_ASK_OOK = 0x30
+    module.SYNCM_CARRIER = SYNCM_CARRIER
+    module.ChipconUsbTimeoutException = ChipconUsbTimeoutException
+    sys.modules["rflib"] = module
+    if CONTROLLER_DIR not in sys.path:
+        sys.path.insert(0, CONTROLLER_DIR)
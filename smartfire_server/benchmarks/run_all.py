@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+"""
+run_all.py: Run every benchmark and save the results as one JSON document.
+
+Each bench_*.py script prints JSON lines; this collects them together with the
+add-on version and Python version into a results file.  Given --baseline (a
+results file from an earlier release) it compares every *_per_sec (higher is
+better) and *_ms (lower is better) value of matching results and exits with
+status 1 if any got worse by more than --threshold.
+
+    python3 benchmarks/run_all.py --output results.json
+    python3 benchmarks/run_all.py --baseline results-1.0.7.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(HERE, "..", "config.yaml")
+
+# Script and arguments for each suite; --quick shortens every run
+SUITES = {
+    "codec": ["bench_codec.py"],
+    "decoder": ["bench_decoder.py"],
+    "routes": ["bench_routes.py"],
+    "http": ["bench_http.py"],
+    "fireplaces": ["bench_fireplaces.py"],
+    "startup": ["bench_startup.py"],
+    "workers": ["bench_workers.py"],
+    "priority": ["bench_priority.py"],
+}
+QUICK_ARGS = {
+    "codec": ["--iterations", "20000", "--sends", "10"],
+    "decoder": ["--captures", "1000"],
+    "routes": ["--requests", "30"],
+    "http": ["--seconds", "2"],
+    "fireplaces": ["--seconds", "2"],
+    "startup": ["--runs", "1"],
+    "workers": ["--seconds", "2"],
+    "priority": ["--seconds", "2"],
+}
+
+# Fields that identify a result rather than measure it
+PARAM_FIELDS = ("benchmark", "server", "method", "route", "path", "mode", "units", "clients", "pollers", "workers")
+
+
+def addon_version():
+    with open(CONFIG_PATH) as f:
+        for line in f:
+            if line.startswith("version:"):
+                return line.split(":", 1)[1].strip().strip('"')
+    return None
+
+
+def run_suite(name, quick):
+    command = [sys.executable, os.path.join(HERE, SUITES[name][0])] + SUITES[name][1:]
+    if quick:
+        command += QUICK_ARGS[name]
+    output = subprocess.run(command, cwd=HERE, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+
+
+def result_key(result):
+    return tuple((field, result[field]) for field in PARAM_FIELDS if field in result)
+
+
+def compare(results, baseline, threshold):
+    """Return a description of each value that regressed by more than threshold."""
+    previous = {result_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for field, value in result.items():
+            before = old.get(field)
+            if not isinstance(value, (int, float)) or not before:
+                continue
+            if field.endswith("_per_sec"):
+                change = (before - value) / before
+            elif field.endswith("_ms"):
+                change = (value - before) / before
+            else:
+                continue
+            if change > threshold:
+                label = " ".join(str(v) for _, v in result_key(result))
+                regressions.append("%s %s: %s -> %s (%.0f%% worse)" % (label, field, before, value, change * 100))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--suites", default=",".join(SUITES), help="comma-separated: " + ", ".join(SUITES))
+    parser.add_argument("--quick", action="store_true", help="shorter runs, e.g. for CI")
+    parser.add_argument("--output", default="-", help="results file (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.suites.split(","):
+        print("Running %s benchmarks..." % name, file=sys.stderr, flush=True)
+        results.extend(run_suite(name, args.quick))
+
+    document = {
+        "version": addon_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+        "quick": args.quick,
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
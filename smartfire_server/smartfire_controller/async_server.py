@@ -0,0 +1,361 @@
+"""
+async_server.py: asyncio (aiohttp) front end for the Proflame 2 REST server.
+
+Serves the same routes as the Flask app in server.py.  Reads are answered on
+the event loop straight from the in-memory fireplace state; anything that
+touches the radio runs on the RadioWorker thread and is awaited without
+blocking the loop.
+"""
+
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from events import (
+    EVENT_SNAPSHOT,
+    KEEPALIVE_INTERVAL,
+    KEEPALIVE_SSE,
+    SUBSCRIBER_BACKLOG,
+    format_sse,
+)
+from fireplace import RadioUnavailable
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from routes import (
+    COMMAND_TIMEOUT,
+    ERROR_HINT,
+    FIELD_PARSERS,
+    UnknownFireplace,
+    command_source,
+    etag_matches,
+    fireplaces_payload,
+    health_payload,
+    history_payload,
+    lookup_fireplace,
+    observe_request,
+    parse_history_query,
+    parse_json_object,
+    parse_long_poll,
+    parse_sequence_body,
+    parse_state_body,
+    parse_temperature_body,
+    state_headers,
+    target_state,
+    wants_force,
+    wants_wait,
+)
+from sequences import UnknownSequence
+from transmitter import CommandSuperseded
+
+logger = logging.getLogger(__name__)
+
+WORKER_KEY = web.AppKey("worker")
+BROADCASTERS_KEY = web.AppKey("broadcasters")
+SEQUENCES_KEY = web.AppKey("sequences")
+THERMOSTAT_KEY = web.AppKey("thermostat")
+HISTORY_KEY = web.AppKey("history")
+# Tasks serving /events, ended on shutdown so it does not wait for clients to leave
+STREAMS_KEY = web.AppKey("streams")
+
+# Every route is served for the default fireplace and under /fireplaces/{name}
+ROUTE_PREFIXES = ("", "/fireplaces/{name}")
+
+
+@web.middleware
+async def _metrics_middleware(request, handler):
+    """Record each request's latency by route pattern."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        observe_request(route, request.method, status, time.perf_counter() - start, request.query)
+
+
+@web.middleware
+async def _error_middleware(request, handler):
+    """Map errors to the same JSON responses as the Flask app."""
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise
+    except (UnknownFireplace, UnknownSequence) as e:
+        return web.json_response({"error": str(e)}, status=404)
+    except RadioUnavailable as e:
+        return web.json_response({"error": str(e), "hint": ERROR_HINT}, status=503)
+    except CommandSuperseded as e:
+        return web.json_response({"error": str(e), "superseded": True}, status=409)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Unhandled error: %s", e)
+        return web.json_response({"error": str(e), "hint": ERROR_HINT}, status=503)
+
+
+def _fireplace(request):
+    """The fireplace named in the route, or the default one."""
+    return lookup_fireplace(request.app[WORKER_KEY], request.match_info.get("name"))
+
+
+async def _command(request, **values):
+    """Queue a state change and await it unless the caller passed ?wait=false."""
+    fp = _fireplace(request)
+    future = request.app[WORKER_KEY].submit(
+        request.match_info.get("name"),
+        force=wants_force(request.query),
+        source=command_source(request.match_info.route.resource.canonical),
+        **values,
+    )
+    if not wants_wait(request.query):
+        return target_state(fp, values), None, 202
+    current, version = await asyncio.wait_for(asyncio.wrap_future(future), COMMAND_TIMEOUT)
+    return current, version, 200
+
+
+def _broadcaster(request):
+    """The StateBroadcaster of the fireplace in the route, or the default one."""
+    worker = request.app[WORKER_KEY]
+    return request.app[BROADCASTERS_KEY][request.match_info.get("name", worker.names[0])]
+
+
+async def _wait_for_version(broadcaster, since, seconds):
+    """Wait on the loop until the broadcaster's version differs from since, or time out."""
+    loop = asyncio.get_running_loop()
+    changed = loop.create_future()
+
+    def resolve():
+        if not changed.done():
+            changed.set_result(None)
+
+    token = broadcaster.watch(since, lambda: loop.call_soon_threadsafe(resolve))
+    try:
+        await asyncio.wait_for(changed, seconds)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        broadcaster.unwatch(token)
+
+
+async def _state(request):
+    """Get or set the whole fireplace state at one time.
+
+    GET supports If-None-Match and ?wait=<seconds>&since=<version> long-polls.
+    """
+    fp = _fireplace(request)
+    if request.method == "GET":
+        broadcaster = _broadcaster(request)
+        current, version = broadcaster.current()
+        seconds, since = parse_long_poll(request.query, version)
+        if seconds and version == since:
+            await _wait_for_version(broadcaster, since, seconds)
+            current, version = broadcaster.current()
+        headers = state_headers(current, version)
+        if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return web.Response(status=304, headers=headers)
+        return web.json_response(broadcaster.state_dict(current), headers=headers)
+    current, version, status = await _command(
+        request, **parse_state_body(await request.read(), fp.serial)
+    )
+    if request.method == "PATCH":
+        return web.json_response({"state": current, "version": version}, status=status)
+    return web.json_response(current, status=status)
+
+
+async def _serial(request):
+    """Return the serial number."""
+    return web.Response(text=str(_fireplace(request).serial))
+
+
+async def _fireplaces(request):
+    """List the configured fireplaces with their serials, states and versions."""
+    return web.json_response(fireplaces_payload(request.app[WORKER_KEY]))
+
+
+def _field_handler(field, parse):
+    """Build the GET/PUT handler for a single-field route such as /flame."""
+
+    async def handler(request):
+        if request.method == "GET":
+            return web.Response(text=str(getattr(_fireplace(request), field)))
+        current, _, status = await _command(request, **{field: parse(await request.read())})
+        return web.Response(text=str(current[field]), status=status)
+
+    return handler
+
+
+async def _events(request):
+    """Stream state changes as server-sent events (snapshot, then deltas)."""
+    _fireplace(request)
+    broadcaster = _broadcaster(request)
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(SUBSCRIBER_BACKLOG)
+
+    def deliver(event, payload):
+        try:
+            pending.put_nowait((event, payload))
+        except asyncio.QueueFull:
+            # Stalled client: stop feeding it; the stream ends once it drains
+            broadcaster.unsubscribe(token)
+
+    token, snapshot = broadcaster.subscribe(
+        lambda event, payload: loop.call_soon_threadsafe(deliver, event, payload)
+    )
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+    streams = request.app[STREAMS_KEY]
+    streams.add(asyncio.current_task())
+    try:
+        await response.prepare(request)
+        await response.write(format_sse(EVENT_SNAPSHOT, snapshot).encode())
+        while True:
+            try:
+                event, payload = await asyncio.wait_for(pending.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if not broadcaster.is_subscribed(token):
+                    break
+                await response.write(KEEPALIVE_SSE.encode())
+                continue
+            await response.write(format_sse(event, payload).encode())
+    except ConnectionResetError:
+        pass
+    finally:
+        streams.discard(asyncio.current_task())
+        broadcaster.unsubscribe(token)
+    return response
+
+
+async def _close_streams(app):
+    for task in list(app[STREAMS_KEY]):
+        task.cancel()
+
+
+async def _metrics(request):
+    """Prometheus metrics: transmit, packet build, radio and HTTP latencies and counters."""
+    return web.Response(body=REGISTRY.render().encode(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
+def _route_fireplace(request):
+    """The fireplace name in a /fireplaces/{name}/... route (checked), or None."""
+    name = request.match_info.get("name")
+    if name is not None:
+        lookup_fireplace(request.app[WORKER_KEY], name)
+    return name
+
+
+async def _sequences(request):
+    """List running sequences, or start one from {"steps": [...]}."""
+    name = _route_fireplace(request)
+    runner = request.app[SEQUENCES_KEY]
+    if request.method == "GET":
+        return web.json_response(runner.list(name))
+    steps = parse_sequence_body(await request.read())
+    return web.json_response(runner.create(name or request.app[WORKER_KEY].names[0], steps), status=201)
+
+
+async def _sequence(request):
+    """Get or cancel one sequence."""
+    name = _route_fireplace(request)
+    runner = request.app[SEQUENCES_KEY]
+    sequence_id = request.match_info["sequence_id"]
+    if request.method == "GET":
+        return web.json_response(runner.get(sequence_id, name))
+    return web.json_response(runner.cancel(sequence_id, name))
+
+
+async def _climate(request):
+    """Get the thermostat, or change its mode, setpoint and limits."""
+    name = _route_fireplace(request) or request.app[WORKER_KEY].names[0]
+    thermostat = request.app[THERMOSTAT_KEY]
+    if request.method == "GET":
+        return web.json_response(thermostat.get(name))
+    return web.json_response(thermostat.update(name, parse_json_object(await request.read())))
+
+
+async def _climate_temperature(request):
+    """Report a room temperature reading to the thermostat."""
+    name = _route_fireplace(request) or request.app[WORKER_KEY].names[0]
+    temperature = parse_temperature_body(await request.read())
+    return web.json_response(request.app[THERMOSTAT_KEY].report(name, temperature))
+
+
+async def _history(request):
+    """Transmitted and remote-heard states, newest first, filtered by the query string."""
+    name = _route_fireplace(request)
+    query = parse_history_query(request.query)
+    return web.json_response(history_payload(request.app[WORKER_KEY], request.app[HISTORY_KEY], name, query))
+
+
+async def _health(request):
+    """Health check endpoint for addon monitoring; answered from the watchdog's cache."""
+    return web.json_response(health_payload(request.app[WORKER_KEY]))
+
+
+def create_read_app(worker, broadcasters):
+    """Create an application serving only the routes answered from memory.
+
+    These are GET /state (with ETags and long-polls), the single-field GETs,
+    /serial, /events and /fireplaces; worker needs names, fireplaces and
+    fireplace(name) but nothing that transmits.
+    """
+    app = web.Application(middlewares=[_metrics_middleware, _error_middleware])
+    app[WORKER_KEY] = worker
+    app[BROADCASTERS_KEY] = broadcasters
+    app[STREAMS_KEY] = set()
+    app.on_shutdown.append(_close_streams)
+    for prefix in ROUTE_PREFIXES:
+        app.router.add_route("GET", prefix + "/state", _state)
+        app.router.add_route("GET", prefix + "/serial", _serial)
+        for field, parse in FIELD_PARSERS.items():
+            app.router.add_route("GET", prefix + "/" + field, _field_handler(field, parse))
+        app.router.add_route("GET", prefix + "/events", _events)
+    app.router.add_route("GET", "/fireplaces", _fireplaces)
+    return app
+
+
+def create_app(worker, broadcasters, sequences, thermostat, history):
+    """Create the aiohttp application serving a RadioWorker's fireplaces."""
+    app = create_read_app(worker, broadcasters)
+    app[SEQUENCES_KEY] = sequences
+    app[THERMOSTAT_KEY] = thermostat
+    app[HISTORY_KEY] = history
+    field_handlers = {field: _field_handler(field, parse) for field, parse in FIELD_PARSERS.items()}
+    for prefix in ROUTE_PREFIXES:
+        app.router.add_route("PUT", prefix + "/state", _state)
+        app.router.add_route("PATCH", prefix + "/state", _state)
+        for field, handler in field_handlers.items():
+            app.router.add_route("PUT", prefix + "/" + field, handler)
+        app.router.add_route("GET", prefix + "/sequences", _sequences)
+        app.router.add_route("POST", prefix + "/sequences", _sequences)
+        app.router.add_route("GET", prefix + "/sequences/{sequence_id}", _sequence)
+        app.router.add_route("DELETE", prefix + "/sequences/{sequence_id}", _sequence)
+        app.router.add_route("GET", prefix + "/climate", _climate)
+        app.router.add_route("PATCH", prefix + "/climate", _climate)
+        app.router.add_route("POST", prefix + "/climate/temperature", _climate_temperature)
+        app.router.add_route("GET", prefix + "/history", _history)
+    app.router.add_route("GET", "/health", _health)
+    app.router.add_route("GET", "/metrics", _metrics)
+    return app
+
+
+def run(worker, broadcasters, sequences, thermostat, history, host="0.0.0.0", port=5000, path=None, sock=None):
+    """Serve until interrupted, on host:port, an already bound socket or, given path, a Unix socket."""
+    app = create_app(worker, broadcasters, sequences, thermostat, history)
+    if sock is not None:
+        web.run_app(app, sock=sock, print=None, access_log=None)
+    elif path is not None:
+        web.run_app(app, path=path, print=None, access_log=None)
+    else:
+        web.run_app(app, host=host, port=port, print=None, access_log=None)
@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+"""
+cli.py: Command line control of a Proflame 2 fireplace.
+
+Commands are sent either straight from this process through the YardStick
+(opened once, however many commands are given) or, with --server, through
+a running Smartfire server, which keeps the radio and the state it has.
+
+    python3 cli.py set power=on flame=4
+    python3 cli.py get
+    python3 cli.py batch commands.txt
+    python3 cli.py --server http://localhost:5000 set flame=2
+
+A batch file (or stdin) has one command per line: `set field=value ...`,
+`get` or `sleep SECONDS`; blank lines and lines starting with # are skipped.
+It stops at the first failing command.
+"""
+
+import argparse
+import json
+import shlex
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from fireplace import FLAG_FIELDS, LEVEL_FIELDS, TX_MODE_BURST, TX_MODES, Fireplace
+
+# Seconds to wait for a server to answer; commands wait for their transmission
+SERVER_TIMEOUT = 35
+
+TRUE_WORDS = ("1", "true", "on", "yes")
+FALSE_WORDS = ("0", "false", "off", "no")
+
+
+class CommandError(Exception):
+    """Raised for a command that is malformed or failed."""
+
+
+def parse_assignments(words):
+    """Parse ["power=on", "flame=4"] into {"power": True, "flame": 4}."""
+    values = {}
+    for word in words:
+        name, sep, raw = word.partition("=")
+        name = name.strip().lower()
+        raw = raw.strip().lower()
+        if not sep or not raw:
+            raise CommandError("Expected field=value, got %r" % word)
+        if name in FLAG_FIELDS:
+            if raw not in TRUE_WORDS + FALSE_WORDS:
+                raise CommandError("%s must be on or off, got %r" % (name, raw))
+            values[name] = raw in TRUE_WORDS
+        elif name in LEVEL_FIELDS:
+            try:
+                values[name] = int(raw)
+            except ValueError:
+                raise CommandError("%s must be a level, got %r" % (name, raw)) from None
+        else:
+            raise CommandError("Unknown field %r (one of %s)" % (name, ", ".join(FLAG_FIELDS + LEVEL_FIELDS)))
+    if not values:
+        raise CommandError("set needs at least one field=value")
+    try:
+        return Fireplace.validate(**values)
+    except ValueError as e:
+        raise CommandError(str(e)) from None
+
+
+class LocalTarget:
+    """Sends commands through a YardStick owned by this process."""
+
+    def __init__(self, serial, tx_mode):
+        self._fireplace = Fireplace(serial=serial, tx_mode=tx_mode)
+
+    def get(self):
+        return self._fireplace.state
+
+    def set(self, values, force):
+        try:
+            self._fireplace.set(force=force, **values)
+        except Exception as e:  # pylint: disable=broad-except
+            raise CommandError("Transmission failed: %s" % e) from e
+        return self._fireplace.state
+
+
+class ServerTarget:
+    """Forwards commands to a running Smartfire server."""
+
+    def __init__(self, url, fireplace=None):
+        self._url = url.rstrip("/")
+        if fireplace:
+            self._url += "/fireplaces/" + urllib.parse.quote(fireplace, safe="")
+
+    def get(self):
+        return self._request("GET", "/state")
+
+    def set(self, values, force):
+        path = "/state?force=true" if force else "/state"
+        return self._request("PATCH", path, values)["state"]
+
+    def _request(self, method, path, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(
+            self._url + path, data=data, method=method, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=SERVER_TIMEOUT) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise CommandError("Server returned %d: %s" % (e.code, message)) from None
+        except (OSError, ValueError) as e:
+            raise CommandError("Could not reach %s: %s" % (self._url, e)) from None
+
+
+def run_command(target, words, force=False, out=sys.stdout):
+    """Run one command given as words, e.g. ["set", "flame=3"]; prints the state."""
+    command, args = words[0].lower(), words[1:]
+    if command == "set":
+        state = target.set(parse_assignments(args), force)
+    elif command == "get":
+        if args:
+            raise CommandError("get takes no arguments")
+        state = target.get()
+    elif command == "sleep":
+        try:
+            (seconds,) = args
+            time.sleep(max(0.0, float(seconds)))
+        except ValueError:
+            raise CommandError("sleep needs a number of seconds") from None
+        return
+    else:
+        raise CommandError("Unknown command %r (set, get or sleep)" % command)
+    print(json.dumps(state), file=out, flush=True)
+
+
+def run_batch(target, lines, force=False, out=sys.stdout):
+    """Run one command per line, stopping at the first error."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            run_command(target, shlex.split(line), force, out)
+        except (CommandError, ValueError) as e:
+            raise CommandError("Line %d: %s" % (number, e)) from None
+
+
+def _parse_serial(raw):
+    words = [w.strip() for w in raw.split(",")]
+    if len(words) != 3 or any(len(w) != 9 or set(w) - {"0", "1"} for w in words):
+        raise argparse.ArgumentTypeError("serial must be 3 comma-separated 9-bit binary words")
+    return words
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--server", help="send commands to a running server at this URL instead of the YardStick")
+    parser.add_argument("--fireplace", help="fireplace name on the server (default: its first fireplace)")
+    parser.add_argument("--serial", type=_parse_serial, help="serial words for local mode, e.g. 001001011,...")
+    parser.add_argument("--tx-mode", choices=TX_MODES, default=TX_MODE_BURST, help="local transmit mode")
+    parser.add_argument("--force", action="store_true", help="transmit even if the state is unchanged")
+    commands = parser.add_subparsers(dest="command", required=True)
+    set_parser = commands.add_parser("set", help="change fields, e.g. power=on flame=4")
+    set_parser.add_argument("values", nargs="+", metavar="field=value")
+    commands.add_parser("get", help="print the state (locally, as set by this run)")
+    batch_parser = commands.add_parser("batch", help="run newline-separated commands from a file or stdin")
+    batch_parser.add_argument("file", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.server:
+        target = ServerTarget(args.server, args.fireplace)
+    else:
+        target = LocalTarget(args.serial, args.tx_mode)
+    try:
+        if args.command == "batch":
+            with args.file:
+                run_batch(target, args.file, args.force)
+        elif args.command == "set":
+            run_command(target, ["set"] + args.values, args.force)
+        else:
+            run_command(target, ["get"])
+    except CommandError as e:
+        print("error: %s" % e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
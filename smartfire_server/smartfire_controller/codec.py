@@ -0,0 +1,231 @@
+"""
+codec.py: Table-driven encoder and decoder for Proflame 2 packets.
+
+A fireplace state is packed into a 16-bit key laid out exactly like the two
+command bytes on the wire (cmd1 in the high byte, cmd2 in the low byte).  The
+encoded packet for a key only depends on the serial, so each serial gets one
+PacketCodec whose table is filled lazily (or all at once via precompute()).
+
+Decoding runs the same word table backwards: one dict lookup per word undoes
+the Manchester coding and checks framing and parity together.
+"""
+
+import threading
+
+# Bit layout of cmd1 (high byte of the key) and cmd2 (low byte)
+PILOT_BIT = 15
+LIGHT_SHIFT = 12
+THERMOSTAT_BIT = 9
+POWER_BIT = 8
+FRONT_BIT = 7
+FAN_SHIFT = 4
+AUX_BIT = 3
+FLAME_SHIFT = 0
+LEVEL_MASK = 0x7
+
+# Levels are 3-bit fields but the protocol only uses 0-6
+MAX_LEVEL = 6
+
+# Each word is 22 symbols (sync, start bit, 9 data bits, parity, stop bit and
+# 9 zero symbols), Manchester-encoded into 44 bits.  A packet has 7 words.
+WORD_BITS = 44
+PACKET_WORDS = 7
+PACKET_BITS = WORD_BITS * PACKET_WORDS
+PACKET_BYTES = (PACKET_BITS + 7) // 8
+
+# Transmissions repeat the packet 5 times separated by 12 zero bits.  A packet
+# plus its gap is exactly 320 bits, so a whole burst is byte aligned.
+REPEATS = 5
+GAP_BITS = 12
+BURST_BYTES = REPEATS * (PACKET_BITS + GAP_BITS) // 8
+
+
+def _encode_word(word):
+    """Manchester-encode one 9-bit word with its framing and parity."""
+    bits = 0b11  # sync symbol
+    bits = bits << 2 | 0b10  # start bit
+    for i in range(8, -1, -1):
+        bits = bits << 2 | (0b10 if word >> i & 1 else 0b01)
+    parity = bin(word).count("1") & 1
+    bits = bits << 2 | (0b10 if parity else 0b01)
+    bits = bits << 2 | 0b10  # stop bit
+    return bits << 18  # 9 zero symbols
+
+
+# Every 9-bit word value encoded once at import; packets are built from these
+_WORD_CODES = tuple(_encode_word(w) for w in range(512))
+
+# The symbols before a word's trailing zeros, mapped back to the word.  Any
+# other bit pattern has a bad symbol, framing or parity.
+_HEAD_SHIFT = 18
+_HEAD_MASK = (1 << (WORD_BITS - _HEAD_SHIFT)) - 1
+_WORD_HEADS = {code >> _HEAD_SHIFT: word for word, code in enumerate(_WORD_CODES)}
+_PACKET_MASK = (1 << PACKET_BITS) - 1
+
+# A packet (like every word) begins with the sync symbol and a start bit
+_PACKET_START = "1110"
+
+
+def pack_state(pilot, light, thermostat, power, front, fan, aux, flame):
+    """Pack a fireplace state into its 16-bit (cmd1 << 8 | cmd2) key."""
+    return (
+        bool(pilot) << PILOT_BIT
+        | light << LIGHT_SHIFT
+        | bool(thermostat) << THERMOSTAT_BIT
+        | bool(power) << POWER_BIT
+        | bool(front) << FRONT_BIT
+        | fan << FAN_SHIFT
+        | bool(aux) << AUX_BIT
+        | flame << FLAME_SHIFT
+    )
+
+
+def unpack_state(key):
+    """Unpack a 16-bit key into a dict of state fields."""
+    return {
+        "pilot": bool(key >> PILOT_BIT & 1),
+        "light": key >> LIGHT_SHIFT & LEVEL_MASK,
+        "thermostat": bool(key >> THERMOSTAT_BIT & 1),
+        "power": bool(key >> POWER_BIT & 1),
+        "front": bool(key >> FRONT_BIT & 1),
+        "fan": key >> FAN_SHIFT & LEVEL_MASK,
+        "aux": bool(key >> AUX_BIT & 1),
+        "flame": key >> FLAME_SHIFT & LEVEL_MASK,
+    }
+
+
+def all_keys():
+    """Yield every valid state key (levels 0-6)."""
+    levels = range(MAX_LEVEL + 1)
+    for flags in range(32):
+        for light in levels:
+            for fan in levels:
+                for flame in levels:
+                    yield pack_state(
+                        flags & 1, light, flags & 2, flags & 4, flags & 8, fan, flags & 16, flame
+                    )
+
+
+def ecc_words(key):
+    """Return the (ecc1, ecc2) bytes for a state key."""
+    cmd1 = key >> 8
+    cmd2 = key & 0xFF
+    c1h, c1l = cmd1 >> 4, cmd1 & 0xF
+    c2h, c2l = cmd2 >> 4, cmd2 & 0xF
+    ecc1 = ((0xD ^ c1h ^ (c1h << 1) ^ (c1l << 1)) & 0xF) << 4 | (c1h ^ c1l)
+    ecc2 = ((c2h ^ (c2h << 1) ^ (c2l << 1)) & 0xF) << 4 | (c2h ^ c2l ^ 0x7)
+    return ecc1, ecc2
+
+
+def decode_packet(bits):
+    """Decode a PACKET_BITS-long integer into (serial, key).
+
+    Raises ValueError if any word is malformed, the ECC words do not match or
+    a level is out of range.
+    """
+    words = []
+    for i in range(PACKET_WORDS - 1, -1, -1):
+        word = _WORD_HEADS.get(bits >> (i * WORD_BITS + _HEAD_SHIFT) & _HEAD_MASK)
+        if word is None:
+            raise ValueError("Malformed word %d" % (PACKET_WORDS - i))
+        words.append(word)
+    if any(word & 1 for word in words[3:]):
+        raise ValueError("Padding bit set in command or ECC word")
+    cmd1, cmd2, ecc1, ecc2 = (word >> 1 for word in words[3:])
+    key = cmd1 << 8 | cmd2
+    if ecc_words(key) != (ecc1, ecc2):
+        raise ValueError("ECC mismatch")
+    if max(key >> shift & LEVEL_MASK for shift in (LIGHT_SHIFT, FAN_SHIFT, FLAME_SHIFT)) > MAX_LEVEL:
+        raise ValueError("Level out of range")
+    return [format(word, "09b") for word in words[:3]], key
+
+
+def decode_capture(data):
+    """Yield (bit offset, serial, key) for each valid packet in raw received bytes.
+
+    Packets may start at any bit. Candidate starts are found with one string
+    search over the capture rather than bit by bit.
+    """
+    total = len(data) * 8
+    value = int.from_bytes(data, "big")
+    text = format(value, "0%db" % total)
+    last = total - PACKET_BITS
+    pos = text.find(_PACKET_START)
+    while 0 <= pos <= last:
+        try:
+            serial, key = decode_packet(value >> (last - pos) & _PACKET_MASK)
+        except ValueError:
+            pos = text.find(_PACKET_START, pos + 1)
+            continue
+        yield pos, serial, key
+        pos = text.find(_PACKET_START, pos + PACKET_BITS)
+
+
+class PacketCodec:
+    """Encoded packets for one serial, cached by state key."""
+
+    def __init__(self, serial):
+        self._serial = tuple(serial)
+        prefix = 0
+        for s in self._serial:
+            prefix = prefix << WORD_BITS | _WORD_CODES[int(s, 2)]
+        self._prefix = prefix
+        self._packets = {}
+        self._bursts = {}
+
+    @property
+    def serial(self):
+        return list(self._serial)
+
+    def encode(self, key):
+        """Encode a state key as a PACKET_BITS-long integer (uncached)."""
+        ecc1, ecc2 = ecc_words(key)
+        bits = self._prefix
+        # Command and ECC bytes are followed by a zero padding bit in their 9-bit word
+        for byte in (key >> 8, key & 0xFF, ecc1, ecc2):
+            bits = bits << WORD_BITS | _WORD_CODES[byte << 1]
+        return bits
+
+    def packet(self, key):
+        """Return the packet for a state key, zero-padded to whole bytes."""
+        data = self._packets.get(key)
+        if data is None:
+            pad = PACKET_BYTES * 8 - PACKET_BITS
+            data = (self.encode(key) << pad).to_bytes(PACKET_BYTES, "big")
+            self._packets[key] = data
+        return data
+
+    def burst(self, key):
+        """Return all repetitions of a packet and their gaps as one buffer."""
+        data = self._bursts.get(key)
+        if data is None:
+            frame = self.encode(key) << GAP_BITS
+            bits = 0
+            for _ in range(REPEATS):
+                bits = bits << (PACKET_BITS + GAP_BITS) | frame
+            data = bits.to_bytes(BURST_BYTES, "big")
+            self._bursts[key] = data
+        return data
+
+    def precompute(self, packets=True, bursts=True):
+        """Fill the packet and/or burst tables for every valid state."""
+        for key in all_keys():
+            if packets:
+                self.packet(key)
+            if bursts:
+                self.burst(key)
+        return max(len(self._packets), len(self._bursts))
+
+
+_codecs = {}
+_codecs_lock = threading.Lock()
+
+
+def get_codec(serial):
+    """Return the shared PacketCodec for a serial."""
+    serial = tuple(serial)
+    codec = _codecs.get(serial)
+    if codec is None:
+        with _codecs_lock:
+            codec = _codecs.setdefault(serial, PacketCodec(serial))
+    return codec
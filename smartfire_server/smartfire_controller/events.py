@@ -0,0 +1,125 @@
+"""
+events.py: Fan-out of fireplace state changes to streaming clients.
+
+The radio worker reports every transmitted FireplaceState to a
+StateBroadcaster, which diffs it against the previous one to get the fields
+that changed and hands a delta event to each subscriber.
+A new subscriber first gets a snapshot of the full state taken under the same
+lock, so it never misses or double-applies a delta.  Long-polling GET /state
+requests register a one-shot watcher that fires on the next version instead.
+"""
+
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SSE keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+# Events buffered per subscriber before it is considered stalled and dropped
+SUBSCRIBER_BACKLOG = 64
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_DELTA = "delta"
+
+
+def format_sse(event, payload):
+    """Encode one server-sent event."""
+    return "id: %d\nevent: %s\ndata: %s\n\n" % (payload["version"], event, json.dumps(payload))
+
+
+KEEPALIVE_SSE = ": keepalive\n\n"
+
+
+class StateBroadcaster:
+    """Publishes versioned state snapshots and deltas to subscribers."""
+
+    def __init__(self, serial, state, version):
+        self._lock = threading.Lock()
+        self._serial = serial
+        self._state = state
+        self._version = version
+        self._subscribers = {}
+        self._watchers = {}
+        self._next_token = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, callback):
+        """Register callback(event, payload) and return (token, snapshot payload).
+
+        The callback runs on the publishing thread and must not block; if it
+        raises, the subscriber is dropped.
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = callback
+            return token, self._payload()
+
+    def current(self):
+        """The current (FireplaceState, version)."""
+        with self._lock:
+            return self._state, self._version
+
+    def state_dict(self, state):
+        """A FireplaceState as the JSON object GET /state returns."""
+        return {"serial": self._serial, **state.to_dict()}
+
+    def _payload(self):
+        return {"version": self._version, "state": self.state_dict(self._state)}
+
+    def watch(self, since, callback):
+        """Call callback() once the version differs from since, and return a token.
+
+        Fires straight away if it already differs.  Like subscriber callbacks
+        it runs on the publishing thread and must not block.
+        """
+        with self._lock:
+            if self._version != since:
+                callback()
+                return None
+            token = self._next_token
+            self._next_token += 1
+            self._watchers[token] = callback
+            return token
+
+    def unwatch(self, token):
+        with self._lock:
+            self._watchers.pop(token, None)
+
+    def is_subscribed(self, token):
+        return token in self._subscribers
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, state, version):
+        """Record a transmitted FireplaceState and send the changed fields to subscribers."""
+        with self._lock:
+            changes = state.diff(self._state)
+            self._state = state
+            if version == self._version:
+                # Nothing new was sent, so long-polls keep waiting
+                return
+            self._version = version
+            watchers, self._watchers = self._watchers, {}
+            for callback in watchers.values():
+                try:
+                    callback()
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.info("State watcher failed: %s", e)
+            if not changes:
+                return
+            payload = {"version": version, "changes": changes}
+            for token, callback in list(self._subscribers.items()):
+                try:
+                    callback(EVENT_DELTA, payload)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.info("Dropping stalled state subscriber: %s", e)
+                    self._subscribers.pop(token, None)
@@ -8,46 +8,228 @@ __version__ = "0.0.1"
 
 import logging
 import sys
+import threading
 import time
 
-from rflib import RfCat, MOD_ASK_OOK
-from bitstring import Bits, BitArray
+from codec import GAP_BITS, MAX_LEVEL, REPEATS, get_codec
+from metrics import Counter, Histogram
+from state import FireplaceState
 
 # Serial number words, including padding bit at the end
 DEFAULT_SERIAL = ["001001011", "011110100", "000000100"]
 
+# Settable state fields: on/off flags and 0-6 levels
+FLAG_FIELDS = ("pilot", "thermostat", "power", "front", "aux")
+LEVEL_FIELDS = ("light", "fan", "flame")
+
+BAUD_RATE = 2400
+
+# Transmit modes: one RFxmit call for all repetitions, or one call per repetition
+TX_MODE_BURST = "burst"
+TX_MODE_LOOP = "loop"
+TX_MODES = (TX_MODE_BURST, TX_MODE_LOOP)
+
+# Pilot on and everything else off, until a state is transmitted or restored
+INITIAL_STATE = FireplaceState.from_fields(pilot=True)
+
+PACKET_BUILD_SECONDS = Histogram(
+    "smartfire_packet_build_seconds",
+    "Time to look up (or encode) the packet or burst for a transmission.",
+    ["mode"],
+    buckets=(0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005),
+)
+TRANSMIT_SECONDS = Histogram(
+    "smartfire_transmit_seconds", "Time spent in the RFxmit calls for one command.", ["mode"]
+)
+RADIO_OPEN_SECONDS = Histogram("smartfire_radio_open_seconds", "Time to open and configure the YardStick.")
+RADIO_ERRORS = Counter("smartfire_radio_errors_total", "USB errors that dropped the YardStick handle.")
+
+
+class RadioUnavailable(Exception):
+    """Raised when the YardStick is known to be disconnected."""
+
+
+# Seconds after a failed open before a command tries the USB device again;
+# in between, commands fail at once and the watchdog does the retrying
+RETRY_INTERVAL = 10
+
+
+class Radio:
+    """The YardStick, opened on first use and shareable between fireplaces.
+
+    Any USB error drops the RfCat handle so the next use (or check()) builds a
+    fresh one. The outcome of the last open, check or failure is cached in
+    status for health probes.
+    """
+
+    def __init__(self):
+        self._device = None
+        self._lock = threading.RLock()
+        self._failed_at = None
+        self._status = {"connected": None, "checked_at": None, "error": None}
+
+    @property
+    def status(self):
+        """connected (None until first use), checked_at (epoch seconds) and last error."""
+        return self._status
+
+    @property
+    def available(self):
+        """False while the YardStick recently failed and is not yet due a retry."""
+        return self._failed_at is None or time.monotonic() - self._failed_at >= RETRY_INTERVAL
+
+    @property
+    def device(self):
+        if self._device is None:
+            # Only one RfCat may own the USB device, even with concurrent callers
+            with self._lock:
+                if self._device is None:
+                    if not self.available:
+                        raise RadioUnavailable("YardStick not available: %s" % self._status["error"])
+                    try:
+                        self._device = self._open()
+                    except Exception as e:
+                        self.fail(e)
+                        raise
+                    self._set_status(None)
+        return self._device
+
+    @staticmethod
+    def _open():
+        # Imported on first use: loading rflib and libusb slows down startup
+        from rflib import MOD_ASK_OOK, RfCat  # pylint: disable=import-outside-toplevel
+
+        start = time.perf_counter()
+        device = RfCat()
+        device.setFreq(314973000)
+        device.setMdmModulation(MOD_ASK_OOK)
+        device.setMdmDRate(BAUD_RATE)
+        RADIO_OPEN_SECONDS.observe(time.perf_counter() - start)
+        return device
+
+    def check(self):
+        """Open or ping the YardStick, refresh status and return True if it answers.
+
+        Ignores the retry hold-off, so the watchdog can reconnect. Call it
+        from the thread that owns the radio.
+        """
+        with self._lock:
+            try:
+                if self._device is None:
+                    self._device = self._open()
+                good = self._device.ping(count=1, silent=True)[0]
+                if not good:
+                    raise IOError("YardStick did not answer ping")
+            except Exception as e:  # pylint: disable=broad-except
+                self.fail(e)
+                return False
+            self._set_status(None)
+            return True
+
+    def fail(self, error):
+        """Record a USB error and drop the handle so the next use reconnects."""
+        RADIO_ERRORS.inc()
+        with self._lock:
+            device, self._device = self._device, None
+            self._failed_at = time.monotonic()
+            self._set_status(error)
+        if device is not None:
+            try:
+                device.cleanup()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def _set_status(self, error):
+        was_connected = self._status["connected"]
+        if error is None:
+            self._failed_at = None
+            if was_connected is False:
+                logging.info("YardStick reconnected")
+        elif was_connected is not False:
+            logging.warning("YardStick unavailable: %s", error)
+        self._status = {
+            "connected": error is None,
+            "checked_at": time.time(),
+            "error": None if error is None else str(error),
+        }
+
 
 class Fireplace:
     """Model for the fireplace state and controls."""
 
-    def __init__(self, serial=None):
-        self._radio = None
+    def __init__(self, serial=None, tx_mode=TX_MODE_BURST, radio=None, dedup_window=0, journal=None):
+        if tx_mode not in TX_MODES:
+            raise ValueError("Transmit mode must be one of %s" % ", ".join(TX_MODES))
+        self._radio = Radio() if radio is None else radio
+        self._tx_mode = tx_mode
+        self._last_transmit = None
+        # Seconds during which re-sending the last transmitted state is skipped
+        self._dedup_window = dedup_window
+        self._last_sent_key = None
+        self._last_sent_at = 0.0
+        self._sent = 0
+        self._skipped = 0
         self._serial = DEFAULT_SERIAL if serial is None else serial
-        self._pilot = True
-        self._light = 0
-        self._thermostat = False
-        self._power = False
-        self._front = False
-        self._fan = 0
-        self._aux = False
-        self._flame = 0
+        self._codec = get_codec(self._serial)
+        self._warm = False
+        self._state = INITIAL_STATE
+        self._version = 0
+        # Optional StateJournal: restores the last transmitted state and
+        # records every new one
+        self._journal = journal
+        if journal is not None:
+            self._restore()
 
     @property
     def radio(self):
-        if self._radio is None:
-            self._radio = RfCat()
-            self._radio.setFreq(314973000)
-            self._radio.setMdmModulation(MOD_ASK_OOK)
-            self._radio.setMdmDRate(2400)
-        return self._radio
+        return self._radio.device
+
+    @property
+    def radio_status(self):
+        """Cached YardStick status; never touches the USB device."""
+        return self._radio.status
+
+    def check_radio(self):
+        """Raise RadioUnavailable at once if the YardStick is known to be down."""
+        if not self._radio.available:
+            raise RadioUnavailable("YardStick not available: %s" % self._radio.status["error"])
 
     @property
     def serial(self):
         return self._serial
 
+    @property
+    def version(self):
+        """Number of state transitions transmitted (kept across restarts with a journal)."""
+        return self._version
+
+    @property
+    def tx_mode(self):
+        return self._tx_mode
+
+    @property
+    def tx_counts(self):
+        """Transmissions sent and identical ones skipped since startup."""
+        return {"sent": self._sent, "skipped": self._skipped}
+
+    @property
+    def warm(self):
+        """Whether warm_up() has filled this fireplace's packet table."""
+        return self._warm
+
+    def warm_up(self):
+        """Encode every state for the transmit mode in use, so no command pays for it."""
+        self._codec.precompute(packets=self._tx_mode == TX_MODE_LOOP, bursts=self._tx_mode == TX_MODE_BURST)
+        self._warm = True
+
+    @property
+    def last_transmit(self):
+        """Mode, measured duration and nominal on-air time of the last transmission."""
+        return self._last_transmit
+
     @property
     def pilot(self):
-        return self._pilot
+        return self._state.pilot
 
     @pilot.setter
     def pilot(self, value):
@@ -55,7 +237,7 @@ class Fireplace:
 
     @property
     def light(self):
-        return self._light
+        return self._state.light
 
     @light.setter
     def light(self, value):
@@ -63,7 +245,7 @@ class Fireplace:
 
     @property
     def thermostat(self):
-        return self._thermostat
+        return self._state.thermostat
 
     @thermostat.setter
     def thermostat(self, value):
@@ -71,7 +253,7 @@ class Fireplace:
 
     @property
     def power(self):
-        return self._power
+        return self._state.power
 
     @power.setter
     def power(self, value):
@@ -79,7 +261,7 @@ class Fireplace:
 
     @property
     def front(self):
-        return self._front
+        return self._state.front
 
     @front.setter
     def front(self, value):
@@ -87,7 +269,7 @@ class Fireplace:
 
     @property
     def fan(self):
-        return self._fan
+        return self._state.fan
 
     @fan.setter
     def fan(self, value):
@@ -95,7 +277,7 @@ class Fireplace:
 
     @property
     def aux(self):
-        return self._aux
+        return self._state.aux
 
     @aux.setter
     def aux(self, value):
@@ -103,7 +285,7 @@ class Fireplace:
 
     @property
     def flame(self):
-        return self._flame
+        return self._state.flame
 
     @flame.setter
     def flame(self, value):
@@ -111,17 +293,8 @@ class Fireplace:
 
     @property
     def state(self):
-        return {
-            "serial": self.serial,
-            "pilot": self.pilot,
-            "light": self.light,
-            "thermostat": self.thermostat,
-            "power": self.power,
-            "front": self.front,
-            "fan": self.fan,
-            "aux": self.aux,
-            "flame": self.flame,
-        }
+        """The state as a JSON-ready dict, including the serial."""
+        return {"serial": self.serial, **self._state.to_dict()}
 
     @state.setter
     def state(self, values):
@@ -138,7 +311,13 @@ class Fireplace:
         fan=None,
         aux=None,
         flame=None,
+        force=False,
     ):
+        """Apply a partial state and transmit it.
+
+        An unchanged state that was already sent within the dedup window is not
+        transmitted again unless force is set. Returns True if it was sent.
+        """
         logging.debug(
             "Setting pilot:%s, light:%s, thermostat:%s, power:%s, front:%s, fan:%s, aux:%s, flame:%s",
             pilot,
@@ -150,94 +329,152 @@ class Fireplace:
             aux,
             flame,
         )
-        if pilot is not None:
-            self._pilot = pilot
-        if light is not None:
-            if (light < 0) or (light > 6):
-                raise ValueError("Light value must be between 0 and 6 inclusive")
-            self._light = light
-        if thermostat is not None:
-            self._thermostat = thermostat
-        if power is not None:
-            self._power = power
-        if front is not None:
-            self._front = front
-        if fan is not None:
-            if (fan < 0) or (fan > 6):
-                raise ValueError("Fan value must be between 0 and 6 inclusive")
-            self._fan = fan
-        if aux is not None:
-            self._aux = aux
-        if flame is not None:
-            if (flame < 0) or (flame > 6):
-                raise ValueError("Flame value must be between 0 and 6 inclusive")
-            self._flame = flame
-
-        packet = self.build_packet()
-        self.send_packet(packet)
+        values = self.validate(
+            pilot=pilot,
+            light=light,
+            thermostat=thermostat,
+            power=power,
+            front=front,
+            fan=fan,
+            aux=aux,
+            flame=flame,
+        )
+        previous = self._state
+        self._state = previous.replace(**values)
+
+        if not force and self._recently_sent():
+            self._skipped += 1
+            logging.debug(
+                "Skipping transmission of state %04x, sent %.1f s ago",
+                self.key,
+                time.monotonic() - self._last_sent_at,
+            )
+            return False
+        try:
+            self.transmit()
+        except Exception:
+            # The fireplace never heard this state, so don't report it
+            self._state = previous
+            raise
+        self._sent += 1
+        self._commit()
+        return True
+
+    def observe(self, key):
+        """Adopt a state the fireplace received from another transmitter.
+
+        Used when the handheld remote is heard. Nothing is transmitted; the
+        state, version and journal are updated as if it had been sent from
+        here. Returns True if the state changed.
+        """
+        if key == self.key:
+            return False
+        self._state = FireplaceState(key)
+        self._commit()
+        return True
+
+    def _commit(self):
+        """Count the current state as the one the fireplace now has."""
+        self._last_sent_key = self.key
+        self._last_sent_at = time.monotonic()
+        self._version += 1
+        if self._journal is not None:
+            try:
+                self._journal.append(self._version, self.key)
+            except OSError as e:
+                logging.warning("Could not record state in journal: %s", e)
+
+    def _restore(self):
+        """Load the last transmitted state from the journal, if any."""
+        try:
+            last = self._journal.open()
+        except OSError as e:
+            logging.warning("Could not read state journal %s: %s", self._journal.path, e)
+            return
+        if last is None:
+            return
+        self._version, key = last
+        self._state = FireplaceState(key)
+        # The unit already has this state; don't resend it within the dedup window
+        self._last_sent_key = key
+        self._last_sent_at = time.monotonic()
+        logging.info("Restored state %04x (version %d) from %s", key, self._version, self._journal.path)
+
+    def _recently_sent(self):
+        """Whether the current state's packet was transmitted within the dedup window."""
+        return (
+            self._last_sent_key == self.key
+            and time.monotonic() - self._last_sent_at < self._dedup_window
+        )
+
+    @staticmethod
+    def validate(**values):
+        """Check a partial state and return it without the fields left as None."""
+        clean = {}
+        for name, value in values.items():
+            if value is None:
+                continue
+            if name in LEVEL_FIELDS:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError("%s value must be an integer" % name.capitalize())
+                if (value < 0) or (value > MAX_LEVEL):
+                    raise ValueError(
+                        "%s value must be between 0 and %d inclusive" % (name.capitalize(), MAX_LEVEL)
+                    )
+            elif name in FLAG_FIELDS:
+                if not isinstance(value, bool):
+                    raise ValueError("%s value must be True or False" % name.capitalize())
+            else:
+                raise ValueError("Unknown fireplace field: %s" % name)
+            clean[name] = value
+        return clean
+
+    @property
+    def key(self):
+        """The current state packed as the 16-bit cmd1/cmd2 key."""
+        return self._state.key
+
+    @property
+    def state_value(self):
+        """The current state as an immutable FireplaceState."""
+        return self._state
 
     def build_packet(self):
-        """Build the complete encoded packet ready for transmission."""
-        packet_words = []
-        packet_words.extend([Bits(bin=s) for s in self.serial])
-
-        cmd1 = BitArray()
-        cmd1.append("0b1" if self.pilot else "0b0")
-        cmd1.append(Bits(uint=self.light, length=3))
-        cmd1.append("0b00")
-        cmd1.append("0b1" if self.thermostat else "0b0")
-        cmd1.append("0b1" if self.power else "0b0")
-        cmd1.append("0x0")
-        packet_words.append(cmd1)
-
-        cmd2 = BitArray()
-        cmd2.append("0b1" if self.front else "0b0")
-        cmd2.append(Bits(uint=self.fan, length=3))
-        cmd2.append("0b1" if self.aux else "0b0")
-        cmd2.append(Bits(uint=self.flame, length=3))
-        cmd2.append("0x0")
-        packet_words.append(cmd2)
-
-        ecc1 = BitArray()
-        ecc1_high = (
-            0xD
-            ^ cmd1[0:4].uint
-            ^ (cmd1[0:4].uint << 1)
-            ^ (cmd1[4:8].uint << 1)
-        ) & 0xF
-        ecc1_low = cmd1[0:4].uint ^ cmd1[4:8].uint
-        ecc1.append(Bits(uint=ecc1_high, length=4))
-        ecc1.append(Bits(uint=ecc1_low, length=4))
-        ecc1.append("0x0")
-        packet_words.append(ecc1)
-
-        ecc2 = BitArray()
-        ecc2_high = (
-            cmd2[0:4].uint ^ (cmd2[0:4].uint << 1) ^ (cmd2[4:8].uint << 1)
-        ) & 0xF
-        ecc2_low = cmd2[0:4].uint ^ cmd2[4:8].uint ^ 0x7
-        ecc2.append(Bits(uint=ecc2_high, length=4))
-        ecc2.append(Bits(uint=ecc2_low, length=4))
-        ecc2.append("0x0")
-        packet_words.append(ecc2)
-
-        packet_string = ""
-        for word in packet_words:
-            packet_string += "S"
-            packet_string += "1"
-            packet_string += word[0:9].bin
-            parity = word.count("0x1") % 2
-            packet_string += Bits(uint=parity, length=1).bin
-            packet_string += "1"
-            packet_string += "Z" * 9
-
-        manchester_codes = {"S": "11", "0": "01", "1": "10", "Z": "00"}
-        packet_array = [manchester_codes[b] for b in packet_string]
-        packet = BitArray()
-        for b in packet_array:
-            packet.append(Bits(bin=b))
-
-        return packet
+        """Return the complete encoded packet (bytes) ready for transmission."""
+        return self._codec.packet(self.key)
+
+    def transmit(self):
+        """Transmit the current state using the configured transmit mode."""
+        start = time.perf_counter()
+        if self._tx_mode == TX_MODE_BURST:
+            data = self._codec.burst(self.key)
+        else:
+            data = self.build_packet()
+        PACKET_BUILD_SECONDS.observe(time.perf_counter() - start, mode=self._tx_mode)
+        try:
+            if self._tx_mode == TX_MODE_BURST:
+                self.send_burst(data)
+            else:
+                self.send_packet(data)
+        except RadioUnavailable:
+            raise
+        except Exception as e:
+            # Most likely the dongle was unplugged; reconnect on next use
+            self._radio.fail(e)
+            raise
+
+    def send_burst(self, burst):
+        """Transmit all 5 repetitions and their gaps in a single RFxmit call.
+
+        The burst buffer already contains the 12 zero-bit gaps, so spacing is set
+        by the radio's bit clock instead of Python sleeps and USB round-trips.
+        """
+        data = bytes(burst)
+        logging.debug("Transmitting %s (%d bytes) as one burst", data.hex(), len(data))
+        start = time.perf_counter()
+        self.radio.setModeIDLE()
+        self.radio.RFxmit(data=data)
+        self._record_transmit(TX_MODE_BURST, start, len(data) * 8)
 
     def send_packet(self, packet):
         """Transmit the packet over the radio 5 times with proper gaps.
@@ -245,23 +482,40 @@ class Fireplace:
         Proflame 2 protocol requires 5 repetitions separated by 12 zero bits (~5ms at 2400 baud).
         rfcat's repeat parameter is ignored by firmware, so we loop manually.
         """
-        # Packet is 308 bits (7 words × 44 bits); pad to multiple of 8 for bytes
-        pad_bits = (8 - len(packet) % 8) % 8
-        if pad_bits:
-            packet = packet + Bits(uint=0, length=pad_bits)
-        data = bytes(packet.bytes)
-        logging.info("Transmitting %s (%d bytes) x5", packet.hex, len(data))
+        # Packet is 308 bits (7 words × 44 bits), already zero-padded to 39 bytes
+        data = bytes(packet)
+        logging.debug("Transmitting %s (%d bytes) x%d", data.hex(), len(data), REPEATS)
+        start = time.perf_counter()
         self.radio.setModeIDLE()
         # 12 zero bits at 2400 baud = 5ms between packets
-        gap_seconds = 12 / 2400.0
-        for i in range(5):
+        gap_seconds = GAP_BITS / float(BAUD_RATE)
+        for i in range(REPEATS):
             self.radio.RFxmit(data=data)
-            if i < 4:
+            if i < REPEATS - 1:
                 time.sleep(gap_seconds)
+        self._record_transmit(TX_MODE_LOOP, start, REPEATS * len(data) * 8 + (REPEATS - 1) * GAP_BITS)
+
+    def _record_transmit(self, mode, start, bits):
+        """Remember and log how long a transmission held the radio."""
+        elapsed = time.perf_counter() - start
+        TRANSMIT_SECONDS.observe(elapsed, mode=mode)
+        self._last_transmit = {
+            "mode": mode,
+            "seconds": round(elapsed, 4),
+            "nominal_seconds": round(bits / float(BAUD_RATE), 4),
+        }
+        # Every transmission is in the history; this is only for debugging
+        logging.debug(
+            "Transmitted state %04x in %.1f ms (%s mode, %.1f ms nominal on-air)",
+            self.key,
+            elapsed * 1000,
+            mode,
+            bits * 1000 / float(BAUD_RATE),
+        )
 
 
 if __name__ == "__main__":
-    fire = Fireplace()
-    cmd = "fire.set(" + ",".join(sys.argv[1:]) + ")"
-    print(cmd)
-    exec(cmd)  # noqa: S102
+    # Kept for old scripts: `fireplace.py power=True flame=4` is `cli.py set ...`
+    from cli import main  # pylint: disable=import-outside-toplevel
+
+    sys.exit(main(["set"] + sys.argv[1:]))
@@ -0,0 +1,271 @@
+#!/usr/bin/python3
+"""
+frontend.py: Multi-process HTTP front end for the Proflame 2 REST server.
+
+Only one process can hold the YardStick.  With the http_workers option above
+1, server.py stays that process (the radio owner) but serves its routes on a
+Unix socket only, and starts this many front-end processes that share the
+public port (SO_REUSEPORT):
+
+    clients --HTTP--> frontend.py x N --Unix socket--> server.py (radio owner)
+
+Each front end follows the owner's event streams to keep a copy of every
+fireplace's state, and answers reads (GET /state with ETags and long-polls,
+the single-field GETs, /serial, /events, /fireplaces) from that copy with
+the asyncio server's own handlers.  Everything else -- commands, sequences,
+/health and /metrics -- is forwarded to the owner unchanged.  A front end
+can lag the owner by one event: a GET straight after a command may be
+answered by a process that has not yet seen the new state.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from async_server import create_read_app
+from events import EVENT_DELTA, EVENT_SNAPSHOT, StateBroadcaster
+from routes import COMMAND_TIMEOUT, ERROR_HINT
+from state import FIELDS, FireplaceState
+
+logger = logging.getLogger(__name__)
+
+# Host part of URLs sent over the owner's Unix socket
+OWNER_URL = "http://owner"
+
+# Seconds between attempts to reach the owner, e.g. while it starts
+CONNECT_RETRY = 0.5
+
+# Seconds before restarting a front end that exited
+RESTART_DELAY = 2
+
+OWNER_KEY = web.AppKey("owner")
+
+# Request and response headers passed through when forwarding
+FORWARDED_HEADERS = ("Content-Type", "Accept")
+RETURNED_HEADERS = ("Content-Type", "Cache-Control")
+
+_FIELD_NAMES = frozenset(name for name, _, _, _ in FIELDS)
+
+
+class MirrorFireplace:
+    """Read-only copy of one of the owner's fireplaces, kept by its event stream."""
+
+    def __init__(self, serial, broadcaster):
+        self.serial = serial
+        self._broadcaster = broadcaster
+
+    @property
+    def state(self):
+        return self._broadcaster.state_dict(self._broadcaster.current()[0])
+
+    @property
+    def version(self):
+        return self._broadcaster.current()[1]
+
+    def __getattr__(self, name):
+        if name in _FIELD_NAMES:
+            return getattr(self._broadcaster.current()[0], name)
+        raise AttributeError(name)
+
+
+class MirrorWorker:
+    """Stands in for the owner's RadioWorker in the read-only routes."""
+
+    def __init__(self, fireplaces):
+        self._fireplaces = fireplaces
+
+    @property
+    def names(self):
+        return list(self._fireplaces)
+
+    @property
+    def fireplaces(self):
+        return dict(self._fireplaces)
+
+    def fireplace(self, name=None):
+        """Return the named fireplace (the first one if name is None); KeyError if unknown."""
+        if name is None:
+            name = next(iter(self._fireplaces))
+        return self._fireplaces[name]
+
+
+async def _load_fireplaces(session):
+    """Fetch /fireplaces from the owner, waiting for it to come up."""
+    while True:
+        try:
+            async with session.get(OWNER_URL + "/fireplaces") as response:
+                response.raise_for_status()
+                return await response.json()
+        except (aiohttp.ClientError, OSError) as e:
+            logger.debug("Radio owner not reachable yet: %s", e)
+            await asyncio.sleep(CONNECT_RETRY)
+
+
+async def _follow(session, name, broadcaster):
+    """Apply one fireplace's owner event stream to its broadcaster, reconnecting as needed."""
+    while True:
+        try:
+            async with session.get(
+                OWNER_URL + "/fireplaces/%s/events" % name, timeout=aiohttp.ClientTimeout(total=None)
+            ) as response:
+                response.raise_for_status()
+                event, data = None, None
+                async for raw in response.content:
+                    line = raw.decode().rstrip("\r\n")
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data = line[5:].strip()
+                    elif not line and event and data:
+                        _apply_event(broadcaster, event, data)
+                        event, data = None, None
+        except (aiohttp.ClientError, OSError, ValueError) as e:
+            logger.warning("Lost the radio owner's events for %s: %s", name, e)
+        await asyncio.sleep(CONNECT_RETRY)
+
+
+def _apply_event(broadcaster, event, data):
+    payload = json.loads(data)
+    if event == EVENT_SNAPSHOT:
+        broadcaster.publish(FireplaceState.from_dict(payload["state"]), payload["version"])
+    elif event == EVENT_DELTA:
+        current, _ = broadcaster.current()
+        broadcaster.publish(current.replace(**payload["changes"]), payload["version"])
+
+
+async def _forward(request):
+    """Pass a request on to the radio owner and return its response."""
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    try:
+        async with request.app[OWNER_KEY].request(
+            request.method,
+            OWNER_URL + request.path_qs,
+            data=await request.read(),
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=COMMAND_TIMEOUT + 5),
+        ) as response:
+            body = await response.read()
+            returned = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+            return web.Response(body=body, status=response.status, headers=returned)
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+        return web.json_response({"error": "Radio owner unavailable: %s" % e, "hint": ERROR_HINT}, status=503)
+
+
+async def _watch_parent(parent):
+    """Exit when the radio owner that started this process is gone."""
+    while os.getppid() == parent:
+        await asyncio.sleep(1)
+    logger.warning("Radio owner exited, stopping")
+    os._exit(0)
+
+
+async def create_frontend(socket_path, parent=None):
+    """Connect to the radio owner and build the front-end application."""
+    session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=socket_path))
+    fireplaces = {}
+    broadcasters = {}
+    for name, info in (await _load_fireplaces(session)).items():
+        state = FireplaceState.from_dict(info["state"])
+        broadcasters[name] = StateBroadcaster(info["serial"], state, info["version"])
+        fireplaces[name] = MirrorFireplace(info["serial"], broadcasters[name])
+
+    app = create_read_app(MirrorWorker(fireplaces), broadcasters)
+    app[OWNER_KEY] = session
+    app.router.add_route("*", "/{tail:.*}", _forward)
+    tasks = [asyncio.ensure_future(_follow(session, name, b)) for name, b in broadcasters.items()]
+    if parent is not None:
+        tasks.append(asyncio.ensure_future(_watch_parent(parent)))
+
+    async def cleanup(app):
+        for task in tasks:
+            task.cancel()
+        await session.close()
+
+    app.on_cleanup.append(cleanup)
+    return app
+
+
+def run(socket_path, host, port, parent=None):
+    """Serve one front-end process until interrupted."""
+    web.run_app(
+        create_frontend(socket_path, parent),
+        host=host,
+        port=port,
+        reuse_port=True,
+        print=None,
+        access_log=None,
+    )
+
+
+class FrontendSupervisor:
+    """Starts the front-end processes from the radio owner and restarts any that exit."""
+
+    def __init__(self, count, socket_path, host, port):
+        self._count = count
+        self._command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--socket",
+            socket_path,
+            "--host",
+            host,
+            "--port",
+            str(port),
+            "--parent",
+            str(os.getpid()),
+        ]
+        self._processes = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the processes and a thread that keeps them running (idempotent)."""
+        if self._thread is None:
+            self._processes = [self._spawn() for _ in range(self._count)]
+            self._thread = threading.Thread(target=self._run, name="frontends", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for proc in self._processes:
+            proc.terminate()
+        for proc in self._processes:
+            try:
+                proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def _spawn(self):
+        return subprocess.Popen(self._command, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    def _run(self):
+        while not self._stop.wait(1):
+            for index, proc in enumerate(self._processes):
+                if proc.poll() is not None:
+                    logger.warning("HTTP front end %d exited with %s, restarting", proc.pid, proc.returncode)
+                    time.sleep(RESTART_DELAY)
+                    self._processes[index] = self._spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", required=True, help="the radio owner's Unix socket")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--parent", type=int, help="exit when this process is no longer the parent")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    run(args.socket, args.host, args.port, args.parent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+history.py: Fixed-size record of every state that went on air.
+
+Each transmission (and each state heard from the handheld remote) is one
+32-byte record in a memory-mapped ring buffer: wall-clock time, serial, packed
+state key, version, where the command came from and how long it took from
+being accepted to the end of the transmission.  Recording is a struct pack
+into the map, with no formatting and no syscall, and the file never grows:
+once it holds `capacity` records the oldest is overwritten.
+
+Every record carries its sequence number, so a slot that was overwritten or
+never written is recognised when reading, and queries scan newest first
+without locking the writer out.  Without a path the buffer lives in memory
+only.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from state import FireplaceState
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SFH1"
+_HEADER = struct.Struct("<4sIIQ12x")  # magic, record size, capacity, records written
+# sequence number + 1 (0 = empty), time, serial, state key, source, latency, version
+_RECORD = struct.Struct("<QdIHBxfI")
+
+# 2 MiB of records, about a year of a busy fireplace
+DEFAULT_CAPACITY = 65536
+
+# Where a command came from. Stored as the index, so only ever append
+SOURCES = (
+    "other",
+    "state",
+    "pilot",
+    "light",
+    "thermostat",
+    "power",
+    "front",
+    "fan",
+    "aux",
+    "flame",
+    "sequence",
+    "climate",
+    "remote",
+)
+SOURCE_OTHER = "other"
+SOURCE_SEQUENCE = "sequence"
+SOURCE_CLIMATE = "climate"
+SOURCE_REMOTE = "remote"
+_SOURCE_INDEX = {source: index for index, source in enumerate(SOURCES)}
+
+
+def pack_serial(serial):
+    """The three 9-bit serial words as one 27-bit integer."""
+    return int("".join(serial), 2)
+
+
+def unpack_serial(value):
+    bits = format(value, "027b")
+    return [bits[0:9], bits[9:18], bits[18:27]]
+
+
+class TransmitHistory:
+    """Ring buffer of transmitted states, shared by every fireplace."""
+
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY):
+        self._path = path
+        self._capacity = capacity
+        self._size = _HEADER.size + capacity * _RECORD.size
+        self._lock = threading.Lock()
+        self._map = None
+        self._written = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def written(self):
+        """Records written since the file was created, including overwritten ones."""
+        return self._written
+
+    def open(self):
+        """Map the file, starting it afresh if it is missing or has another layout."""
+        if self._path is None:
+            self._map = mmap.mmap(-1, self._size)
+            self._map[: _HEADER.size] = _HEADER.pack(MAGIC, _RECORD.size, self._capacity, 0)
+            return
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            header = os.pread(fd, _HEADER.size, 0)
+            expected = (MAGIC, _RECORD.size, self._capacity)
+            if len(header) == _HEADER.size and _HEADER.unpack(header)[:3] == expected:
+                self._written = _HEADER.unpack(header)[3]
+            else:
+                if header:
+                    logger.warning("Starting a new transmit history in %s (different format)", self._path)
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, _HEADER.pack(MAGIC, _RECORD.size, self._capacity, 0), 0)
+            os.ftruncate(fd, self._size)
+            self._map = mmap.mmap(fd, self._size)
+        finally:
+            os.close(fd)
+        logger.info("Transmit history has %d records", min(self._written, self._capacity))
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+
+    def record(self, serial, key, version, source=SOURCE_OTHER, latency=0.0, when=None):
+        """Add one transmitted state; serial is the fireplace's list of words."""
+        if self._map is None:
+            return
+        when = time.time() if when is None else when
+        with self._lock:
+            seq = self._written
+            _RECORD.pack_into(
+                self._map,
+                _HEADER.size + seq % self._capacity * _RECORD.size,
+                seq + 1,
+                when,
+                pack_serial(serial),
+                key,
+                _SOURCE_INDEX.get(source, 0),
+                latency,
+                version,
+            )
+            self._written = seq + 1
+            _HEADER.pack_into(self._map, 0, MAGIC, _RECORD.size, self._capacity, seq + 1)
+
+    def query(self, since=None, until=None, serial=None, source=None, fields=None, limit=100):
+        """Return matching records as dicts, newest first.
+
+        since and until bound the time (inclusive), serial and source must
+        match exactly, and fields maps state field names to required values.
+        """
+        if self._map is None:
+            return []
+        serial = None if serial is None else pack_serial(serial)
+        source = None if source is None else _SOURCE_INDEX[source]
+        fields = fields or {}
+        written = self._written
+        entries = []
+        for seq in range(written - 1, max(0, written - self._capacity) - 1, -1):
+            stored, when, packed, key, index, latency, version = _RECORD.unpack_from(
+                self._map, _HEADER.size + seq % self._capacity * _RECORD.size
+            )
+            if stored != seq + 1:
+                # Overwritten since the scan started
+                break
+            if (since is not None and when < since) or (until is not None and when > until):
+                continue
+            if (serial is not None and packed != serial) or (source is not None and index != source):
+                continue
+            state = FireplaceState(key)
+            if any(getattr(state, name) != value for name, value in fields.items()):
+                continue
+            entries.append(
+                {
+                    "time": when,
+                    "serial": unpack_serial(packed),
+                    "state": state.to_dict(),
+                    "version": version,
+                    "source": SOURCES[index] if index < len(SOURCES) else SOURCE_OTHER,
+                    "latency": round(latency, 6),
+                }
+            )
+            if len(entries) >= limit:
+                break
+        return entries
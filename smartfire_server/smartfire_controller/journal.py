@@ -0,0 +1,119 @@
+"""
+journal.py: Append-only record of the last transmitted state of a fireplace.
+
+The fireplace itself cannot be queried, so after a restart the only way to know
+what it is doing is to remember what was last sent to it.  Each successful
+transmission appends one fixed-size record (version, state key, checksum) and
+syncs it; at startup the last intact record wins.  A header ties the file to
+the fireplace's serial, so changing the serial starts from defaults instead of
+replaying another unit's state.  The file is rewritten down to a single record
+on open and whenever it grows past COMPACT_RECORDS.
+"""
+
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SFJ1"
+_HEADER = struct.Struct("<4sI")  # magic, crc32 of the serial
+_RECORD = struct.Struct("<IHH")  # version, state key, low 16 bits of crc32
+
+# Records appended before the file is compacted back to one
+COMPACT_RECORDS = 4096
+
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+def _serial_tag(serial):
+    return zlib.crc32(",".join(serial).encode())
+
+
+def _pack_record(version, key):
+    check = zlib.crc32(struct.pack("<IH", version, key)) & 0xFFFF
+    return _RECORD.pack(version, key, check)
+
+
+class StateJournal:
+    """Durable (version, key) history for one fireplace."""
+
+    def __init__(self, path, serial):
+        self._path = path
+        self._tag = _serial_tag(serial)
+        self._file = None
+        self._records = 0
+        self._last = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def open(self):
+        """Replay the journal and return the last (version, key), or None.
+
+        Leaves the journal compacted and open for appends.
+        """
+        self._last = self._replay()
+        self._rewrite()
+        return self._last
+
+    def append(self, version, key):
+        """Record a transmitted state. Durable once this returns."""
+        if self._file is None:
+            self._rewrite()
+        self._file.write(_pack_record(version, key))
+        self._file.flush()
+        _sync(self._file.fileno())
+        self._last = (version, key)
+        self._records += 1
+        if self._records >= COMPACT_RECORDS:
+            self._rewrite()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _replay(self):
+        try:
+            with open(self._path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < _HEADER.size:
+            logger.warning("Ignoring truncated state journal %s", self._path)
+            return None
+        magic, tag = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            logger.warning("Ignoring state journal %s with unknown format", self._path)
+            return None
+        if tag != self._tag:
+            logger.info("Serial changed, not restoring state from %s", self._path)
+            return None
+
+        last = None
+        end = len(data) - _RECORD.size
+        for offset in range(_HEADER.size, end + 1, _RECORD.size):
+            version, key, check = _RECORD.unpack_from(data, offset)
+            if _pack_record(version, key)[-2:] != struct.pack("<H", check):
+                # A torn or corrupt record ends the usable history
+                logger.warning("State journal %s is damaged at byte %d", self._path, offset)
+                break
+            last = (version, key)
+        return last
+
+    def _rewrite(self):
+        """Atomically replace the file with the header and the last record."""
+        self.close()
+        tmp = self._path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, self._tag))
+            if self._last is not None:
+                f.write(_pack_record(*self._last))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path)
+        self._file = open(self._path, "ab")
+        self._records = 0
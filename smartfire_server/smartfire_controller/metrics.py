@@ -0,0 +1,161 @@
+"""
+metrics.py: Minimal Prometheus-style counters and histograms.
+
+Just enough of the Prometheus text exposition format for /metrics, without
+adding a dependency to the add-on image.  Recording a value is a dict lookup
+and a few additions under a per-metric lock, so instrumentation can stay on in
+production.  Metrics register themselves in REGISTRY when created.
+"""
+
+import bisect
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) for latency histograms: 100 us to 10 s
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """The set of metrics rendered by /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append("# HELP %s %s" % (metric.name, metric.documentation))
+            lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self._labels = tuple(labels)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self._labels)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        super().__init__(name, documentation, labels, registry)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [
+            "%s%s %s" % (self.name, _format_labels(self._labels, key), _format_value(value))
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Observed durations counted into fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labels, registry)
+        self._bounds = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last is +Inf), then sum and count
+                series = self._values[key] = [0] * (len(self._bounds) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        lines = []
+        bounds = self._bounds + (float("inf"),)
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                labels = _format_labels(self._labels, key, [("le", _format_value(float(bound)))])
+                lines.append("%s_bucket%s %d" % (self.name, labels, cumulative))
+            labels = _format_labels(self._labels, key)
+            lines.append("%s_sum%s %s" % (self.name, labels, _format_value(series[-2])))
+            lines.append("%s_count%s %d" % (self.name, labels, series[-1]))
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A gauge or counter whose values are read from a function at scrape time.
+
+    fn returns a number, or a dict mapping label value tuples to numbers.
+    Used for values that are already counted elsewhere, such as queue depth.
+    """
+
+    def __init__(self, name, documentation, fn, labels=(), kind="gauge", registry=REGISTRY):
+        self.kind = kind
+        self._fn = fn
+        super().__init__(name, documentation, labels, registry)
+
+    def samples(self):
+        values = self._fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            "%s%s %s" % (self.name, _format_labels(self._labels, key), _format_value(value))
+            for key, value in sorted(values.items())
+        ]
@@ -0,0 +1,93 @@
+"""
+receiver.py: Follow the handheld Proflame remote by listening on the YardStick.
+
+The fireplace never reports its state, so changes made with its own remote are
+invisible unless we hear them.  RemoteReceiver runs as the RadioWorker's idle
+task: whenever no command is queued it listens for one short block, decodes
+any packets in it and, when one carries a configured fireplace's serial,
+adopts that state and publishes it like a transmission of our own.
+"""
+
+import logging
+import time
+
+from codec import decode_capture
+from history import SOURCE_REMOTE
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# Bytes per receive call: enough for a whole 39-byte packet at any bit offset
+# plus the gap that follows it, and short enough to keep command latency low
+RECV_BYTES = 96
+# Milliseconds to wait for a carrier before handing the radio back
+RECV_TIMEOUT_MS = 100
+
+PACKETS_RECEIVED = Counter(
+    "smartfire_received_packets_total",
+    "Valid Proflame packets heard, by whether their serial is configured here.",
+    ["result"],
+)
+
+
+class RemoteReceiver:
+    """Listens between transmissions and applies states sent by other remotes."""
+
+    def __init__(self, worker, radio):
+        self._worker = worker
+        self._radio = radio
+        self._names = {tuple(fp.serial): name for name, fp in worker.fireplaces.items()}
+        self._tx_sync_mode = None
+
+    def poll(self):
+        """Listen for one block and apply what was heard; runs on the radio thread."""
+        if not self._radio.available:
+            # Leave reconnecting to the watchdog; just yield the radio thread
+            time.sleep(RECV_TIMEOUT_MS / 1000.0)
+            return
+        data = self._receive()
+        if data:
+            self.handle(data)
+
+    def handle(self, data):
+        """Decode raw received bytes and apply states for configured serials.
+
+        Returns the names of the fireplaces whose state changed.
+        """
+        changed = []
+        for _, serial, key in decode_capture(data):
+            name = self._names.get(tuple(serial))
+            if name is None:
+                PACKETS_RECEIVED.inc(result="unknown_serial")
+                continue
+            PACKETS_RECEIVED.inc(result="matched")
+            if self._worker.fireplace(name).observe(key) and name not in changed:
+                logger.info("Remote set %s to state %04x", name, key)
+                changed.append(name)
+        for name in changed:
+            self._worker.record(name, SOURCE_REMOTE)
+            self._worker.publish(name)
+        return changed
+
+    def _receive(self):
+        # The radio is open by now, so this import is already loaded
+        from rflib import SYNCM_CARRIER, ChipconUsbTimeoutException  # pylint: disable=import-outside-toplevel
+
+        device = self._radio.device
+        try:
+            if self._tx_sync_mode is None:
+                self._tx_sync_mode = device.getMdmSyncMode()
+            # Proflame packets have no preamble or sync word; capture on carrier
+            device.setMdmSyncMode(SYNCM_CARRIER)
+            device.makePktFLEN(RECV_BYTES)
+            data, _ = device.RFrecv(timeout=RECV_TIMEOUT_MS, blocksize=RECV_BYTES)
+            return data
+        except ChipconUsbTimeoutException:
+            return None
+        except Exception as e:
+            self._radio.fail(e)
+            raise
+        finally:
+            if self._radio.status["connected"]:
+                device.setModeIDLE()
+                device.setMdmSyncMode(self._tx_sync_mode)
@@ -0,0 +1,311 @@
+"""
+routes.py: Request parsing and responses shared by the Flask and asyncio servers.
+
+Nothing in here touches a web framework; handlers pass in the raw body and
+query arguments and get back plain values to serialize.
+"""
+
+import json
+import math
+
+from codec import MAX_LEVEL
+from history import SOURCE_OTHER, SOURCES
+from metrics import CallbackMetric, Histogram
+from state import FIELDS
+
+# Longest a handler waits for its command to go on air before giving up
+COMMAND_TIMEOUT = 30
+
+# Longest a GET /state?wait=... long-poll is held open
+MAX_POLL_WAIT = 60
+
+# Entries returned by GET /history without and with ?limit=
+DEFAULT_HISTORY_LIMIT = 100
+MAX_HISTORY_LIMIT = 1000
+
+ERROR_HINT = "Check add-on logs for details. YardStick may need to be reconnected."
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "smartfire_http_request_seconds",
+    "Time to answer an HTTP request, by route pattern, method and status.",
+    ["route", "method", "status"],
+)
+
+# Event streams stay open indefinitely and long-polls (GET ?wait=) until the
+# state changes, so their duration is not a latency
+UNTIMED_ROUTE_SUFFIX = "/events"
+
+
+def observe_request(route, method, status, seconds, args=None):
+    """Record one HTTP request's latency (route is the pattern, not the path)."""
+    if route.endswith(UNTIMED_ROUTE_SUFFIX) or (method == "GET" and args and "wait" in args):
+        return
+    HTTP_REQUEST_SECONDS.observe(seconds, route=route, method=method, status=status)
+
+
+class UnknownFireplace(LookupError):
+    """Raised for a fireplace name that is not configured."""
+
+
+def lookup_fireplace(worker, name):
+    """Return the named fireplace, or the default one for the legacy routes."""
+    try:
+        return worker.fireplace(name)
+    except KeyError:
+        raise UnknownFireplace("Unknown fireplace: %s" % name) from None
+
+
+def parse_flag(data):
+    """Parse a True/False request body."""
+    return data == b"True"
+
+
+def parse_level(data):
+    """Parse an integer level request body."""
+    return int(data)
+
+
+# Single-field routes (/pilot, /light, ...) and how to parse their PUT body
+FIELD_PARSERS = {
+    "pilot": parse_flag,
+    "light": parse_level,
+    "thermostat": parse_flag,
+    "power": parse_flag,
+    "front": parse_flag,
+    "fan": parse_level,
+    "aux": parse_flag,
+    "flame": parse_level,
+}
+
+
+def parse_state_body(data, serial):
+    """Parse a JSON object of state fields from a request body."""
+    try:
+        value = json.loads(data)
+    except ValueError:
+        raise ValueError("Request body must be a JSON object") from None
+    if not isinstance(value, dict):
+        raise ValueError("Request body must be a JSON object")
+    value = dict(value)
+    # serial is read-only but included in GET /state, so allow it to round-trip
+    requested = value.pop("serial", None)
+    if requested is not None and requested != serial:
+        raise ValueError("serial cannot be changed")
+    return value
+
+
+def parse_sequence_body(data):
+    """Parse a {"steps": [...]} sequence request body and return the steps."""
+    try:
+        value = json.loads(data)
+    except ValueError:
+        raise ValueError("Request body must be a JSON object") from None
+    if not isinstance(value, dict) or "steps" not in value:
+        raise ValueError('Request body must be a JSON object with "steps"')
+    return value["steps"]
+
+
+def parse_json_object(data):
+    """Parse a request body that must be a JSON object, such as PATCH /climate."""
+    try:
+        value = json.loads(data)
+    except ValueError:
+        raise ValueError("Request body must be a JSON object") from None
+    if not isinstance(value, dict):
+        raise ValueError("Request body must be a JSON object")
+    return value
+
+
+def parse_temperature_body(data):
+    """Parse a {"temperature": <degrees>} reading and return the value."""
+    value = parse_json_object(data)
+    if "temperature" not in value:
+        raise ValueError('Request body must be a JSON object with "temperature"')
+    return value["temperature"]
+
+
+def wants_wait(args):
+    """Whether the caller wants to wait for the transmission (?wait=false opts out)."""
+    return args.get("wait", "true").lower() not in ("0", "false", "no")
+
+
+def wants_force(args):
+    """Whether the caller asked to transmit even an identical packet (?force=true)."""
+    return args.get("force", "false").lower() in ("1", "true", "yes")
+
+
+def parse_long_poll(args, version):
+    """Return (seconds, since) from GET /state?wait=<seconds>&since=<version>.
+
+    seconds is 0 (answer now) without ?wait and is capped at MAX_POLL_WAIT;
+    since defaults to the current version, i.e. wait for the next change.
+    """
+    if "wait" not in args:
+        return 0.0, version
+    try:
+        seconds = float(args["wait"])
+    except ValueError:
+        raise ValueError("wait must be a number of seconds") from None
+    if not math.isfinite(seconds):
+        raise ValueError("wait must be a number of seconds")
+    try:
+        since = int(args.get("since", version))
+    except ValueError:
+        raise ValueError("since must be a state version") from None
+    return min(max(seconds, 0.0), MAX_POLL_WAIT), since
+
+
+def state_etag(state, version):
+    """ETag for a FireplaceState at a version.
+
+    The packed state keeps tags distinct when versions restart from 0 (no
+    journal) after the add-on restarts.
+    """
+    return '"%d-%04x"' % (version, state.key)
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers etag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+def state_headers(state, version):
+    """Validator headers sent with GET /state, including 304 responses."""
+    return {
+        "ETag": state_etag(state, version),
+        "X-State-Version": str(version),
+        "Cache-Control": "no-cache",
+    }
+
+
+def command_source(route):
+    """The history source for a command sent to a route pattern, e.g. "power" for /power."""
+    source = route.rstrip("/").rsplit("/", 1)[-1]
+    return source if source in SOURCES else SOURCE_OTHER
+
+
+def _history_time(args, name):
+    if name not in args:
+        return None
+    try:
+        return float(args[name])
+    except ValueError:
+        raise ValueError("%s must be a Unix timestamp" % name) from None
+
+
+def parse_history_query(args):
+    """Return TransmitHistory.query() arguments from GET /history's query string.
+
+    since and until are Unix timestamps, source is one of SOURCES, limit is
+    at most MAX_HISTORY_LIMIT, and any state field (e.g. power=true,
+    flame=6) must have that value.
+    """
+    query = {"since": _history_time(args, "since"), "until": _history_time(args, "until"), "fields": {}}
+    source = args.get("source")
+    if source is not None and source not in SOURCES:
+        raise ValueError("source must be one of %s" % ", ".join(SOURCES))
+    query["source"] = source
+    try:
+        limit = int(args.get("limit", DEFAULT_HISTORY_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    query["limit"] = min(max(limit, 1), MAX_HISTORY_LIMIT)
+    for name, _, _, is_flag in FIELDS:
+        raw = args.get(name)
+        if raw is None:
+            continue
+        raw = raw.strip().lower()
+        if is_flag:
+            if raw not in ("true", "false", "1", "0"):
+                raise ValueError("%s must be true or false" % name)
+            query["fields"][name] = raw in ("true", "1")
+        else:
+            if not raw.isdigit() or int(raw) > MAX_LEVEL:
+                raise ValueError("%s must be a level from 0 to %d" % (name, MAX_LEVEL))
+            query["fields"][name] = int(raw)
+    return query
+
+
+def history_payload(worker, history, name, query):
+    """Body of the /history response; name limits it to one fireplace."""
+    names = {tuple(fp.serial): fp_name for fp_name, fp in worker.fireplaces.items()}
+    serial = worker.fireplace(name).serial if name is not None else None
+    entries = history.query(serial=serial, **query)
+    for entry in entries:
+        entry["fireplace"] = names.get(tuple(entry["serial"]))
+    return {"entries": entries, "recorded": history.written, "capacity": history.capacity}
+
+
+def target_state(fireplace, values):
+    """The state the fireplace will have once queued values are transmitted."""
+    target = dict(fireplace.state)
+    target.update(values)
+    return target
+
+
+def fireplaces_payload(worker):
+    """Body of the /fireplaces response."""
+    return {
+        name: {"serial": fp.serial, "state": fp.state, "version": fp.version}
+        for name, fp in worker.fireplaces.items()
+    }
+
+
+def health_payload(worker):
+    """Body of the /health response, built from cached values only.
+
+    status is "warming" until the first YardStick check has finished and
+    every fireplace's packet table is filled, then "ok".
+    """
+    radio = worker.fireplace().radio_status
+    warm = radio["connected"] is not None and all(fp.warm for fp in worker.fireplaces.values())
+    return {
+        "status": "ok" if warm else "warming",
+        "yardstick": bool(radio["connected"]),
+        "yardstick_checked_at": radio["checked_at"],
+        "yardstick_error": radio["error"],
+        "tx_mode": worker.fireplace().tx_mode,
+        "transmitter": worker.stats,
+        "fireplaces": {
+            name: dict(fp.tx_counts, last_transmit=fp.last_transmit)
+            for name, fp in worker.fireplaces.items()
+        },
+    }
+
+
+def register_metrics(worker, broadcasters):
+    """Expose the worker's and broadcasters' own counters in /metrics."""
+    CallbackMetric(
+        "smartfire_queue_depth", "Commands waiting for the radio.", lambda: worker.stats["pending"]
+    )
+    CallbackMetric(
+        "smartfire_commands_total",
+        "Commands accepted by the radio worker.",
+        lambda: worker.stats["submitted"],
+        kind="counter",
+    )
+    CallbackMetric(
+        "smartfire_transmissions_total",
+        "Transmissions sent and identical ones skipped, per fireplace.",
+        lambda: {
+            (name, result): count
+            for name, fp in worker.fireplaces.items()
+            for result, count in fp.tx_counts.items()
+        },
+        labels=["fireplace", "result"],
+        kind="counter",
+    )
+    CallbackMetric(
+        "smartfire_yardstick_connected",
+        "1 if the last YardStick check succeeded.",
+        lambda: int(bool(worker.fireplace().radio_status["connected"])),
+    )
+    CallbackMetric(
+        "smartfire_event_subscribers",
+        "Connected event stream clients, per fireplace.",
+        lambda: {(name,): b.subscriber_count for name, b in broadcasters.items()},
+        labels=["fireplace"],
+    )
@@ -0,0 +1,328 @@
+"""
+sequences.py: Timed state sequences (flame ramps, scenes, auto-off timers).
+
+A sequence is a list of steps run against one fireplace by the server itself,
+so a 20 minute ramp is one request from Home Assistant rather than one per
+level.  Steps are:
+
+    {"set": {"power": true, "flame": 2}}    change fields now
+    {"delay": 300}                          wait (seconds)
+    {"ramp": {"field": "flame", "to": 6, "over": 1200}}
+                                            step a level one notch at a time,
+                                            evenly spaced (optional "from")
+    {"off_after": 7200}                     wait, then turn power off
+
+One scheduler thread keeps every sequence's next due time in a heap and sends
+due steps through the RadioWorker.  Sequences are saved to a JSON file after
+every change; due times are wall-clock, so after a restart overdue steps are
+merged and sent as one catch-up command instead of being replayed one by one.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from fireplace import LEVEL_FIELDS, Fireplace
+from history import SOURCE_SEQUENCE
+from routes import COMMAND_TIMEOUT
+from transmitter import CommandSuperseded
+
+logger = logging.getLogger(__name__)
+
+# Limits that keep one request from flooding the radio or the state file
+MAX_STEPS = 100
+MAX_SEQUENCES = 32
+
+# Seconds before retrying a step whose command failed (e.g. radio unplugged)
+RETRY_DELAY = 30
+
+STEP_KINDS = ("set", "delay", "ramp", "off_after")
+
+
+class UnknownSequence(LookupError):
+    """Raised for a sequence id that is not running."""
+
+
+def _seconds(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError("%s must be a number of seconds >= 0" % name)
+    return float(value)
+
+
+def parse_steps(steps):
+    """Validate a list of steps and return it normalized.
+
+    Raises ValueError describing the first invalid step.
+    """
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("steps must be a non-empty list")
+    if len(steps) > MAX_STEPS:
+        raise ValueError("A sequence can have at most %d steps" % MAX_STEPS)
+    parsed = []
+    for index, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or len(step) != 1 or next(iter(step)) not in STEP_KINDS:
+            raise ValueError("Step %d must be one of: %s" % (index, ", ".join(STEP_KINDS)))
+        kind, arg = next(iter(step.items()))
+        if kind == "set":
+            if not isinstance(arg, dict) or not arg:
+                raise ValueError("Step %d: set needs an object of fields" % index)
+            values = Fireplace.validate(**arg)
+            if not values:
+                raise ValueError("Step %d: set needs at least one field value" % index)
+            parsed.append({"set": values})
+        elif kind in ("delay", "off_after"):
+            parsed.append({kind: _seconds(arg, "Step %d: %s" % (index, kind))})
+        else:
+            if not isinstance(arg, dict):
+                raise ValueError("Step %d: ramp needs field, to and over" % index)
+            field = arg.get("field")
+            if field not in LEVEL_FIELDS:
+                raise ValueError("Step %d: ramp field must be one of %s" % (index, ", ".join(LEVEL_FIELDS)))
+            ramp = {"field": field, "over": _seconds(arg.get("over"), "Step %d: over" % index)}
+            if arg.get("to") is None:
+                raise ValueError("Step %d: ramp needs a 'to' value" % index)
+            ramp["to"] = Fireplace.validate(**{field: arg["to"]})[field]
+            if arg.get("from") is not None:
+                ramp["from"] = Fireplace.validate(**{field: arg["from"]})[field]
+            parsed.append({"ramp": ramp})
+    return parsed
+
+
+def _expand_ramp(ramp, current):
+    """Turn a ramp into set and delay steps, starting from the current level."""
+    start = ramp.get("from", current)
+    target = ramp["to"]
+    steps = [{"set": {ramp["field"]: start}}] if start != current else []
+    count = abs(target - start)
+    if count:
+        interval = ramp["over"] / count
+        direction = 1 if target > start else -1
+        for level in range(start + direction, target + direction, direction):
+            steps.append({"delay": interval})
+            steps.append({"set": {ramp["field"]: level}})
+    return steps
+
+
+class Sequence:
+    """One running sequence and the steps it has left."""
+
+    def __init__(self, sequence_id, fireplace, steps, remaining, due, created):
+        self.id = sequence_id
+        self.fireplace = fireplace
+        self.steps = steps
+        self.remaining = remaining
+        self.due = due
+        self.created = created
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "fireplace": self.fireplace,
+            "steps": list(self.steps),
+            "remaining": list(self.remaining),
+            "next_step_at": self.due,
+            "created": self.created,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a saved sequence; raises KeyError, TypeError or ValueError for bad data."""
+        return cls(
+            data["id"],
+            data["fireplace"],
+            list(data["steps"]),
+            list(data["remaining"]),
+            float(data["next_step_at"]),
+            data["created"],
+        )
+
+
+class SequenceRunner:
+    """Runs sequences for the fireplaces of a RadioWorker on a timer thread."""
+
+    def __init__(self, worker, path=None):
+        self._worker = worker
+        self._path = path
+        self._sequences = {}
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Load saved sequences and start the timer thread (idempotent)."""
+        if self._thread is None:
+            self._load()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="sequences", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def create(self, fireplace, steps):
+        """Validate and start a sequence for a fireplace name; returns its dict."""
+        steps = parse_steps(steps)
+        with self._cond:
+            if len(self._sequences) >= MAX_SEQUENCES:
+                raise ValueError("Too many sequences running (at most %d)" % MAX_SEQUENCES)
+            now = time.time()
+            sequence = Sequence(uuid.uuid4().hex[:12], fireplace, steps, list(steps), now, now)
+            self._add(sequence)
+            self._save()
+            logger.info("Started sequence %s for %s with %d steps", sequence.id, fireplace, len(steps))
+            return sequence.to_dict()
+
+    def get(self, sequence_id, fireplace=None):
+        with self._cond:
+            return self._find(sequence_id, fireplace).to_dict()
+
+    def list(self, fireplace=None):
+        """All running sequences, or those of one fireplace, oldest first."""
+        with self._cond:
+            sequences = sorted(self._sequences.values(), key=lambda s: s.created)
+            return [s.to_dict() for s in sequences if fireplace in (None, s.fireplace)]
+
+    def cancel(self, sequence_id, fireplace=None):
+        """Stop a sequence; the fireplace keeps whatever state it reached."""
+        with self._cond:
+            sequence = self._find(sequence_id, fireplace)
+            del self._sequences[sequence.id]
+            self._save()
+            logger.info("Cancelled sequence %s", sequence.id)
+            return sequence.to_dict()
+
+    def _find(self, sequence_id, fireplace):
+        sequence = self._sequences.get(sequence_id)
+        if sequence is None or fireplace not in (None, sequence.fireplace):
+            raise UnknownSequence("Unknown sequence: %s" % sequence_id)
+        return sequence
+
+    def _add(self, sequence):
+        self._sequences[sequence.id] = sequence
+        heapq.heappush(self._heap, (sequence.due, next(self._order), sequence.id))
+        self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    # Drop heap entries for cancelled sequences
+                    while self._heap and self._heap[0][2] not in self._sequences:
+                        heapq.heappop(self._heap)
+                    delay = self._heap[0][0] - time.time() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                _, _, sequence_id = heapq.heappop(self._heap)
+                sequence = self._sequences[sequence_id]
+                values = self._due_values(sequence)
+            # Wait for the radio outside the lock so REST calls are not held up
+            ok = not values or self._send(sequence, values)
+            with self._cond:
+                if sequence.id not in self._sequences:
+                    continue
+                if not ok:
+                    # Send the same fields again on the retry
+                    sequence.remaining.insert(0, {"set": values})
+                    sequence.due = time.time() + RETRY_DELAY
+                    self._add(sequence)
+                elif sequence.remaining:
+                    self._add(sequence)
+                else:
+                    del self._sequences[sequence.id]
+                    logger.info("Sequence %s finished", sequence.id)
+                self._save()
+
+    def _due_values(self, sequence):
+        """Consume steps up to the next delay that has not elapsed.
+
+        Returns the fields of the consumed set steps merged into one command,
+        so overdue steps (e.g. after a restart) are caught up in one go.
+        """
+        values = {}
+        while sequence.remaining:
+            step = sequence.remaining[0]
+            kind, arg = next(iter(step.items()))
+            if kind == "set":
+                values.update(arg)
+            elif kind == "ramp":
+                current = {**self._worker.fireplace(sequence.fireplace).state, **values}[arg["field"]]
+                sequence.remaining[1:1] = _expand_ramp(arg, current)
+            elif kind == "off_after":
+                sequence.remaining[1:1] = [{"delay": arg}, {"set": {"power": False}}]
+            else:
+                due = sequence.due + arg
+                if due > time.time():
+                    sequence.due = due
+                    sequence.remaining.pop(0)
+                    break
+                sequence.due = due
+            sequence.remaining.pop(0)
+        return values
+
+    def _send(self, sequence, values):
+        try:
+            self._worker.submit(sequence.fireplace, source=SOURCE_SEQUENCE, **values).result(COMMAND_TIMEOUT)
+            return True
+        except CommandSuperseded as e:
+            # The fireplace was turned off meanwhile; retrying could turn it back on
+            logger.info("Sequence %s step dropped: %s", sequence.id, e)
+            return True
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Sequence %s step failed, retrying in %d s: %s", sequence.id, RETRY_DELAY, e)
+            return False
+
+    def _load(self):
+        if self._path is None or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read saved sequences: %s", e)
+            return
+        if not isinstance(saved, list):
+            logger.warning("Could not read saved sequences: expected a list")
+            return
+        names = set(self._worker.names)
+        with self._cond:
+            for data in saved:
+                try:
+                    sequence = Sequence.from_dict(data)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning("Skipping unreadable saved sequence %r: %s", data, e)
+                    continue
+                if sequence.fireplace not in names:
+                    logger.warning("Dropping sequence %s for unknown fireplace %s", sequence.id, sequence.fireplace)
+                    continue
+                self._add(sequence)
+        if self._sequences:
+            logger.info("Resumed %d saved sequences", len(self._sequences))
+
+    def _save(self):
+        """Write every sequence to the state file atomically; call with the lock held."""
+        if self._path is None:
+            return
+        tmp = self._path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump([s.to_dict() for s in self._sequences.values()], f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Could not save sequences: %s", e)
@@ -6,10 +6,59 @@ Based on https://github.com/johnellinwood/smartfire
 import json
 import logging
 import os
-
-from flask import Flask, jsonify, request
-
-from fireplace import Fireplace
+import queue
+import re
+import socket
+import tempfile
+import threading
+import time
+
+from flask import Flask, Response, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.serving import make_server
+
+from events import (
+    EVENT_SNAPSHOT,
+    KEEPALIVE_INTERVAL,
+    KEEPALIVE_SSE,
+    SUBSCRIBER_BACKLOG,
+    StateBroadcaster,
+    format_sse,
+)
+from fireplace import DEFAULT_SERIAL, TX_MODE_BURST, TX_MODES, Fireplace, Radio, RadioUnavailable
+from history import TransmitHistory
+from journal import StateJournal
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from receiver import RemoteReceiver
+from routes import (
+    COMMAND_TIMEOUT,
+    ERROR_HINT,
+    UnknownFireplace,
+    command_source,
+    etag_matches,
+    fireplaces_payload,
+    health_payload,
+    history_payload,
+    lookup_fireplace,
+    observe_request,
+    parse_flag,
+    parse_history_query,
+    parse_json_object,
+    parse_level,
+    parse_long_poll,
+    parse_sequence_body,
+    parse_state_body,
+    parse_temperature_body,
+    register_metrics,
+    state_headers,
+    target_state,
+    wants_force,
+    wants_wait,
+)
+from sequences import SequenceRunner, UnknownSequence
+from thermostat import ThermostatController
+from transmitter import CommandSuperseded, RadioWorker
+from watchdog import RadioWatchdog
 
 # Configure logging - use INFO so YardStick status and startup messages are visible
 logging.basicConfig(
@@ -22,185 +71,582 @@ logger = logging.getLogger(__name__)
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
 
-def _load_serial_from_options():
-    """Load serial from add-on options.json. Returns None to use default."""
-    path = "/data/options.json"
-    if not os.path.exists(path):
-        return None
+OPTIONS_PATH = "/data/options.json"
+# Persistent add-on storage; each fireplace's last transmitted state is kept here
+DATA_DIR = "/data"
+
+HTTP_SERVER_FLASK = "flask"
+HTTP_SERVER_ASYNCIO = "asyncio"
+HTTP_SERVERS = (HTTP_SERVER_FLASK, HTTP_SERVER_ASYNCIO)
+
+# Name used for the fireplace configured by the single `serial` option
+DEFAULT_FIREPLACE = "default"
+FIREPLACE_NAME_RE = re.compile(r"^[a-z0-9_-]+$")
+
+DEFAULT_DEDUP_WINDOW = 0
+
+
+def _read_options():
+    """Read add-on options.json. Returns an empty dict if missing or unreadable."""
+    if not os.path.exists(OPTIONS_PATH):
+        return {}
     try:
-        with open(path) as f:
-            opts = json.load(f)
-        raw = opts.get("serial", "").strip()
-        if not raw:
-            return None
-        words = [w.strip() for w in raw.split(",") if w.strip()]
-        if len(words) != 3:
-            logger.warning("Serial must be 3 comma-separated 9-bit binary words, got %d", len(words))
-            return None
-        for w in words:
-            if len(w) != 9 or not all(c in "01" for c in w):
-                logger.warning("Each serial word must be 9 binary digits (0/1), got %r", w)
-                return None
-        return words
+        with open(OPTIONS_PATH) as f:
+            return json.load(f)
     except (json.JSONDecodeError, OSError) as e:
         logger.warning("Could not read options: %s", e)
+        return {}
+
+
+def _parse_serial(raw):
+    """Parse a serial given as 3 comma-separated 9-bit binary words. Returns None if empty or invalid."""
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    words = [w.strip() for w in raw.split(",") if w.strip()]
+    if len(words) != 3:
+        logger.warning("Serial must be 3 comma-separated 9-bit binary words, got %d", len(words))
+        return None
+    for w in words:
+        if len(w) != 9 or not all(c in "01" for c in w):
+            logger.warning("Each serial word must be 9 binary digits (0/1), got %r", w)
+            return None
+    return words
+
+
+def _load_serial_from_options(opts):
+    """Load serial from add-on options. Returns None to use default."""
+    return _parse_serial(opts.get("serial"))
+
+
+def _load_fireplaces_from_options(opts):
+    """Load the [(name, serial)] fireplaces to control from add-on options.
+
+    Without a `fireplaces` list this is a single "default" fireplace using
+    the `serial` option.
+    """
+    fireplaces = []
+    for entry in opts.get("fireplaces") or []:
+        name = str(entry.get("name", "")).strip().lower()
+        if not FIREPLACE_NAME_RE.match(name):
+            logger.warning("Skipping fireplace with invalid name %r (use a-z, 0-9, _ and -)", name)
+            continue
+        if any(name == existing for existing, _ in fireplaces):
+            logger.warning("Skipping duplicate fireplace name %r", name)
+            continue
+        serial = _parse_serial(entry.get("serial"))
+        if serial is None:
+            logger.warning("Skipping fireplace %r without a valid serial", name)
+            continue
+        fireplaces.append((name, serial))
+    if not fireplaces:
+        fireplaces.append((DEFAULT_FIREPLACE, _load_serial_from_options(opts)))
+    return fireplaces
+
+
+def _load_tx_mode_from_options(opts):
+    """Load the transmit mode (burst or loop) from add-on options."""
+    mode = (opts.get("tx_mode") or TX_MODE_BURST).strip().lower()
+    if mode not in TX_MODES:
+        logger.warning("Unknown tx_mode %r, using %s", mode, TX_MODE_BURST)
+        return TX_MODE_BURST
+    return mode
+
+
+def _load_dedup_window_from_options(opts):
+    """Load how long (seconds) an identical repeat transmission is skipped; 0 disables."""
+    try:
+        return max(0.0, float(opts.get("dedup_window", DEFAULT_DEDUP_WINDOW)))
+    except (TypeError, ValueError):
+        logger.warning("Invalid dedup_window %r, using %s", opts.get("dedup_window"), DEFAULT_DEDUP_WINDOW)
+        return DEFAULT_DEDUP_WINDOW
+
+
+def _load_receive_from_options(opts):
+    """Whether to listen for the handheld remote between transmissions."""
+    return bool(opts.get("receive", False))
+
+
+def _data_path(filename):
+    """Path for a state file in /data, or None if /data is not writable."""
+    if not os.access(DATA_DIR, os.W_OK):
+        logger.warning("%s is not writable, %s will not survive restarts", DATA_DIR, filename)
+        return None
+    return os.path.join(DATA_DIR, filename)
+
+
+def _open_journal(name, serial):
+    """Return the state journal for a fireplace, or None if /data is not writable."""
+    path = _data_path("state-%s.journal" % name)
+    if path is None:
         return None
+    return StateJournal(path, serial or DEFAULT_SERIAL)
+
+
+def _open_history():
+    """Return the transmit history in /data, or kept in memory if /data is not usable."""
+    history = TransmitHistory(_data_path("history.bin"))
+    try:
+        history.open()
+    except OSError as e:
+        logger.warning("Could not open the transmit history, keeping it in memory: %s", e)
+        history = TransmitHistory()
+        history.open()
+    return history
+
+
+def _load_http_workers_from_options(opts):
+    """Load how many HTTP front-end processes to run; 1 serves from this process."""
+    try:
+        return max(1, int(opts.get("http_workers", 1)))
+    except (TypeError, ValueError):
+        logger.warning("Invalid http_workers %r, using 1", opts.get("http_workers"))
+        return 1
+
+
+def _load_http_server_from_options(opts):
+    """Load the HTTP server implementation (flask or asyncio) from add-on options."""
+    name = (opts.get("http_server") or HTTP_SERVER_FLASK).strip().lower()
+    if name not in HTTP_SERVERS:
+        logger.warning("Unknown http_server %r, using %s", name, HTTP_SERVER_FLASK)
+        return HTTP_SERVER_FLASK
+    return name
+
+
+# Built by create_services() once the HTTP port is bound, so importing this
+# module only defines the routes
+radio = None
+worker = None
+history = None
+broadcasters = {}
+watchdog = None
+sequence_runner = None
+thermostat_controller = None
+
+
+def create_services(options):
+    """Open the radio, state files and background threads the routes use."""
+    global radio, worker, history, watchdog, sequence_runner, thermostat_controller  # pylint: disable=global-statement
+    tx_mode = _load_tx_mode_from_options(options)
+    dedup_window = _load_dedup_window_from_options(options)
+    logger.info("Transmit mode: %s, repeat window: %ss", tx_mode, dedup_window)
+
+    # One radio and one transmit thread shared by every fireplace
+    radio = Radio()
+    worker = RadioWorker()
+    history = _open_history()
+    worker.set_history(history)
+    for name, serial in _load_fireplaces_from_options(options):
+        fireplace = Fireplace(
+            serial=serial,
+            tx_mode=tx_mode,
+            radio=radio,
+            dedup_window=dedup_window,
+            journal=_open_journal(name, serial),
+        )
+        worker.add_fireplace(name, fireplace)
+        broadcasters[name] = StateBroadcaster(fireplace.serial, fireplace.state_value, fireplace.version)
+        if serial:
+            logger.info("Fireplace %s using configured serial: %s", name, serial)
+    worker.add_listener(lambda name, state, version: broadcasters[name].publish(state, version))
+    worker.start()
+    watchdog = RadioWatchdog(worker, radio)
+    if _load_receive_from_options(options):
+        logger.info("Listening for the handheld remote between transmissions")
+        worker.set_idle_task(RemoteReceiver(worker, radio).poll)
+    sequence_runner = SequenceRunner(worker, _data_path("sequences.json"))
+    sequence_runner.start()
+    thermostat_controller = ThermostatController(worker, _data_path("thermostat.json"))
+    thermostat_controller.start()
+    register_metrics(worker, broadcasters)
 
 
-_serial = _load_serial_from_options()
-fp = Fireplace(serial=_serial)
-if _serial:
-    logger.info("Using configured serial: %s", _serial)
 app = Flask(__name__)
 
 
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        observe_request(route, request.method, response.status_code, time.perf_counter() - start, request.args)
+    return response
+
+
 @app.errorhandler(Exception)
 def handle_unhandled_error(e):
     """Catch unhandled exceptions and return a proper JSON error."""
+    if isinstance(e, HTTPException):
+        # Routing errors such as 404 keep their own status
+        return e
     logger.exception("Unhandled error: %s", e)
     return jsonify(
         error=str(e),
-        hint="Check add-on logs for details. YardStick may need to be reconnected.",
+        hint=ERROR_HINT,
     ), 503
 
 
-def _check_yardstick(log_result: bool = True) -> bool:
-    """Check if YardStick USB device is found. Optionally log result. Return True/False."""
-    try:
-        _ = fp.radio
-        if log_result:
-            logger.info("YardStick One USB device found and initialized successfully")
-        return True
-    except Exception as e:
-        if log_result:
-            logger.warning("YardStick One USB device NOT found: %s", e)
-        return False
+@app.errorhandler(RadioUnavailable)
+def handle_radio_unavailable(e):
+    """Fail fast while the watchdog reports the YardStick as disconnected."""
+    return jsonify(error=str(e), hint=ERROR_HINT), 503
 
 
-def _get_yardstick_status() -> bool:
-    """Get YardStick status without logging (for health endpoint)."""
-    return _check_yardstick(log_result=False)
+@app.errorhandler(ValueError)
+def handle_invalid_value(e):
+    """Reject malformed or out-of-range values before anything is transmitted."""
+    return jsonify(error=str(e)), 400
 
 
-@app.route("/state", methods=["GET", "PUT"])
-def state():
-    """Get or set the whole fireplace state at one time."""
-    if request.method == "GET":
-        return fp.state
-    value = json.loads(request.data)
-    fp.set(
-        pilot=value.get("pilot"),
-        power=value.get("power"),
-        flame=value.get("flame"),
+@app.errorhandler(CommandSuperseded)
+def handle_superseded(e):
+    """Return 409 for a queued command dropped in favour of a power or pilot off command."""
+    return jsonify(error=str(e), superseded=True), 409
+
+
+@app.errorhandler(UnknownFireplace)
+@app.errorhandler(UnknownSequence)
+def handle_unknown_fireplace(e):
+    """Return 404 for fireplace names that are not configured and unknown sequences."""
+    return jsonify(error=str(e)), 404
+
+
+def _command(name, **values):
+    """Queue a state change for the named fireplace (default if None).
+
+    Waits for the transmission and returns (state, version, 200) unless the
+    caller passed ?wait=false, in which case it returns the requested target
+    state with no version and 202 straight away.
+    """
+    fp = lookup_fireplace(worker, name)
+    future = worker.submit(
+        name, force=wants_force(request.args), source=command_source(request.url_rule.rule), **values
     )
-    return fp.state
+    if not wants_wait(request.args):
+        return target_state(fp, values), None, 202
+    current, version = future.result(timeout=COMMAND_TIMEOUT)
+    return current, version, 200
+
+
+@app.route("/fireplaces", methods=["GET"])
+def fireplaces():
+    """List the configured fireplaces with their serials, states and versions."""
+    return fireplaces_payload(worker)
+
+
+@app.route("/state", methods=["GET", "PUT", "PATCH"])
+@app.route("/fireplaces/<name>/state", methods=["GET", "PUT", "PATCH"])
+def state(name=None):
+    """Get or set the whole fireplace state at one time.
+
+    PATCH accepts any subset of fields, validates all of them and applies them
+    as one transition that is transmitted once. It returns the new state and
+    its version.
+
+    GET sends an ETag and answers If-None-Match with 304. With
+    ?wait=<seconds>&since=<version> it holds the request until the version
+    differs from since, or the wait is over.
+    """
+    fp = lookup_fireplace(worker, name)
+    if request.method == "GET":
+        broadcaster = broadcasters[name or worker.names[0]]
+        current, version = broadcaster.current()
+        seconds, since = parse_long_poll(request.args, version)
+        if seconds and version == since:
+            changed = threading.Event()
+            token = broadcaster.watch(since, changed.set)
+            try:
+                changed.wait(seconds)
+            finally:
+                broadcaster.unwatch(token)
+            current, version = broadcaster.current()
+        headers = state_headers(current, version)
+        if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return Response(status=304, headers=headers)
+        return broadcaster.state_dict(current), headers
+    current, version, status = _command(name, **parse_state_body(request.data, fp.serial))
+    if request.method == "PATCH":
+        return {"state": current, "version": version}, status
+    return current, status
 
 
 @app.route("/serial", methods=["GET"])
-def serial():
+@app.route("/fireplaces/<name>/serial", methods=["GET"])
+def serial(name=None):
     """Return the serial number."""
-    return str(fp.serial)
+    return str(lookup_fireplace(worker, name).serial)
 
 
 @app.route("/pilot", methods=["GET", "PUT"])
-def pilot():
+@app.route("/fireplaces/<name>/pilot", methods=["GET", "PUT"])
+def pilot(name=None):
     """Get or set the pilot light."""
     if request.method == "GET":
-        return str(fp.pilot)
-    fp.pilot = request.data == b"True"
-    return str(fp.pilot)
+        return str(lookup_fireplace(worker, name).pilot)
+    current, _, status = _command(name, pilot=parse_flag(request.data))
+    return str(current["pilot"]), status
 
 
 @app.route("/light", methods=["GET", "PUT"])
-def light():
+@app.route("/fireplaces/<name>/light", methods=["GET", "PUT"])
+def light(name=None):
     """Get or set the light level."""
     if request.method == "GET":
-        return str(fp.light)
-    fp.light = int(request.data)
-    return str(fp.light)
+        return str(lookup_fireplace(worker, name).light)
+    current, _, status = _command(name, light=parse_level(request.data))
+    return str(current["light"]), status
 
 
 @app.route("/thermostat", methods=["GET", "PUT"])
-def thermostat():
+@app.route("/fireplaces/<name>/thermostat", methods=["GET", "PUT"])
+def thermostat(name=None):
     """Get or set the thermostat."""
     if request.method == "GET":
-        return str(fp.thermostat)
-    fp.thermostat = request.data == b"True"
-    return str(fp.thermostat)
+        return str(lookup_fireplace(worker, name).thermostat)
+    current, _, status = _command(name, thermostat=parse_flag(request.data))
+    return str(current["thermostat"]), status
 
 
 @app.route("/power", methods=["GET", "PUT"])
-def power():
+@app.route("/fireplaces/<name>/power", methods=["GET", "PUT"])
+def power(name=None):
     """Get or set the power."""
     if request.method == "GET":
-        return str(fp.power)
+        return str(lookup_fireplace(worker, name).power)
     try:
-        fp.power = request.data == b"True"
-        return str(fp.power)
+        current, _, status = _command(name, power=parse_flag(request.data))
+        return str(current["power"]), status
+    except RadioUnavailable:
+        raise
     except Exception as e:
         logger.exception("Failed to set power: %s", e)
         return jsonify(
             error=str(e),
-            hint="Check add-on logs for details. YardStick may need to be reconnected.",
+            hint=ERROR_HINT,
         ), 503
 
 
 @app.route("/front", methods=["GET", "PUT"])
-def front():
+@app.route("/fireplaces/<name>/front", methods=["GET", "PUT"])
+def front(name=None):
     """Get or set the front flame."""
     if request.method == "GET":
-        return str(fp.front)
-    fp.front = request.data == b"True"
-    return str(fp.front)
+        return str(lookup_fireplace(worker, name).front)
+    current, _, status = _command(name, front=parse_flag(request.data))
+    return str(current["front"]), status
 
 
 @app.route("/fan", methods=["GET", "PUT"])
-def fan():
+@app.route("/fireplaces/<name>/fan", methods=["GET", "PUT"])
+def fan(name=None):
     """Get or set the fan level."""
     if request.method == "GET":
-        return str(fp.fan)
-    fp.fan = int(request.data)
-    return str(fp.fan)
+        return str(lookup_fireplace(worker, name).fan)
+    current, _, status = _command(name, fan=parse_level(request.data))
+    return str(current["fan"]), status
 
 
 @app.route("/aux", methods=["GET", "PUT"])
-def aux():
+@app.route("/fireplaces/<name>/aux", methods=["GET", "PUT"])
+def aux(name=None):
     """Get or set the auxiliary power."""
     if request.method == "GET":
-        return str(fp.aux)
-    fp.aux = request.data == b"True"
-    return str(fp.aux)
+        return str(lookup_fireplace(worker, name).aux)
+    current, _, status = _command(name, aux=parse_flag(request.data))
+    return str(current["aux"]), status
 
 
 @app.route("/flame", methods=["GET", "PUT"])
-def flame():
+@app.route("/fireplaces/<name>/flame", methods=["GET", "PUT"])
+def flame(name=None):
     """Get or set the flame level."""
     if request.method == "GET":
-        return str(fp.flame)
-    fp.flame = int(request.data)
-    return str(fp.flame)
+        return str(lookup_fireplace(worker, name).flame)
+    current, _, status = _command(name, flame=parse_level(request.data))
+    return str(current["flame"]), status
+
+
+@app.route("/sequences", methods=["GET", "POST"])
+@app.route("/fireplaces/<name>/sequences", methods=["GET", "POST"])
+def sequences(name=None):
+    """List running sequences, or start one from {"steps": [...]}."""
+    if name is not None:
+        lookup_fireplace(worker, name)
+    if request.method == "GET":
+        return jsonify(sequence_runner.list(name))
+    steps = parse_sequence_body(request.data)
+    return jsonify(sequence_runner.create(name or worker.names[0], steps)), 201
+
+
+@app.route("/sequences/<sequence_id>", methods=["GET", "DELETE"])
+@app.route("/fireplaces/<name>/sequences/<sequence_id>", methods=["GET", "DELETE"])
+def sequence(sequence_id, name=None):
+    """Get or cancel one sequence."""
+    if name is not None:
+        lookup_fireplace(worker, name)
+    if request.method == "GET":
+        return jsonify(sequence_runner.get(sequence_id, name))
+    return jsonify(sequence_runner.cancel(sequence_id, name))
+
+
+@app.route("/climate", methods=["GET", "PATCH"])
+@app.route("/fireplaces/<name>/climate", methods=["GET", "PATCH"])
+def climate(name=None):
+    """Get the thermostat, or change its mode, setpoint and limits."""
+    lookup_fireplace(worker, name)
+    name = name or worker.names[0]
+    if request.method == "GET":
+        return thermostat_controller.get(name)
+    return thermostat_controller.update(name, parse_json_object(request.data))
+
+
+@app.route("/climate/temperature", methods=["POST"])
+@app.route("/fireplaces/<name>/climate/temperature", methods=["POST"])
+def climate_temperature(name=None):
+    """Report a room temperature reading to the thermostat."""
+    lookup_fireplace(worker, name)
+    return thermostat_controller.report(name or worker.names[0], parse_temperature_body(request.data))
+
+
+@app.route("/history", methods=["GET"])
+@app.route("/fireplaces/<name>/history", methods=["GET"])
+def transmit_history(name=None):
+    """Transmitted and remote-heard states, newest first, filtered by the query string."""
+    lookup_fireplace(worker, name)
+    return history_payload(worker, history, name, parse_history_query(request.args))
+
+
+@app.route("/events", methods=["GET"])
+@app.route("/fireplaces/<name>/events", methods=["GET"])
+def events(name=None):
+    """Stream state changes as server-sent events.
+
+    Sends a snapshot of the full state on connect, then a delta with the
+    changed fields after every transmission.
+    """
+    lookup_fireplace(worker, name)
+    broadcaster = broadcasters[name or worker.names[0]]
+    pending = queue.Queue(SUBSCRIBER_BACKLOG)
+    token, snapshot = broadcaster.subscribe(lambda event, payload: pending.put_nowait((event, payload)))
+
+    def generate():
+        try:
+            yield format_sse(EVENT_SNAPSHOT, snapshot)
+            while True:
+                try:
+                    event, payload = pending.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    if not broadcaster.is_subscribed(token):
+                        return
+                    yield KEEPALIVE_SSE
+                    continue
+                yield format_sse(event, payload)
+        finally:
+            broadcaster.unsubscribe(token)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics: transmit, packet build, radio and HTTP latencies and counters."""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 @app.route("/health", methods=["GET"])
 def health():
-    """Health check endpoint for addon monitoring."""
-    return {"status": "ok", "yardstick": _get_yardstick_status()}, 200
+    """Health check endpoint for addon monitoring; answered from the watchdog's cache."""
+    return health_payload(worker), 200
+
+
+def _warm_up():
+    """Fill packet tables and check the YardStick after the port is open.
+
+    /health reports "warming" until this finishes; commands sent meanwhile
+    still work, they just encode their packet on demand.
+    """
+    start = time.perf_counter()
+    # The radio thread opens the YardStick while this thread fills the tables
+    check = worker.call(radio.check)
+    for fp in worker.fireplaces.values():
+        fp.warm_up()
+    if check.result():
+        logger.info("YardStick One USB device found and initialized successfully")
+    else:
+        logger.warning("YardStick One USB device NOT found: %s", radio.status["error"])
+        logger.warning(
+            "YardStick not detected - connect the USB dongle and the server will use it when available"
+        )
+    watchdog.start()
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
 
 
-if __name__ == "__main__":
-    # Log YardStick status at startup
-    yardstick_ok = _check_yardstick()
+def _start(options):
+    """Build the services and warm them up in the background."""
+    create_services(options)
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+
+def main(host="0.0.0.0", port=5000, http_server=None, http_workers=None):
+    """Bind the port, then start the services and serve HTTP until stopped.
+
+    Connections made while the services start wait in the listen backlog.
+    With more than one HTTP worker this process keeps the radio and serves
+    on a Unix socket, behind that many frontend.py processes on the port.
+    """
+    options = _read_options()
 
     # Log clear startup message - 172.30.x.x is the container's internal Docker IP (normal).
     # The addon's port 5000 is mapped to the host's port 5000.
     # Access from: localhost:5000 (on host) or <home-assistant-ip>:5000 (from LAN)
     logger.info(
-        "Smartfire Server starting on 0.0.0.0:5000 - "
-        "accessible at localhost:5000 on the host, or <HA-IP>:5000 from your network"
+        "Smartfire Server starting on %s:%d - "
+        "accessible at localhost:%d on the host, or <HA-IP>:%d from your network",
+        host,
+        port,
+        port,
+        port,
     )
-    if not yardstick_ok:
-        logger.warning(
-            "YardStick not detected - connect the USB dongle and the server will use it when available"
-        )
 
-    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
+    http_workers = http_workers or _load_http_workers_from_options(options)
+    if http_workers > 1:
+        # Imported here so aiohttp is only needed when this mode is selected
+        import async_server
+        import frontend
+
+        socket_path = os.path.join(tempfile.gettempdir(), "smartfire-%d.sock" % os.getpid())
+        logger.info("Using %d HTTP front-end processes", http_workers)
+        supervisor = frontend.FrontendSupervisor(http_workers, socket_path, host, port)
+        supervisor.start()
+        try:
+            _start(options)
+            async_server.run(worker, broadcasters, sequence_runner, thermostat_controller, history, path=socket_path)
+        finally:
+            supervisor.stop()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+    elif (http_server or _load_http_server_from_options(options)) == HTTP_SERVER_ASYNCIO:
+        # Imported here so aiohttp is only needed when this mode is selected
+        import async_server
+
+        logger.info("Using asyncio HTTP server")
+        sock = socket.create_server((host, port))
+        _start(options)
+        async_server.run(worker, broadcasters, sequence_runner, thermostat_controller, history, sock=sock)
+    else:
+        server = make_server(host, port, app, threaded=True)
+        _start(options)
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
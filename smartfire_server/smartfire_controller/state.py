@@ -0,0 +1,131 @@
+"""
+state.py: Immutable fireplace state packed into the protocol's 16-bit key.
+
+FireplaceState holds one int laid out like the cmd1/cmd2 bytes of a Proflame 2
+packet (see codec.py), so comparing, hashing and looking up packets for a
+state is a single integer operation, and diff() only inspects the fields
+whose bits differ.
+"""
+
+import functools
+
+from codec import (
+    AUX_BIT,
+    FAN_SHIFT,
+    FLAME_SHIFT,
+    FRONT_BIT,
+    LEVEL_MASK,
+    LIGHT_SHIFT,
+    PILOT_BIT,
+    POWER_BIT,
+    THERMOSTAT_BIT,
+    pack_state,
+    unpack_state,
+)
+
+# (name, shift, mask, is_flag) for every field, in the order of unpack_state()
+FIELDS = (
+    ("pilot", PILOT_BIT, 1, True),
+    ("light", LIGHT_SHIFT, LEVEL_MASK, False),
+    ("thermostat", THERMOSTAT_BIT, 1, True),
+    ("power", POWER_BIT, 1, True),
+    ("front", FRONT_BIT, 1, True),
+    ("fan", FAN_SHIFT, LEVEL_MASK, False),
+    ("aux", AUX_BIT, 1, True),
+    ("flame", FLAME_SHIFT, LEVEL_MASK, False),
+)
+_FIELD_BITS = {name: (shift, mask, is_flag) for name, shift, mask, is_flag in FIELDS}
+
+
+@functools.lru_cache(maxsize=None)
+def _items(key):
+    # At most 10976 valid keys, so every state's fields are decoded once
+    return tuple(unpack_state(key).items())
+
+
+def _field(name, shift, mask, is_flag):
+    if is_flag:
+        return property(lambda self: bool(self._key >> shift & 1), doc="%s flag" % name)
+    return property(lambda self: self._key >> shift & mask, doc="%s level" % name)
+
+
+class FireplaceState:
+    """One fireplace state; equal states have equal keys and hashes."""
+
+    __slots__ = ("_key",)
+
+    def __init__(self, key=0):
+        object.__setattr__(self, "_key", key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FireplaceState is immutable")
+
+    @classmethod
+    def from_fields(cls, pilot=False, light=0, thermostat=False, power=False, front=False, fan=0, aux=False, flame=0):
+        return cls(pack_state(pilot, light, thermostat, power, front, fan, aux, flame))
+
+    @classmethod
+    def from_dict(cls, values, base=None):
+        """Build a state from a JSON object of fields (as to_dict() or GET /state return).
+
+        Fields missing from values are taken from base, or left off/0. A
+        "serial" entry is ignored.
+        """
+        values = {name: value for name, value in values.items() if name != "serial"}
+        return (base or cls()).replace(**values)
+
+    @property
+    def key(self):
+        """The packed 16-bit (cmd1 << 8 | cmd2) value."""
+        return self._key
+
+    def replace(self, **values):
+        """Return a copy with some fields changed."""
+        key = self._key
+        for name, value in values.items():
+            try:
+                shift, mask, is_flag = _FIELD_BITS[name]
+            except KeyError:
+                raise ValueError("Unknown fireplace field: %s" % name) from None
+            value = int(bool(value)) if is_flag else value
+            if not 0 <= value <= mask:
+                raise ValueError("%s value out of range: %r" % (name.capitalize(), value))
+            key = key & ~(mask << shift) | value << shift
+        return self if key == self._key else FireplaceState(key)
+
+    def diff(self, other):
+        """The fields of this state that differ from other, with this state's values."""
+        changed = self._key ^ other._key
+        if not changed:
+            return {}
+        return {
+            name: bool(self._key >> shift & 1) if is_flag else self._key >> shift & mask
+            for name, shift, mask, is_flag in FIELDS
+            if changed >> shift & mask
+        }
+
+    def to_dict(self):
+        """The fields as a new dict of JSON-ready values."""
+        return dict(_items(self._key))
+
+    def __eq__(self, other):
+        if not isinstance(other, FireplaceState):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __int__(self):
+        return self._key
+
+    def __repr__(self):
+        return "FireplaceState(0x%04x)" % self._key
+
+    def __reduce__(self):
+        return (FireplaceState, (self._key,))
+
+
+for _name, _shift, _mask, _is_flag in FIELDS:
+    setattr(FireplaceState, _name, _field(_name, _shift, _mask, _is_flag))
+del _name, _shift, _mask, _is_flag
@@ -0,0 +1,323 @@
+"""
+thermostat.py: Closed-loop temperature control driven by pushed readings.
+
+Home Assistant (or anything else) pushes room temperature readings for a
+fireplace, and the server holds a setpoint by itself:
+
+    temperature <= setpoint - hysteresis   power on
+    temperature >= setpoint + hysteresis   power off
+    in between, while on                   flame from 1 (near the upper
+                                           threshold) to 6 (band degrees
+                                           below it)
+
+Power is only switched once it has been on for min_on or off for min_off
+seconds, whoever switched it last, and the flame is changed at most once
+per FLAME_STEP_INTERVAL, so the controller transmits rarely.  If readings
+stop for STALE_READING seconds the fireplace is turned off.
+
+One control thread evaluates every fireplace after each reading, settings
+change and transmission, and every CONTROL_INTERVAL seconds.  Settings are
+saved to a JSON file; readings are not.  Degrees are whatever unit the
+readings use; the defaults are Celsius, which the Home Assistant climate
+entity always sends.  This is independent of the protocol's thermostat flag, which
+is left as it is.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from codec import MAX_LEVEL
+from history import SOURCE_CLIMATE
+from routes import COMMAND_TIMEOUT
+from transmitter import CommandSuperseded
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_HEAT = "heat"
+MODES = (MODE_OFF, MODE_HEAT)
+
+# What the controller is doing, as reported in its state
+ACTION_OFF = "off"
+ACTION_IDLE = "idle"
+ACTION_HEATING = "heating"
+
+# Celsius
+DEFAULT_SETTINGS = {
+    "mode": MODE_OFF,
+    "setpoint": 21.0,
+    "hysteresis": 0.5,
+    "band": 2.0,
+    "min_on": 300.0,
+    "min_off": 300.0,
+}
+
+# Longest wait between evaluations when nothing else wakes the thread
+CONTROL_INTERVAL = 10
+
+# Seconds without a reading after which heating is stopped
+STALE_READING = 900
+
+# Shortest time between two flame changes while heating
+FLAME_STEP_INTERVAL = 120
+
+# Seconds before retrying a command that failed (e.g. radio unplugged)
+RETRY_DELAY = 30
+
+MIN_FLAME = 1
+
+# Readings and setpoints outside this range are rejected as nonsense
+TEMPERATURE_LIMIT = 200.0
+
+
+def _number(value, name, low, high):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("%s must be a number" % name)
+    if not low <= value <= high:
+        raise ValueError("%s must be between %g and %g" % (name, low, high))
+    return float(value)
+
+
+def parse_settings(values):
+    """Validate a partial settings object and return it normalized.
+
+    Raises ValueError for unknown keys and invalid values.
+    """
+    if not isinstance(values, dict) or not values:
+        raise ValueError("Settings must be a non-empty object")
+    unknown = set(values) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError("Unknown thermostat settings: %s" % ", ".join(sorted(unknown)))
+    parsed = {}
+    for name, value in values.items():
+        if name == "mode":
+            if value not in MODES:
+                raise ValueError("mode must be one of %s" % ", ".join(MODES))
+            parsed[name] = value
+        elif name == "setpoint":
+            parsed[name] = _number(value, name, -TEMPERATURE_LIMIT, TEMPERATURE_LIMIT)
+        elif name in ("hysteresis", "band"):
+            parsed[name] = _number(value, name, 0.1 if name == "band" else 0.0, 20.0)
+        else:
+            parsed[name] = _number(value, name, 0.0, 3600.0)
+    return parsed
+
+
+def parse_temperature(value):
+    """Validate one temperature reading."""
+    return _number(value, "temperature", -TEMPERATURE_LIMIT, TEMPERATURE_LIMIT)
+
+
+def flame_level(temperature, settings):
+    """Flame level for a temperature while heating: lower the closer it is to the upper threshold."""
+    deficit = settings["setpoint"] + settings["hysteresis"] - temperature
+    fraction = min(1.0, max(0.0, deficit / settings["band"]))
+    return MIN_FLAME + int(round(fraction * (MAX_LEVEL - MIN_FLAME)))
+
+
+class Thermostat:
+    """Settings, last reading and switching history of one fireplace's controller."""
+
+    def __init__(self, settings, state, now):
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self.temperature = None
+        self.reading_at = None
+        self.reading_time = None
+        self.power = state.power
+        self.flame = state.flame
+        # Unknown before startup, so count from now to be safe
+        self.power_changed_at = now
+        self.flame_changed_at = now
+        self.retry_at = 0.0
+        self.turn_off = False
+
+    def action(self):
+        if self.settings["mode"] == MODE_OFF:
+            return ACTION_OFF
+        return ACTION_HEATING if self.power else ACTION_IDLE
+
+    def to_dict(self, now):
+        age = None if self.reading_at is None else round(now - self.reading_at, 1)
+        return dict(
+            self.settings,
+            temperature=self.temperature,
+            temperature_age=age,
+            reading_time=self.reading_time,
+            action=self.action(),
+            power=self.power,
+            flame=self.flame,
+        )
+
+    def decide(self, now):
+        """Return the fields to transmit now, or None to leave the fireplace alone."""
+        if now < self.retry_at:
+            return None
+        if self.turn_off:
+            # The mode was just switched off; that is an explicit request
+            self.turn_off = False
+            return {"power": False} if self.power else None
+        if self.settings["mode"] != MODE_HEAT:
+            return None
+        switched_for = now - self.power_changed_at
+        if self.reading_at is None or now - self.reading_at > STALE_READING:
+            if self.power and switched_for >= self.settings["min_on"]:
+                logger.warning("No temperature reading for %d s, turning the fireplace off", STALE_READING)
+                return {"power": False}
+            return None
+        temperature = self.temperature
+        setpoint, hysteresis = self.settings["setpoint"], self.settings["hysteresis"]
+        if not self.power:
+            if temperature <= setpoint - hysteresis and switched_for >= self.settings["min_off"]:
+                return {"power": True, "flame": flame_level(temperature, self.settings)}
+            return None
+        if temperature >= setpoint + hysteresis:
+            return {"power": False} if switched_for >= self.settings["min_on"] else None
+        level = flame_level(temperature, self.settings)
+        if level != self.flame and now - self.flame_changed_at >= FLAME_STEP_INTERVAL:
+            return {"flame": level}
+        return None
+
+    def observe(self, power, flame, now):
+        """Note the fireplace's power and flame, timing any change from now."""
+        if power != self.power:
+            self.power = power
+            self.power_changed_at = now
+        if flame != self.flame:
+            self.flame = flame
+            self.flame_changed_at = now
+
+
+class ThermostatController:
+    """Runs a thermostat for each fireplace of a RadioWorker on a control thread."""
+
+    def __init__(self, worker, path=None):
+        self._worker = worker
+        self._path = path
+        self._thermostats = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Load saved settings and start the control thread (idempotent)."""
+        if self._thread is None:
+            saved = self._load()
+            now = time.monotonic()
+            with self._cond:
+                for name, fp in self._worker.fireplaces.items():
+                    self._thermostats[name] = Thermostat(saved.get(name, {}), fp.state_value, now)
+            self._worker.add_listener(self._on_state)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="thermostat", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get(self, name):
+        """The settings, last reading and action of a fireplace's thermostat."""
+        with self._cond:
+            return self._thermostats[name].to_dict(time.monotonic())
+
+    def update(self, name, values):
+        """Change some settings; switching the mode to off turns the fireplace off."""
+        values = parse_settings(values)
+        with self._cond:
+            thermostat = self._thermostats[name]
+            if values.get("mode") == MODE_OFF and thermostat.settings["mode"] != MODE_OFF:
+                thermostat.turn_off = True
+            thermostat.settings.update(values)
+            thermostat.retry_at = 0.0
+            self._save()
+            logger.info("Thermostat for %s: %s", name, values)
+            self._cond.notify()
+            return thermostat.to_dict(time.monotonic())
+
+    def report(self, name, temperature):
+        """Record a temperature reading and act on it."""
+        temperature = parse_temperature(temperature)
+        with self._cond:
+            thermostat = self._thermostats[name]
+            thermostat.temperature = temperature
+            thermostat.reading_at = time.monotonic()
+            thermostat.reading_time = time.time()
+            self._cond.notify()
+            return thermostat.to_dict(thermostat.reading_at)
+
+    def _on_state(self, name, state, version):
+        """Note power and flame changes from any source (runs on the radio thread)."""
+        with self._cond:
+            thermostat = self._thermostats.get(name)
+            if thermostat is None:
+                return
+            thermostat.observe(state.power, state.flame, time.monotonic())
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                commands = []
+                for name, thermostat in self._thermostats.items():
+                    values = thermostat.decide(now)
+                    if values:
+                        commands.append((name, values))
+                if not commands:
+                    self._cond.wait(CONTROL_INTERVAL)
+                    continue
+            # Wait for the radio outside the lock so REST calls are not held up
+            for name, values in commands:
+                self._send(name, values)
+
+    def _send(self, name, values):
+        try:
+            logger.info("Thermostat for %s: sending %s", name, values)
+            state, _ = self._worker.submit(name, source=SOURCE_CLIMATE, **values).result(COMMAND_TIMEOUT)
+        except CommandSuperseded as e:
+            # Turned off meanwhile; the listener reports the new state
+            logger.info("Thermostat command for %s dropped: %s", name, e)
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Thermostat command for %s failed, retrying in %d s: %s", name, RETRY_DELAY, e)
+            with self._cond:
+                self._thermostats[name].retry_at = time.monotonic() + RETRY_DELAY
+            return
+        # Futures resolve before listeners run, so record the result here too
+        with self._cond:
+            self._thermostats[name].observe(state["power"], state["flame"], time.monotonic())
+
+    def _load(self):
+        if self._path is None or not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path) as f:
+                saved = json.load(f)
+            return {name: parse_settings(settings) for name, settings in saved.items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Could not read saved thermostat settings: %s", e)
+            return {}
+
+    def _save(self):
+        """Write every thermostat's settings atomically; call with the lock held."""
+        if self._path is None:
+            return
+        tmp = self._path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({name: t.settings for name, t in self._thermostats.items()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Could not save thermostat settings: %s", e)
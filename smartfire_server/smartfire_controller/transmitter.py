@@ -0,0 +1,388 @@
+"""
+transmitter.py: Single radio owner thread for the Proflame 2 controller.
+
+All transmissions go through one RadioWorker so that HTTP handler threads never
+touch the radio or the fireplace state directly.  Several fireplaces can share
+the radio; each has its own lane of pending changes.  Changes queued on a lane
+are merged into one target state (last write wins per field) and sent as a
+single transmission, and lanes with work are served round-robin so a busy
+fireplace cannot starve the others.
+
+Commands that turn the power or pilot off are urgent: their lane moves to a
+separate queue served before everything else.  They supersede the changes
+already queued for that fireplace, which are dropped and fail with
+CommandSuperseded, and changes submitted while an urgent command
+is pending are held for the transmission after it.  An urgent command waits
+at most for the transmission already on air plus other urgent lanes.  Urgent
+and normal commands are each limited to the queue size.
+
+An optional idle task (such as listening for the handheld remote) runs on the
+same thread whenever nothing is queued, so it never overlaps a transmission.
+"""
+
+import collections
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 64
+
+# Seconds to pause the idle task after it raises, e.g. while the radio is unplugged
+IDLE_RETRY_DELAY = 5
+
+PRIORITY_URGENT = "urgent"
+PRIORITY_NORMAL = "normal"
+PRIORITIES = (PRIORITY_URGENT, PRIORITY_NORMAL)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "smartfire_queue_wait_seconds",
+    "Time the oldest command in a transmission waited for the radio.",
+    ["fireplace"],
+)
+COMMAND_SECONDS = Histogram(
+    "smartfire_command_seconds",
+    "Time from accepting a command to the end of the transmission that carried it, by priority.",
+    ["priority"],
+)
+
+
+def command_priority(values):
+    """PRIORITY_URGENT for a change that turns the power or pilot off, else PRIORITY_NORMAL."""
+    if values.get("power") is False or values.get("pilot") is False:
+        return PRIORITY_URGENT
+    return PRIORITY_NORMAL
+
+
+class TransmitQueueFull(Exception):
+    """Raised when the radio worker cannot accept more commands."""
+
+
+class CommandSuperseded(Exception):
+    """Set on a queued command dropped in favour of a power or pilot off command."""
+
+
+class _Lane:
+    """Pending changes for one fireplace."""
+
+    def __init__(self, fireplace):
+        self.fireplace = fireplace
+        self.target = {}
+        self.force = False
+        self.urgent = False
+        # Where the latest merged command came from, for the history
+        self.source = None
+        # (future, priority, time accepted) for each merged command
+        self.futures = []
+        self.queued_at = None
+        self.transmitted = 0
+        self.skipped = 0
+        # Normal changes submitted while urgent ones are pending, sent after them
+        self.clear_deferred()
+
+    def clear_deferred(self):
+        self.deferred = {}
+        self.deferred_force = False
+        self.deferred_source = None
+        self.deferred_futures = []
+
+
+class RadioWorker:
+    """Owns the radio and transmits queued commands for one or more fireplaces."""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        self._maxsize = maxsize
+        self._lanes = {}
+        self._ready = collections.deque()
+        self._urgent = collections.deque()
+        self._calls = collections.deque()
+        self._waiting = 0
+        self._waiting_urgent = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._listeners = []
+        self._history = None
+        self._submitted = 0
+        self._transmitted = 0
+        self._idle_task = None
+        self._idle_paused_until = 0.0
+        self._latency = {priority: {"commands": 0, "last": None, "max": None} for priority in PRIORITIES}
+
+    def add_fireplace(self, name, fireplace):
+        """Register a fireplace under a name. The first one is the default."""
+        with self._cond:
+            self._lanes[name] = _Lane(fireplace)
+
+    @property
+    def names(self):
+        return list(self._lanes)
+
+    @property
+    def fireplaces(self):
+        return {name: lane.fireplace for name, lane in self._lanes.items()}
+
+    def fireplace(self, name=None):
+        """Return the named fireplace (the default one if name is None).
+
+        Raises KeyError for unknown names.
+        """
+        if name is None:
+            name = next(iter(self._lanes))
+        return self._lanes[name].fireplace
+
+    @property
+    def stats(self):
+        """Commands accepted, transmissions made and commands pending."""
+        return {
+            "submitted": self._submitted,
+            "transmitted": self._transmitted,
+            "pending": self._waiting,
+            "per_fireplace": {name: lane.transmitted for name, lane in self._lanes.items()},
+            "skipped": sum(lane.skipped for lane in self._lanes.values()),
+            "latency": {priority: dict(stats) for priority, stats in self._latency.items()},
+        }
+
+    def add_listener(self, callback):
+        """Call callback(name, state, version) on the radio thread after each transmission.
+
+        state is the fireplace's FireplaceState.
+        """
+        self._listeners.append(callback)
+
+    def set_history(self, history):
+        """Record every transmitted and observed state in a TransmitHistory."""
+        self._history = history
+
+    def record(self, name, source, latency=0.0):
+        """Add a fireplace's current state to the history, e.g. after hearing the remote."""
+        if self._history is not None:
+            fireplace = self._lanes[name].fireplace
+            self._history.record(fireplace.serial, fireplace.key, fireplace.version, source, latency)
+
+    def set_idle_task(self, fn):
+        """Run fn() on the radio thread, repeatedly, whenever no work is queued.
+
+        fn should return within a fraction of a second, since queued commands
+        wait for it to finish. Pass None to remove it.
+        """
+        with self._cond:
+            self._idle_task = fn
+            self._cond.notify()
+
+    def publish(self, name):
+        """Report a fireplace's current state to the listeners.
+
+        Called after each transmission; call it from the radio thread when the
+        state changes some other way.
+        """
+        fireplace = self._lanes[name].fireplace
+        state, version = fireplace.state_value, fireplace.version
+        for listener in self._listeners:
+            try:
+                listener(name, state, version)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception("State listener failed: %s", e)
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="radio-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the worker after the commands already queued are sent."""
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, name=None, force=False, source=None, **values):
+        """Validate and queue a partial state change for a fireplace.
+
+        Returns a Future resolving to (state, version) after the
+        transmission that carried this change. Invalid values raise ValueError
+        and unknown fireplaces raise KeyError before anything is queued, as
+        does the fireplace's RadioUnavailable while the YardStick is known to be
+        down. force transmits even if the fireplace would skip an identical
+        packet. Urgent changes (see command_priority) are sent before any
+        normal ones; the fireplace's queued normal changes then fail with
+        CommandSuperseded.
+        source names where the command came from in the history.
+        """
+        if name is None:
+            name = next(iter(self._lanes))
+        lane = self._lanes[name]
+        values = lane.fireplace.validate(**values)
+        lane.fireplace.check_radio()
+        priority = command_priority(values)
+        future = Future()
+        with self._cond:
+            # Urgent commands have their own limit, so a full queue cannot hold them up
+            if priority == PRIORITY_URGENT:
+                if self._waiting_urgent >= self._maxsize:
+                    raise TransmitQueueFull("Radio is busy, too many urgent commands queued")
+                self._waiting_urgent += 1
+            elif self._waiting - self._waiting_urgent >= self._maxsize:
+                raise TransmitQueueFull("Radio is busy, too many commands queued")
+            now = time.perf_counter()
+            if priority == PRIORITY_URGENT:
+                self._supersede(name, lane)
+            elif lane.urgent:
+                # Keep it off the air until the urgent command has gone
+                lane.deferred.update(values)
+                lane.deferred_force = lane.deferred_force or force
+                lane.deferred_source = source or lane.deferred_source
+                lane.deferred_futures.append((future, priority, now))
+                self._waiting += 1
+                self._submitted += 1
+                return future
+            elif not lane.futures:
+                lane.queued_at = now
+                self._ready.append(name)
+            lane.target.update(values)
+            lane.force = lane.force or force
+            lane.source = source or lane.source
+            lane.futures.append((future, priority, now))
+            self._waiting += 1
+            self._submitted += 1
+            self._cond.notify()
+        return future
+
+    def _supersede(self, name, lane):
+        """Make a lane urgent, failing its normal commands; call with the lock held."""
+        dropped = list(lane.deferred_futures)
+        if not lane.urgent:
+            if lane.futures:
+                self._ready.remove(name)
+                dropped.extend(lane.futures)
+                lane.target, lane.force, lane.source, lane.futures = {}, False, None, []
+            lane.queued_at = time.perf_counter()
+            self._urgent.append(name)
+            lane.urgent = True
+        lane.clear_deferred()
+        if dropped:
+            logger.debug("Urgent command for %s supersedes %d queued commands", name, len(dropped))
+            self._waiting -= len(dropped)
+            for future, _, _ in dropped:
+                future.set_exception(CommandSuperseded("Superseded by a command turning %s off" % name))
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the radio thread; returns a Future for its result.
+
+        Lets other code use the radio (e.g. to probe the USB device) without
+        a second thread touching it.
+        """
+        future = Future()
+        with self._cond:
+            if self._waiting >= self._maxsize:
+                raise TransmitQueueFull("Radio is busy, too many commands queued")
+            self._calls.append((functools.partial(fn, *args), future))
+            self._cond.notify()
+        return future
+
+    def _next_job(self):
+        """Block until there is work and return it as a callable; None means stop."""
+        with self._cond:
+            while not (self._urgent or self._calls or self._ready or self._stopping):
+                if self._idle_task is not None:
+                    delay = self._idle_paused_until - time.monotonic()
+                    if delay <= 0:
+                        return functools.partial(self._run_idle, self._idle_task)
+                    self._cond.wait(delay)
+                    continue
+                self._cond.wait()
+            if self._urgent:
+                name = self._urgent.popleft()
+            elif self._calls:
+                fn, future = self._calls.popleft()
+                return functools.partial(self._run_call, fn, future)
+            elif self._ready:
+                name = self._ready.popleft()
+            else:
+                name = None
+            if name is not None:
+                lane = self._lanes[name]
+                target, force, source, futures = lane.target, lane.force, lane.source, lane.futures
+                lane.target, lane.force, lane.source, lane.futures, lane.urgent = {}, False, None, [], False
+                self._waiting -= len(futures)
+                self._waiting_urgent -= sum(1 for _, priority, _ in futures if priority == PRIORITY_URGENT)
+                queued_at = lane.queued_at
+                if lane.deferred_futures:
+                    # Changes held back behind this urgent transmission go next
+                    lane.target, lane.force, lane.source = lane.deferred, lane.deferred_force, lane.deferred_source
+                    lane.futures = lane.deferred_futures
+                    lane.queued_at = min(accepted for _, _, accepted in lane.futures)
+                    lane.clear_deferred()
+                    self._ready.append(name)
+                QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at, fireplace=name)
+                return functools.partial(self._transmit, name, target, force, source, futures)
+            return None
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            job()
+
+    @staticmethod
+    def _run_call(fn, future):
+        try:
+            future.set_result(fn())
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+
+    def _run_idle(self, fn):
+        try:
+            fn()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Idle radio task failed, pausing for %d s: %s", IDLE_RETRY_DELAY, e)
+            self._idle_paused_until = time.monotonic() + IDLE_RETRY_DELAY
+
+    def _transmit(self, name, target, force, source, futures):
+        """Send a lane's merged target state and resolve its futures."""
+        lane = self._lanes[name]
+        if len(futures) > 1:
+            logger.debug("Coalesced %d commands for %s into one transmission", len(futures), name)
+
+        try:
+            sent = lane.fireplace.set(force=force, **target)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("Transmission for %s failed: %s", name, e)
+            for future, _, _ in futures:
+                future.set_exception(e)
+            return
+
+        latency = self._record_latency(futures)
+        if sent:
+            lane.transmitted += 1
+            self._transmitted += 1
+            self.record(name, source, latency)
+        else:
+            lane.skipped += 1
+        result = (lane.fireplace.state, lane.fireplace.version)
+        for future, _, _ in futures:
+            future.set_result(result)
+        if sent:
+            self.publish(name)
+
+    def _record_latency(self, futures):
+        done = time.perf_counter()
+        for _, priority, accepted in futures:
+            seconds = done - accepted
+            COMMAND_SECONDS.observe(seconds, priority=priority)
+            stats = self._latency[priority]
+            stats["commands"] += 1
+            stats["last"] = round(seconds, 6)
+            stats["max"] = round(max(seconds, stats["max"] or 0.0), 6)
+        # The oldest command's wait plus the transmission
+        return done - min(accepted for _, _, accepted in futures)
@@ -0,0 +1,63 @@
+"""
+watchdog.py: Background supervision of the YardStick.
+
+Health probes must not touch USB, and a dongle that disappears after startup
+would otherwise only be noticed by the next command.  RadioWatchdog checks the
+radio on a timer, through the RadioWorker so the radio thread stays its only
+user, and leaves the result in Radio.status for /health to read.  A failed
+check drops the RfCat handle; the next check rebuilds it, so replugging the
+dongle recovers without restarting the add-on.
+"""
+
+import logging
+import threading
+
+from transmitter import TransmitQueueFull
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks while the YardStick answers, and while it does not
+CHECK_INTERVAL = 30
+RECONNECT_INTERVAL = 5
+
+
+class RadioWatchdog:
+    """Periodically checks a Radio on a RadioWorker's thread."""
+
+    def __init__(self, worker, radio, interval=CHECK_INTERVAL, reconnect_interval=RECONNECT_INTERVAL):
+        self._worker = worker
+        self._radio = radio
+        self._interval = interval
+        self._reconnect_interval = reconnect_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start checking in the background (idempotent)."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="radio-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def check(self, timeout=None):
+        """Check the radio now on the worker thread and return whether it answered."""
+        return self._worker.call(self._radio.check).result(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                ok = self.check(timeout=self._interval)
+            except TransmitQueueFull:
+                # Busy transmitting, so the radio is evidently in use
+                ok = True
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("YardStick check did not complete: %s", e)
+                ok = False
+            if self._stop.wait(self._interval if ok else self._reconnect_interval):
+                return
@@ -0,0 +1,15 @@
+"""
+Test setup: run the controller modules against the fake radio used by the
+benchmarks, so no YardStick or rflib is needed.
+
+    python3 -m pytest smartfire_server/tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import fakeradio  # noqa: E402  pylint: disable=wrong-import-position
+
+fakeradio.install()
@@ -0,0 +1,121 @@
+"""Packet decoding: every state round-trips and corrupted packets are rejected."""
+
+import random
+
+import pytest
+
+import codec
+from codec import (
+    GAP_BITS,
+    PACKET_BITS,
+    PACKET_WORDS,
+    REPEATS,
+    WORD_BITS,
+    all_keys,
+    decode_capture,
+    decode_packet,
+    ecc_words,
+    get_codec,
+    pack_state,
+)
+
+SERIAL = ["001001011", "011110100", "000000100"]
+
+# Symbol positions in a word's 44 bits, counted from its least significant bit
+STOP_SHIFT = 18
+PARITY_SHIFT = 20
+SYNC_SHIFT = 42
+
+
+def _packet(words):
+    """A packet from seven 9-bit word values, without any checks."""
+    bits = 0
+    for word in words:
+        bits = bits << WORD_BITS | codec._WORD_CODES[word]  # pylint: disable=protected-access
+    return bits
+
+
+def _words(key, ecc=None):
+    ecc1, ecc2 = ecc or ecc_words(key)
+    return [int(s, 2) for s in SERIAL] + [(key >> 8) << 1, (key & 0xFF) << 1, ecc1 << 1, ecc2 << 1]
+
+
+def _flip(bits, word, shift, mask=0b11):
+    """Flip symbol bits of one word (0 = first word on air)."""
+    return bits ^ mask << ((PACKET_WORDS - 1 - word) * WORD_BITS + shift)
+
+
+def test_round_trip_every_state():
+    packets = get_codec(SERIAL)
+    for key in all_keys():
+        assert decode_packet(packets.encode(key)) == (SERIAL, key)
+
+
+def test_packet_matches_encoder():
+    key = pack_state(True, 3, False, True, False, 2, True, 5)
+    assert _packet(_words(key)) == get_codec(SERIAL).encode(key)
+
+
+@pytest.mark.parametrize("word", range(PACKET_WORDS))
+def test_rejects_bad_parity(word):
+    bits = _flip(get_codec(SERIAL).encode(pack_state(True, 1, False, True, False, 0, False, 4)), word, PARITY_SHIFT)
+    with pytest.raises(ValueError, match="Malformed word %d" % (word + 1)):
+        decode_packet(bits)
+
+
+@pytest.mark.parametrize("shift,mask", [(STOP_SHIFT, 0b11), (SYNC_SHIFT, 0b01)])
+def test_rejects_bad_framing(shift, mask):
+    bits = _flip(get_codec(SERIAL).encode(pack_state(True, 0, False, False, False, 0, False, 0)), 4, shift, mask)
+    with pytest.raises(ValueError, match="Malformed word 5"):
+        decode_packet(bits)
+
+
+def test_rejects_ecc_mismatch():
+    key = pack_state(True, 2, False, True, False, 1, False, 3)
+    ecc1, ecc2 = ecc_words(key)
+    for ecc in ((ecc1 ^ 1, ecc2), (ecc1, ecc2 ^ 0x80)):
+        with pytest.raises(ValueError, match="ECC mismatch"):
+            decode_packet(_packet(_words(key, ecc)))
+
+
+def test_rejects_padding_bit():
+    words = _words(pack_state(True, 0, False, True, False, 0, False, 2))
+    words[5] |= 1
+    with pytest.raises(ValueError, match="Padding bit"):
+        decode_packet(_packet(words))
+
+
+@pytest.mark.parametrize("field", ["light", "fan", "flame"])
+def test_rejects_level_out_of_range(field):
+    levels = {"light": 0, "fan": 0, "flame": 0, field: 7}
+    key = pack_state(True, levels["light"], False, True, False, levels["fan"], False, levels["flame"])
+    with pytest.raises(ValueError, match="Level out of range"):
+        decode_packet(_packet(_words(key)))
+
+
+@pytest.mark.parametrize("offset", [0, 1, 3, 7, 8, 13, 37])
+def test_capture_at_bit_offset(offset):
+    key = pack_state(True, 4, True, True, True, 3, False, 6)
+    noise = random.Random(offset).getrandbits(offset) if offset else 0
+    total = offset + PACKET_BITS + 19
+    total += -total % 8
+    value = (noise << PACKET_BITS | get_codec(SERIAL).encode(key)) << (total - offset - PACKET_BITS)
+    found = list(decode_capture(value.to_bytes(total // 8, "big")))
+    assert found == [(offset, SERIAL, key)]
+
+
+def test_capture_finds_every_repeat_of_a_burst():
+    key = pack_state(False, 0, False, False, False, 0, False, 0)
+    found = list(decode_capture(b"\x00" + get_codec(SERIAL).burst(key)))
+    assert found == [(8 + i * (PACKET_BITS + GAP_BITS), SERIAL, key) for i in range(REPEATS)]
+
+
+def test_capture_skips_corrupted_repeat():
+    key = pack_state(True, 1, False, True, False, 1, False, 1)
+    frames = [get_codec(SERIAL).encode(key)] * 2
+    frames[0] = _flip(frames[0], 2, PARITY_SHIFT)
+    value = 0
+    for frame in frames:
+        value = value << (PACKET_BITS + GAP_BITS) | frame << GAP_BITS
+    found = list(decode_capture(value.to_bytes(2 * (PACKET_BITS + GAP_BITS) // 8, "big")))
+    assert found == [(PACKET_BITS + GAP_BITS, SERIAL, key)]
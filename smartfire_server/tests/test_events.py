@@ -0,0 +1,47 @@
+"""Long-poll watchers only fire when a new state version is published."""
+
+import threading
+
+from events import StateBroadcaster
+from fireplace import Fireplace
+from transmitter import RadioWorker
+
+
+def _worker():
+    worker = RadioWorker()
+    fireplace = Fireplace(dedup_window=60)
+    worker.add_fireplace("default", fireplace)
+    broadcaster = StateBroadcaster(fireplace.serial, fireplace.state_value, fireplace.version)
+    worker.add_listener(lambda name, state, version: broadcaster.publish(state, version))
+    worker.start()
+    return worker, broadcaster
+
+
+def test_same_version_does_not_fire_watchers():
+    fireplace = Fireplace()
+    broadcaster = StateBroadcaster(fireplace.serial, fireplace.state_value, 3)
+    changed = threading.Event()
+    broadcaster.watch(3, changed.set)
+    broadcaster.publish(fireplace.state_value, 3)
+    assert not changed.is_set()
+    broadcaster.publish(fireplace.state_value.replace(light=2), 4)
+    assert changed.is_set()
+
+
+def test_skipped_duplicate_does_not_end_long_poll():
+    worker, broadcaster = _worker()
+    try:
+        worker.submit(light=3).result(5)
+        _, version = broadcaster.current()
+        changed = threading.Event()
+        token = broadcaster.watch(version, changed.set)
+        worker.submit(light=3).result(5)
+        assert worker.stats["skipped"] == 1
+        assert not changed.is_set()
+        assert broadcaster.current()[1] == version
+
+        worker.submit(light=4).result(5)
+        assert changed.is_set()
+        broadcaster.unwatch(token)
+    finally:
+        worker.stop(5)
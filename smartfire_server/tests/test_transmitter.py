@@ -0,0 +1,55 @@
+"""Urgent power and pilot off commands in the RadioWorker."""
+
+import threading
+
+import pytest
+
+from fireplace import Fireplace
+from transmitter import CommandSuperseded, RadioWorker, TransmitQueueFull
+
+
+@pytest.fixture
+def worker():
+    worker = RadioWorker(maxsize=2)
+    worker.add_fireplace("default", Fireplace())
+    sent = []
+    worker.add_listener(lambda name, state, version: sent.append(state))
+    worker.sent = sent
+    worker.start()
+    worker.submit(power=True, flame=2).result(5)
+    sent.clear()
+    yield worker
+    worker.stop(5)
+
+
+def _hold_radio(worker):
+    """Keep the radio thread busy until the returned event is set."""
+    release = threading.Event()
+    worker.call(release.wait, 5)
+    return release
+
+
+def test_off_supersedes_queued_changes(worker):
+    release = _hold_radio(worker)
+    cosmetic = worker.submit(flame=5, light=3)
+    off = worker.submit(power=False)
+    later = worker.submit(flame=6)
+    with pytest.raises(CommandSuperseded):
+        cosmetic.result(0)
+    release.set()
+    assert off.result(5)[0]["power"] is False
+    assert later.result(5)[0]["flame"] == 6
+    assert [(s.power, s.flame, s.light) for s in worker.sent] == [(False, 2, 0), (False, 6, 0)]
+
+
+def test_urgent_commands_are_bounded(worker):
+    release = _hold_radio(worker)
+    worker.submit(light=1)
+    worker.submit(fan=1)
+    with pytest.raises(TransmitQueueFull):
+        worker.submit(light=2)
+    worker.submit(power=False)
+    worker.submit(pilot=False)
+    with pytest.raises(TransmitQueueFull):
+        worker.submit(power=False)
+    release.set()